@@ -0,0 +1,301 @@
+"""Admission control: per-endpoint concurrency gates, per-client rate limits and load shedding.
+
+Requests are sorted into priority classes:
+
+- `critical`: health, metrics, stats and other GET reads. Always admitted, so
+  they stay responsive while the expensive endpoints are saturated.
+- `interactive`: ask, upload, extract and delete.
+- `heavy`: summarize, index, job submission and batch ingest, which fan out
+  into many model calls. A batch is charged per megabyte of upload, as an
+  estimate of its document count.
+
+Each known non-critical endpoint has its own concurrency gate with a bounded
+wait queue; any other path shares one `unmatched` gate, so scanning random
+URLs cannot create new gates or metric series. When the queue is full, or a
+queued request waits longer than `ADMISSION_QUEUE_TIMEOUT_SECONDS`, the
+request is shed with 503. Independently, each client has a token bucket, and
+an empty bucket answers 429. Both carry a `Retry-After` header. Limits are per
+process, so multiply them by the number of workers when sizing a deployment.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from prometheus_client import Counter, Histogram
+
+from .config import settings
+from .scheduler import TokenBucket
+
+# Rate-limit tokens taken per request, by class.
+CLASS_COST = {"critical": 0, "interactive": 1, "heavy": 5}
+# Per-client buckets kept in memory; the least recently seen client is dropped first.
+MAX_TRACKED_CLIENTS = 10_000
+# Upload bytes per rate-limit charge of a batch request (roughly one PDF).
+BATCH_COST_BYTES = 1024 * 1024
+UNMATCHED = "unmatched"
+
+ADMISSION_WAIT = Histogram(
+    "app_admission_wait_seconds",
+    "Time requests spent queued for an endpoint's concurrency gate.",
+    ["endpoint"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+ADMISSION_REJECTED = Counter(
+    "app_admission_rejected_total", "Requests refused by admission control.", ["endpoint", "reason"]
+)
+
+
+@lru_cache(maxsize=1)
+def _known_endpoints() -> dict[str, str]:
+    prefix = settings.API_PREFIX
+    heavy = ("summarize", "summarize/stream", "index", "jobs", "batch")
+    interactive = ("upload", "extract", "ask", "ask/stream", "ask/multi")
+    return {
+        **{f"POST {prefix}/{name}": "heavy" for name in heavy},
+        **{f"POST {prefix}/{name}": "interactive" for name in interactive},
+        f"DELETE {prefix}/documents/{{document_id}}": "interactive",
+    }
+
+
+def classify(method: str, path: str) -> tuple[str, str]:
+    """Return `(endpoint, priority_class)`; unknown non-read requests map to `unmatched`."""
+    if method in ("GET", "HEAD", "OPTIONS") or path in ("/health", "/metrics"):
+        return "read", "critical"
+    if method == "DELETE" and path.startswith(f"{settings.API_PREFIX}/documents/"):
+        path = f"{settings.API_PREFIX}/documents/{{document_id}}"
+    endpoint = f"{method} {path}"
+    priority = _known_endpoints().get(endpoint)
+    if priority is None:
+        return UNMATCHED, "interactive"
+    return endpoint, priority
+
+
+def request_cost(endpoint: str, priority: str, scope) -> float:
+    """Rate-limit tokens a request costs."""
+    cost = CLASS_COST[priority]
+    if endpoint == f"POST {settings.API_PREFIX}/batch":
+        length = next((int(v) for k, v in scope.get("headers", []) if k == b"content-length" and v.isdigit()), 0)
+        cost *= max(1, math.ceil(length / BATCH_COST_BYTES))
+    return cost
+
+
+class QueueFull(Exception):
+    """Raised when an endpoint's wait queue is full or the wait timed out."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class EndpointGate:
+    """A concurrency limit with a bounded FIFO wait queue for one endpoint.
+
+    Tracks an exponentially weighted average of how long requests hold a slot,
+    which is used to suggest a `Retry-After` when shedding.
+    """
+
+    def __init__(self, limit: int, max_queue: int, timeout: float):
+        self.limit = max(1, limit)
+        self.max_queue = max(0, max_queue)
+        self.timeout = timeout
+        self._sem = asyncio.Semaphore(self.limit)
+        self.active = 0
+        self.waiting = 0
+        self.avg_hold_seconds = 1.0
+        self.stats = {"admitted": 0, "queued": 0, "rejected_full": 0, "rejected_timeout": 0}
+
+    def retry_after(self) -> float:
+        """Estimate when a slot will free up for a new arrival."""
+        return self.avg_hold_seconds * (self.waiting + 1) / self.limit
+
+    async def acquire(self) -> float:
+        """Take a slot, waiting in the queue if needed; return the seconds waited."""
+        start = time.perf_counter()
+        if not self._sem.locked() and not self.waiting:
+            await self._sem.acquire()  # a free slot is taken without suspending
+        else:
+            if self.waiting >= self.max_queue:
+                self.stats["rejected_full"] += 1
+                raise QueueFull("queue_full", self.retry_after())
+            self.stats["queued"] += 1
+            self.waiting += 1
+            try:
+                granted = await self._wait_for_slot()
+            finally:
+                self.waiting -= 1
+            if not granted:
+                self.stats["rejected_timeout"] += 1
+                raise QueueFull("queue_timeout", self.retry_after())
+        self.active += 1
+        self.stats["admitted"] += 1
+        return time.perf_counter() - start
+
+    async def _wait_for_slot(self) -> bool:
+        """Wait up to `timeout` for a slot; return False if none was granted in time.
+
+        The semaphore is acquired in its own task instead of under `wait_for`,
+        which before Python 3.12 can drop a slot granted just as the wait is
+        cancelled. A slot granted while the wait is abandoned is kept on timeout
+        and given back on cancellation.
+        """
+        waiter = asyncio.ensure_future(self._sem.acquire())
+        try:
+            await asyncio.wait({waiter}, timeout=self.timeout)
+        except asyncio.CancelledError:
+            waiter.cancel()
+            await asyncio.wait({waiter})
+            if not waiter.cancelled():
+                self._sem.release()
+            raise
+        if not waiter.done():
+            waiter.cancel()
+            await asyncio.wait({waiter})
+        return not waiter.cancelled()
+
+    def release(self, held_seconds: float) -> None:
+        self.active -= 1
+        self.avg_hold_seconds += 0.2 * (held_seconds - self.avg_hold_seconds)
+        self._sem.release()
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "active": self.active,
+            "waiting": self.waiting,
+            "limit": self.limit,
+            "max_queue": self.max_queue,
+            "avg_hold_seconds": round(self.avg_hold_seconds, 3),
+        }
+
+
+class AdmissionController:
+    """Endpoint gates and per-client token buckets shared by all requests of a process."""
+
+    def __init__(self):
+        self._gates: dict[str, EndpointGate] = {}
+        self._clients: OrderedDict[str, TokenBucket] = OrderedDict()
+        self.rate_limited = 0
+
+    def gate(self, endpoint: str, priority: str) -> EndpointGate:
+        gate = self._gates.get(endpoint)
+        if gate is None:
+            if priority == "heavy":
+                limit, queue = settings.ADMISSION_HEAVY_CONCURRENCY, settings.ADMISSION_HEAVY_QUEUE
+            else:
+                limit, queue = settings.ADMISSION_INTERACTIVE_CONCURRENCY, settings.ADMISSION_INTERACTIVE_QUEUE
+            gate = EndpointGate(limit, queue, settings.ADMISSION_QUEUE_TIMEOUT_SECONDS)
+            self._gates[endpoint] = gate
+        return gate
+
+    def check_rate(self, client: str, cost: float) -> float:
+        """Charge `cost` to the client's bucket; return 0, or the seconds until it could pay.
+
+        Costs above the bucket's capacity are capped at it (a full burst).
+        """
+        if settings.RATE_LIMIT_PER_MINUTE <= 0 or cost <= 0:
+            return 0.0
+        bucket = self._clients.get(client)
+        if bucket is None:
+            bucket = TokenBucket(settings.RATE_LIMIT_BURST, settings.RATE_LIMIT_PER_MINUTE / 60)
+            self._clients[client] = bucket
+            if len(self._clients) > MAX_TRACKED_CLIENTS:
+                self._clients.popitem(last=False)
+        else:
+            self._clients.move_to_end(client)
+        wait = bucket.try_acquire(cost)
+        if wait > 0:
+            self.rate_limited += 1
+        return wait
+
+    def snapshot(self) -> dict:
+        return {
+            "rate_limited": self.rate_limited,
+            "clients_tracked": len(self._clients),
+            "endpoints": {endpoint: gate.snapshot() for endpoint, gate in self._gates.items()},
+        }
+
+
+_controller: AdmissionController | None = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Return the process-wide admission controller."""
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController()
+    return _controller
+
+
+def _client_id(scope) -> str:
+    if settings.ADMISSION_CLIENT_HEADER:
+        wanted = settings.ADMISSION_CLIENT_HEADER.lower().encode()
+        for name, value in scope.get("headers", []):
+            if name == wanted and value:
+                # X-Forwarded-For style lists: the first entry is the original client.
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+async def _reject(send, status: int, detail: str, retry_after: float) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """ASGI middleware that applies the process's admission controller to HTTP requests.
+
+    A request holds its endpoint slot until its response (including a
+    streamed body) has been fully sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.ADMISSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        endpoint, priority = classify(scope["method"], scope["path"])
+        if priority == "critical":
+            await self.app(scope, receive, send)
+            return
+
+        controller = get_admission_controller()
+        wait = controller.check_rate(_client_id(scope), request_cost(endpoint, priority, scope))
+        if wait > 0:
+            ADMISSION_REJECTED.labels(endpoint, "rate_limited").inc()
+            await _reject(send, 429, "Rate limit exceeded. Retry later.", wait)
+            return
+
+        gate = controller.gate(endpoint, priority)
+        try:
+            waited = await gate.acquire()
+        except QueueFull as e:
+            ADMISSION_REJECTED.labels(endpoint, e.reason).inc()
+            await _reject(send, 503, "Server is busy. Retry later.", e.retry_after)
+            return
+        ADMISSION_WAIT.labels(endpoint).observe(waited)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release(time.perf_counter() - start)
@@ -0,0 +1,160 @@
+"""Per-document semantic cache of /ask answers, keyed by question-embedding similarity."""
+
+from __future__ import annotations
+
+import copy
+import itertools
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable, List
+
+import numpy as np
+
+from .config import settings
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    answer: str
+    sources: list[dict]
+    similarity: float = 1.0
+
+
+class SemanticAnswerCache:
+    """Thread-safe LRU of `(question embedding, answer, sources)` per document.
+
+    A lookup returns the entry whose question is most similar to the new one
+    (cosine similarity of the embeddings) if it reaches `threshold`. Entries
+    are grouped by `(document_id, variant)`; the variant holds the retrieval
+    options (top_k, mode) so answers built from different contexts never mix.
+    Invalidating a document bumps its generation, so an answer computed
+    against the old index while a rebuild runs is never stored. Callers also
+    pass the on-disk index version with each lookup: a document re-indexed by
+    another process is invalidated here as soon as the new version is seen.
+    """
+
+    def __init__(self, max_entries: int, threshold: float):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._ids = itertools.count()
+        # LRU over every entry: entry id -> (group key, normalized vector, answer)
+        self._entries: OrderedDict[int, tuple[tuple, np.ndarray, CachedAnswer]] = OrderedDict()
+        # group key -> entry ids, and a stacked matrix of their vectors (rebuilt lazily)
+        self._groups: dict[tuple, list[int]] = {}
+        self._matrices: dict[tuple, np.ndarray] = {}
+        self._generation: dict[str, int] = {}
+        self._index_version: dict[str, Hashable] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        v = np.asarray(vector, dtype="float32")
+        norm = float(np.linalg.norm(v))
+        return v / norm if norm else v
+
+    def generation(self, document_id: str, index_version: Hashable = None) -> int:
+        """Return the document's generation; pass it back to `put`.
+
+        If `index_version` differs from the one seen before, the document's
+        entries are dropped first.
+        """
+        with self._lock:
+            if index_version is not None and self._index_version.get(document_id) != index_version:
+                if document_id in self._index_version:
+                    self._invalidate(document_id)
+                self._index_version[document_id] = index_version
+            return self._generation.get(document_id, 0)
+
+    def get(self, document_id: str, variant: Hashable, vector: List[float]) -> CachedAnswer | None:
+        """Return a copy of the closest cached answer within the threshold, or None."""
+        key = (document_id, variant)
+        query = self._normalize(vector)
+        with self._lock:
+            ids = self._groups.get(key)
+            if not ids:
+                self.stats["misses"] += 1
+                return None
+            matrix = self._matrices.get(key)
+            if matrix is None or matrix.shape[1] != query.shape[0]:
+                matrix = np.stack([self._entries[i][1] for i in ids])
+                self._matrices[key] = matrix
+            if matrix.shape[1] != query.shape[0]:
+                self.stats["misses"] += 1
+                return None
+            similarities = matrix @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.stats["misses"] += 1
+                return None
+            entry_id = ids[best]
+            self._entries.move_to_end(entry_id)
+            self.stats["hits"] += 1
+            hit = self._entries[entry_id][2]
+        return CachedAnswer(hit.question, hit.answer, copy.deepcopy(hit.sources), float(similarities[best]))
+
+    def put(self, document_id: str, variant: Hashable, vector: List[float], question: str, answer: str,
+            sources: list[dict], generation: int) -> None:
+        """Cache an answer unless the document was invalidated since `generation` was read."""
+        key = (document_id, variant)
+        entry = CachedAnswer(question, answer, copy.deepcopy(sources))
+        with self._lock:
+            if self._generation.get(document_id, 0) != generation or self.max_entries <= 0:
+                return
+            entry_id = next(self._ids)
+            self._entries[entry_id] = (key, self._normalize(vector), entry)
+            self._groups.setdefault(key, []).append(entry_id)
+            self._matrices.pop(key, None)
+            self.stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._drop(*self._entries.popitem(last=False))
+                self.stats["evictions"] += 1
+
+    def _drop(self, entry_id: int, value: tuple) -> None:
+        key = value[0]
+        ids = self._groups[key]
+        ids.remove(entry_id)
+        self._matrices.pop(key, None)
+        if not ids:
+            del self._groups[key]
+
+    def invalidate(self, document_id: str) -> None:
+        """Drop every cached answer for a document (e.g. after it was re-indexed)."""
+        with self._lock:
+            self._invalidate(document_id)
+            self._index_version.pop(document_id, None)
+
+    def _invalidate(self, document_id: str) -> None:
+        self._generation[document_id] = self._generation.get(document_id, 0) + 1
+        for key in [k for k in self._groups if k[0] == document_id]:
+            for entry_id in self._groups.pop(key):
+                self._entries.pop(entry_id, None)
+            self._matrices.pop(key, None)
+        self.stats["invalidations"] += 1
+
+    def snapshot(self) -> dict:
+        """Return counters, hit rate and entry count."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+            stats["documents"] = len({key[0] for key in self._groups})
+            stats["max_entries"] = self.max_entries
+            stats["threshold"] = self.threshold
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+_answer_cache: SemanticAnswerCache | None = None
+
+
+def get_answer_cache() -> SemanticAnswerCache | None:
+    """Return the process-wide answer cache, or None when it is disabled."""
+    global _answer_cache
+    if not settings.ANSWER_CACHE_ENABLED:
+        return None
+    if _answer_cache is None:
+        _answer_cache = SemanticAnswerCache(settings.ANSWER_CACHE_ITEMS, settings.ANSWER_CACHE_THRESHOLD)
+    return _answer_cache
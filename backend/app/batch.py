@@ -0,0 +1,293 @@
+"""Batch ingest: many PDFs per request, processed through a pipelined stage graph.
+
+Each document flows extract → index and/or summarize. Every stage has its own
+worker pool, so extraction of one document overlaps with embedding and
+summarization of earlier ones. Chunks from concurrently indexed documents are
+coalesced into full provider embedding batches by `CrossDocumentEmbedder`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import zipfile
+from pathlib import Path
+from typing import BinaryIO, Callable, List
+
+from .config import settings
+from .executors import run_io
+from .ingest import artifacts_present, get_ingest_registry
+from .pipeline import extract_document, summarize_document
+from .rag_service import embed_texts, prepare_index_chunks, save_index
+from .scheduler import estimate_tokens
+from .storage import ArtifactStore
+from .telemetry import span
+from .utils import generate_document_id
+
+logger = logging.getLogger("app.batch")
+
+
+# --- staging uploads ---
+
+
+def _copy_to_store(store: ArtifactStore, src: BinaryIO, max_bytes: int) -> tuple[Path, str]:
+    """Copy a PDF stream into a store temp file; return `(path, sha256)`.
+
+    Raises ValueError if it is empty, too large or not a PDF.
+    """
+    tmp = store.temp_path(".pdf")
+    hasher = hashlib.sha256()
+    total = 0
+    try:
+        with tmp.open("wb") as f:
+            for block in iter(lambda: src.read(1024 * 1024), b""):
+                if total == 0 and not block.startswith(b"%PDF"):
+                    raise ValueError("Not a PDF file.")
+                total += len(block)
+                if total > max_bytes:
+                    raise ValueError(f"File too large. Max {settings.MAX_UPLOAD_MB} MB.")
+                hasher.update(block)
+                f.write(block)
+        if total == 0:
+            raise ValueError("Uploaded file is empty.")
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return tmp, hasher.hexdigest()
+
+
+def _iter_pdf_sources(filename: str, fileobj: BinaryIO) -> list[tuple[str, Callable[[], BinaryIO]]]:
+    """Expand one uploaded file into `(name, opener)` pairs: itself, or the PDFs inside a zip."""
+    if not filename.lower().endswith(".zip"):
+        return [(filename, lambda: fileobj)]
+    archive = zipfile.ZipFile(fileobj)
+    return [
+        (info.filename, lambda info=info: archive.open(info))
+        for info in archive.infolist()
+        if not info.is_dir()
+        and info.filename.lower().endswith(".pdf")
+        and not info.filename.startswith("__MACOSX/")
+    ]
+
+
+def stage_uploads(store: ArtifactStore, files: list[tuple[str, BinaryIO]]) -> tuple[list[dict], list[dict]]:
+    """Store uploaded PDFs (or zips of PDFs) as new documents.
+
+    Returns `(accepted, rejected)`: `{"filename", "document_id", "reused"}` and
+    `{"filename", "error"}` entries. At most `BATCH_MAX_DOCUMENTS` are accepted.
+    With fused ingest, each file is recorded in the ingest registry like a
+    single upload, and a file whose content was already ingested (and still
+    has its artifacts) reuses that document id instead of creating a new one.
+    """
+    max_bytes = settings.MAX_UPLOAD_MB * 1024 * 1024
+    registry = get_ingest_registry() if settings.FUSED_INGEST else None
+    accepted: list[dict] = []
+    rejected: list[dict] = []
+    for filename, fileobj in files:
+        try:
+            sources = _iter_pdf_sources(filename, fileobj)
+        except zipfile.BadZipFile:
+            rejected.append({"filename": filename, "error": "Invalid zip archive."})
+            continue
+        for name, opener in sources:
+            if len(accepted) >= settings.BATCH_MAX_DOCUMENTS:
+                rejected.append({"filename": name, "error": f"Batch limit of {settings.BATCH_MAX_DOCUMENTS} reached."})
+                continue
+            try:
+                tmp, digest = _copy_to_store(store, opener(), max_bytes)
+            except (ValueError, zipfile.BadZipFile) as e:
+                rejected.append({"filename": name, "error": str(e)})
+                continue
+            existing = registry.find_by_hash(digest) if registry is not None else None
+            if existing is not None:
+                if artifacts_present(existing):
+                    tmp.unlink(missing_ok=True)
+                    accepted.append({"filename": name, "document_id": existing["document_id"], "reused": True})
+                    continue
+                registry.forget(existing["document_id"])
+            document_id = generate_document_id()
+            size_bytes = tmp.stat().st_size
+            store.put_blob_file(document_id, "upload", tmp, digest)
+            if registry is not None:
+                registry.stage(document_id, digest, size_bytes)
+            accepted.append({"filename": name, "document_id": document_id, "reused": False})
+    return accepted, rejected
+
+
+# --- cross-document embedding ---
+
+
+class CrossDocumentEmbedder:
+    """Coalesces chunk texts from concurrently indexed documents into full provider batches.
+
+    Full batches are sent immediately; a partial batch waits up to `linger`
+    seconds for more chunks before it is sent anyway.
+    """
+
+    def __init__(self, embed_batch: Callable[[List[str]], List[List[float]]], batch_size: int, linger: float):
+        self._embed_batch = embed_batch
+        self.batch_size = max(1, batch_size)
+        self.linger = linger
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.stats = {"texts": 0, "batches": 0}
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed `texts`, sharing provider calls with other documents in flight."""
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in texts]
+        self._pending.extend(zip(texts, futures))
+        while len(self._pending) >= self.batch_size:
+            self._flush()
+        if self._pending and self._timer is None:
+            self._timer = loop.call_later(self.linger, self._flush)
+        return list(await asyncio.gather(*futures))
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending[: self.batch_size], self._pending[self.batch_size:]
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.linger, self._flush)
+
+    async def _send(self, batch: list[tuple[str, asyncio.Future]]) -> None:
+        self.stats["texts"] += len(batch)
+        self.stats["batches"] += 1
+        try:
+            vectors = await run_io(self._embed_batch, [text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+
+# --- stage graph ---
+
+
+async def run_batch(
+    document_ids: list[str],
+    max_pages: int,
+    summarize: bool,
+    index: bool,
+    progress: Callable[[str, int, int], None] | None = None,
+) -> dict:
+    """Run documents through extract → index/summarize and return per-document results.
+
+    A failure in one document's stage is recorded on that document and does
+    not stop the batch. `progress` is called with `("documents", done, total)`.
+    """
+    results = {doc: {"document_id": doc, "status": "running"} for doc in document_ids}
+    remaining = {doc: 1 + int(index) + int(summarize) for doc in document_ids}
+    finished = 0
+    embedder = CrossDocumentEmbedder(
+        embed_texts, settings.EMBEDDING_BATCH_SIZE, settings.BATCH_EMBED_LINGER_MS / 1000
+    )
+
+    extract_q: asyncio.Queue[str] = asyncio.Queue()
+    index_q: asyncio.Queue[str] = asyncio.Queue()
+    summarize_q: asyncio.Queue[str] = asyncio.Queue()
+    for doc in document_ids:
+        extract_q.put_nowait(doc)
+
+    def complete(doc: str, stages: int = 1) -> None:
+        nonlocal finished
+        remaining[doc] -= stages
+        if remaining[doc] == 0:
+            if results[doc]["status"] == "running":
+                results[doc]["status"] = "succeeded"
+            finished += 1
+            if progress is not None:
+                progress("documents", finished, len(document_ids))
+
+    def fail(doc: str, stage: str, exc: Exception) -> None:
+        results[doc]["status"] = "failed"
+        results[doc]["error"] = f"{stage}: {exc}"
+
+    async def extract_one(doc: str) -> None:
+        try:
+            with span("batch.extract"):
+                extracted = await extract_document(doc, max_pages=max_pages)
+        except Exception as e:
+            fail(doc, "extract", e)
+            complete(doc, remaining[doc])
+            return
+        results[doc]["pages_processed"] = extracted["pages_processed"]
+        results[doc]["text_length"] = extracted["text_length"]
+        if not extracted["text_length"]:
+            fail(doc, "extract", ValueError(extracted.get("message", "No extractable text found.")))
+            complete(doc, remaining[doc])
+            return
+        if index:
+            index_q.put_nowait(doc)
+        if summarize:
+            summarize_q.put_nowait(doc)
+        complete(doc)
+
+    async def index_one(doc: str) -> None:
+        try:
+            with span("batch.index") as attrs:
+                texts, spans = await run_io(prepare_index_chunks, doc)
+                attrs["prompt_tokens"] = sum(estimate_tokens(t) for t in texts)
+                vectors = await embedder.embed(texts)
+                await run_io(save_index, doc, texts, vectors, spans)
+            results[doc]["chunks_indexed"] = len(texts)
+        except Exception as e:
+            fail(doc, "index", e)
+        complete(doc)
+
+    async def summarize_one(doc: str) -> None:
+        try:
+            with span("batch.summarize"):
+                summarized = await summarize_document(doc)
+            results[doc]["summary_llm_calls"] = summarized["llm_calls"]
+        except Exception as e:
+            fail(doc, "summarize", e)
+        complete(doc)
+
+    async def worker(queue: asyncio.Queue[str], handle) -> None:
+        while True:
+            doc = await queue.get()
+            try:
+                await handle(doc)
+            except Exception:
+                logger.exception("Batch stage failed for %s", doc)
+            finally:
+                queue.task_done()
+
+    workers = [
+        *(asyncio.create_task(worker(extract_q, extract_one)) for _ in range(settings.BATCH_EXTRACT_CONCURRENCY)),
+        *(asyncio.create_task(worker(index_q, index_one)) for _ in range(settings.BATCH_INDEX_CONCURRENCY)),
+        *(
+            asyncio.create_task(worker(summarize_q, summarize_one))
+            for _ in range(settings.BATCH_SUMMARIZE_CONCURRENCY)
+        ),
+    ]
+    try:
+        # Stages feed forward only, so draining them in order drains the graph.
+        await extract_q.join()
+        await index_q.join()
+        await summarize_q.join()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    documents = [results[doc] for doc in document_ids]
+    return {
+        "documents": documents,
+        "succeeded": sum(1 for d in documents if d["status"] == "succeeded"),
+        "failed": sum(1 for d in documents if d["status"] == "failed"),
+        "embedding_batches": embedder.stats["batches"],
+    }
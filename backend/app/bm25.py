@@ -0,0 +1,112 @@
+"""Local BM25 lexical retrieval and reciprocal rank fusion."""
+
+from __future__ import annotations
+
+import json
+import math
+import re
+from collections import Counter
+from typing import Iterable, List, Tuple
+
+# Keeps numbers, dates and codes such as "3.5", "2024-05-01" or "v1/api" as single tokens.
+_TOKEN_RE = re.compile(r"\w+(?:[.\-/:]\w+)*")
+
+# Function words that match nearly every chunk; they are neither indexed nor searched.
+STOPWORDS = frozenset(
+    "a an and are as at be been but by can could did do does for from had has have how i if in into is it its "
+    "me my of on or our so than that the their them there these they this to was we were what when where "
+    "which who whom why will with would you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase and split text into word/number tokens."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def terms(text: str) -> List[str]:
+    """Tokens of `text` without stopwords, as indexed and searched."""
+    return [t for t in tokenize(text) if t not in STOPWORDS]
+
+
+def looks_lexical(question: str) -> bool:
+    """Heuristic for keyword-style questions that lexical search can answer alone.
+
+    True for questions with a quoted phrase, or short (<= 3 token) questions
+    that contain a number, date or code.
+    """
+    if re.search(r"[\"“].+?[\"”]", question):
+        return True
+    tokens = tokenize(question)
+    return 0 < len(tokens) <= 3 and any(any(ch.isdigit() for ch in t) for t in tokens)
+
+
+class BM25Index:
+    """Inverted index with Okapi BM25 scoring over a fixed list of chunks."""
+
+    def __init__(self, postings: dict[str, list[list[int]]], doc_len: list[int], k1: float = 1.5, b: float = 0.75):
+        self.postings = postings
+        self.doc_len = doc_len
+        self.k1 = k1
+        self.b = b
+        self.avgdl = (sum(doc_len) / len(doc_len)) if doc_len else 0.0
+
+    @classmethod
+    def build(cls, texts: Iterable[str], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        """Build the index from chunk texts (chunk id = position)."""
+        postings: dict[str, list[list[int]]] = {}
+        doc_len: list[int] = []
+        for doc_id, text in enumerate(texts):
+            tokens = terms(text)
+            doc_len.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, []).append([doc_id, tf])
+        return cls(postings, doc_len, k1=k1, b=b)
+
+    def to_json(self) -> str:
+        return json.dumps({"k1": self.k1, "b": self.b, "doc_len": self.doc_len, "postings": self.postings})
+
+    @classmethod
+    def from_json(cls, payload: str) -> "BM25Index":
+        data = json.loads(payload)
+        return cls(data["postings"], data["doc_len"], k1=data["k1"], b=data["b"])
+
+    @property
+    def nbytes(self) -> int:
+        """Rough resident size estimate for cache accounting."""
+        return 64 * sum(len(p) for p in self.postings.values()) + 8 * len(self.doc_len)
+
+    def search(self, query: str, k: int, min_score: float = 0.0) -> List[Tuple[int, float]]:
+        """Return `(chunk_id, bm25_score)` of the `k` best-scoring chunks.
+
+        `min_score` drops weak matches: it is a fraction (0-1) of the score a
+        chunk would get by matching every query term with saturated frequency,
+        so it means the same for short and long queries.
+        """
+        n = len(self.doc_len)
+        if not n:
+            return []
+        scores: dict[int, float] = {}
+        ceiling = 0.0
+        for term in set(terms(query)):
+            plist = self.postings.get(term) or []
+            idf = math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            ceiling += idf * (self.k1 + 1)
+            for doc_id, tf in plist:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[doc_id] / (self.avgdl or 1.0))
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        floor = min_score * ceiling
+        return sorted(
+            ((doc_id, score) for doc_id, score in scores.items() if score >= floor),
+            key=lambda item: item[1],
+            reverse=True,
+        )[:k]
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """Fuse ranked id lists by summing `1 / (k + rank)`; best first."""
+    fused: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
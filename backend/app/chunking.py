@@ -0,0 +1,158 @@
+"""Separator-aware text chunking that works on offsets into one text buffer.
+
+Chunks are `(start, end)` character offsets into the original text rather
+than copied strings, so chunking a large document allocates a few tuples per
+chunk instead of a string per split level. Boundaries follow the same
+recursive-separator strategy as LangChain's RecursiveCharacterTextSplitter:
+split on paragraphs, then lines, sentences and words, and only cut inside a
+word as a last resort. Pieces are then packed greedily up to the chunk size,
+with trailing pieces repeated as overlap.
+
+Several chunk sizes (e.g. the summarizer's and the index's) can be derived from
+a single separator pass with `chunk_layouts`.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, Sequence
+
+import numpy as np
+
+DEFAULT_SEPARATORS: tuple[str, ...] = ("\n\n", "\n", ". ", " ", "")
+
+# Measures a span as `length(text, start, end)`; the default counts characters.
+Length = Callable[[str, int, int], int]
+
+
+def char_length(text: str, start: int, end: int) -> int:
+    return end - start
+
+
+def token_length(text: str, start: int, end: int) -> int:
+    """Estimated tokens of a span, matching scheduler.estimate_tokens (~4 chars per token)."""
+    return max(1, (end - start) // 4)
+
+
+@dataclass(frozen=True)
+class ChunkSpec:
+    """Target chunk size and overlap, in the units of the chunker's `length`."""
+    size: int
+    overlap: int
+
+
+def _pieces(text: str, start: int, end: int, size: int, separators: Sequence[str],
+            length: Length) -> Iterator[tuple[int, int]]:
+    """Yield consecutive spans tiling `text[start:end]`, each within `size` where possible.
+
+    Each separator stays attached to the end of the piece before it.
+    """
+    if length(text, start, end) <= size:
+        yield start, end
+        return
+    for i, sep in enumerate(separators):
+        if sep == "":
+            # Last resort: cut at a fixed number of characters.
+            per_unit = (end - start) / max(1, length(text, start, end))
+            step = max(1, int(size * per_unit))
+            for s in range(start, end, step):
+                yield s, min(s + step, end)
+            return
+        if text.find(sep, start, end) == -1:
+            continue
+        finer = separators[i + 1:]
+        pos = start
+        while pos < end:
+            hit = text.find(sep, pos, end)
+            stop = end if hit == -1 else hit + len(sep)
+            if length(text, pos, stop) <= size:
+                yield pos, stop
+            else:
+                yield from _pieces(text, pos, stop, size, finer, length)
+            pos = stop
+        return
+    yield start, end
+
+
+def _pack(text: str, pieces: Iterable[tuple[int, int]], spec: ChunkSpec,
+          length: Length) -> Iterator[tuple[int, int]]:
+    """Greedily pack consecutive pieces into chunks of at most `spec.size`, with overlap."""
+    window: deque[tuple[int, int, int]] = deque()
+    total = 0
+    for start, end in pieces:
+        n = length(text, start, end)
+        if window and total + n > spec.size:
+            yield window[0][0], window[-1][1]
+            while window and (total > spec.overlap or total + n > spec.size):
+                total -= window.popleft()[2]
+        window.append((start, end, n))
+        total += n
+    if window:
+        yield window[0][0], window[-1][1]
+
+
+def _trimmed(text: str, spans: Iterable[tuple[int, int]]) -> Iterator[tuple[int, int]]:
+    """Strip surrounding whitespace from each span and drop empty ones."""
+    for start, end in spans:
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start < end:
+            yield start, end
+
+
+def iter_chunks(
+    text: str,
+    size: int,
+    overlap: int,
+    separators: Sequence[str] = DEFAULT_SEPARATORS,
+    length: Length = char_length,
+) -> Iterator[tuple[int, int]]:
+    """Lazily yield `(start, end)` offsets of the chunks of `text`."""
+    pieces = _pieces(text, 0, len(text), size, separators, length)
+    return _trimmed(text, _pack(text, pieces, ChunkSpec(size, overlap), length))
+
+
+def chunk_offsets(
+    text: str,
+    size: int,
+    overlap: int,
+    separators: Sequence[str] = DEFAULT_SEPARATORS,
+    length: Length = char_length,
+    limit: int | None = None,
+) -> np.ndarray:
+    """Return chunk offsets as an `(n, 2)` int64 array, keeping at most `limit` chunks."""
+    spans = []
+    for span in iter_chunks(text, size, overlap, separators, length):
+        if limit is not None and len(spans) >= limit:
+            break
+        spans.append(span)
+    return np.asarray(spans, dtype="int64").reshape(-1, 2)
+
+
+def chunk_layouts(
+    text: str,
+    specs: dict[str, ChunkSpec],
+    separators: Sequence[str] = DEFAULT_SEPARATORS,
+    length: Length = char_length,
+) -> dict[str, np.ndarray]:
+    """Chunk `text` at several sizes from one separator pass; returns name -> `(n, 2)` offsets.
+
+    The text is split once into pieces that fit the smallest size, and each
+    layout packs those same pieces up to its own size.
+    """
+    if not specs:
+        return {}
+    smallest = min(spec.size for spec in specs.values())
+    pieces = list(_pieces(text, 0, len(text), smallest, separators, length))
+    return {
+        name: np.asarray(list(_trimmed(text, _pack(text, pieces, spec, length))), dtype="int64").reshape(-1, 2)
+        for name, spec in specs.items()
+    }
+
+
+def slice_chunks(text: str, offsets: np.ndarray) -> list[str]:
+    """Materialize chunk strings for `(n, 2)` offsets."""
+    return [text[start:end] for start, end in offsets.tolist()]
@@ -12,8 +12,115 @@ class Settings(BaseSettings):
     ENV: str = "local"  # local|prod
     API_PREFIX: str = "/api"
     MAX_UPLOAD_MB: int = 20
+    # Artifact store root; relative paths are resolved against backend/ (see storage.py)
+    STORAGE_DIR: str = "storage"
+    # Delete documents not accessed for this many days (0 keeps them forever)
+    STORAGE_RETENTION_DAYS: int = 0
+    STORAGE_GC_INTERVAL_MINUTES: int = 60
+    MAX_PDF_PAGES: int = 500
+    # Pages per extraction task sent to the CPU pool
+    PDF_PAGES_PER_TASK: int = 16
+    # Parse, extract and chunk during upload; identical uploads reuse prior artifacts
+    FUSED_INGEST: bool = False
     GEMINI_API_KEY: str = Field(default="", repr=False)
     LLM_MODEL: str = "gemini-2.5-flash"
 
+    # Model backends: gemini, or offline stand-ins (fake LLM, hashing embeddings)
+    LLM_PROVIDER: str = "gemini"  # gemini|fake
+    EMBEDDING_PROVIDER: str = "gemini"  # gemini|hashing
+    FAKE_LLM_LATENCY_MS: int = 200
+    FAKE_LLM_TOKENS_PER_SECOND: float = 200.0
+    LOCAL_EMBEDDING_DIM: int = 384
+    # Gemini client transport ("grpc" or "rest"; empty keeps the SDK default)
+    GEMINI_TRANSPORT: str = ""
+    # Concurrent embedding requests across all threads
+    EMBEDDING_MAX_CONCURRENCY: int = 4
+
+    # LLM call scheduling (0 disables the RPM/TPM limit)
+    LLM_MAX_CONCURRENCY: int = 4
+    LLM_RPM: int = 60
+    LLM_TPM: int = 1_000_000
+    LLM_MAX_RETRIES: int = 4
+    LLM_RETRY_BASE_SECONDS: float = 1.0
+
+    # Max estimated tokens of chunk summaries fed into a single reduce call
+    SUMMARY_REDUCE_TOKEN_BUDGET: int = 12_000
+
+    # LLM response cache (storage/cache/llm_cache.sqlite3)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MEMORY_ITEMS: int = 1024
+    LLM_CACHE_MAX_MB: int = 256
+    LLM_CACHE_TTL_DAYS: int = 30
+
+    # Chunk embeddings (cached in storage/cache/embeddings.sqlite3)
+    EMBEDDING_MODEL: str = "models/gemini-embedding-001"
+    EMBEDDING_BATCH_SIZE: int = 100
+    EMBEDDING_CACHE_ENABLED: bool = True
+
+    # Question embeddings: LRU size and micro-batching window for concurrent /ask calls
+    QUERY_EMBED_CACHE_ITEMS: int = 4096
+    QUERY_EMBED_BATCH_WINDOW_MS: int = 10
+    QUERY_EMBED_MAX_BATCH: int = 64
+
+    # Executors for blocking work: threads for I/O, processes (or threads) for PDF parsing
+    IO_WORKERS: int = 8
+    CPU_WORKERS: int = 0  # 0 = os.cpu_count()
+    CPU_EXECUTOR: str = "process"  # process|thread
+
+    # Batch ingest: documents per request and per-stage worker counts
+    BATCH_MAX_DOCUMENTS: int = 1000
+    BATCH_EXTRACT_CONCURRENCY: int = 2
+    BATCH_INDEX_CONCURRENCY: int = 2
+    BATCH_SUMMARIZE_CONCURRENCY: int = 2
+    # How long a partial cross-document embedding batch waits for more chunks
+    BATCH_EMBED_LINGER_MS: int = 50
+
+    # Background job workers (storage/jobs.sqlite3); a running job whose process stops
+    # renewing its lease for JOB_LEASE_SECONDS is retried, up to JOB_MAX_ATTEMPTS claims.
+    # Finished jobs are deleted JOB_RETENTION_HOURS after they end (by storage maintenance).
+    JOB_WORKERS: int = 2
+    JOB_LEASE_SECONDS: float = 60.0
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETENTION_HOURS: float = 24.0
+
+    # Shared cross-document index (storage/corpus); switches to IVF above the threshold
+    CORPUS_INDEX_ENABLED: bool = False
+    CORPUS_IVF_THRESHOLD: int = 50_000
+    CORPUS_IVF_NPROBE: int = 16
+
+    # /ask retrieval: max top_k, the token budget for packed context and the minimum
+    # BM25 match strength (fraction of a perfect match) for a lexical hit to count
+    ASK_MAX_TOP_K: int = 20
+    ASK_CONTEXT_TOKENS: int = 3000
+    ASK_MIN_LEXICAL_SCORE: float = 0.2
+
+    # Semantic /ask answer cache: a question whose embedding is this cosine-similar
+    # to a cached one (same document and options) gets the cached answer
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_ITEMS: int = 2048
+    ANSWER_CACHE_THRESHOLD: float = 0.95
+
+    # Admission control: per-endpoint concurrency and wait-queue sizes by priority class,
+    # per-client rate limit (0 = off). ADMISSION_CLIENT_HEADER identifies clients behind
+    # a proxy, e.g. "X-Forwarded-For"; by default the socket peer address is used.
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_HEAVY_CONCURRENCY: int = 4
+    ADMISSION_HEAVY_QUEUE: int = 16
+    ADMISSION_INTERACTIVE_CONCURRENCY: int = 32
+    ADMISSION_INTERACTIVE_QUEUE: int = 128
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 30.0
+    ADMISSION_CLIENT_HEADER: str = ""
+    RATE_LIMIT_PER_MINUTE: int = 300
+    RATE_LIMIT_BURST: int = 60
+
+    # Observability: /metrics, optional OpenTelemetry spans, per-request profiling
+    OTEL_TRACING_ENABLED: bool = False
+    PROFILING_ENABLED: bool = False
+    PROFILING_HEADER: str = "X-Profile"
+    PROFILING_INTERVAL_MS: float = 1.0
+
+    # Memory budget for loaded vector indexes kept in-process
+    INDEX_CACHE_MAX_MB: int = 512
+
 
 settings = Settings()
\ No newline at end of file
@@ -0,0 +1,60 @@
+"""Token-budgeted context assembly for question answering."""
+
+from __future__ import annotations
+
+from typing import Callable, List, Sequence, Tuple
+
+from .scheduler import estimate_tokens
+
+
+def pack_context(
+    hits: Sequence[Tuple[int, float]],
+    spans: Sequence[Tuple[int, int]] | None,
+    chunk_text: Callable[[int], str],
+    budget_tokens: int,
+) -> List[dict]:
+    """Merge overlapping/adjacent hits into continuous spans and pack them into a budget.
+
+    `hits` are `(chunk_id, score)` with higher scores better. Overlapping text
+    between neighbouring chunks is emitted once. Spans are taken best-first
+    until `budget_tokens` is used; the last span is truncated to fit. Returns
+    dicts with `chunk_ids`, `text`, `score` and `tokens`, in the order taken.
+    """
+    def span_of(chunk_id: int) -> Tuple[int, int]:
+        if spans is None or chunk_id >= len(spans):
+            return (-1, -1)
+        return tuple(int(x) for x in spans[chunk_id])
+
+    located = sorted(hits, key=lambda h: span_of(h[0])[0] if span_of(h[0])[0] >= 0 else float("inf"))
+
+    merged: List[dict] = []
+    for chunk_id, score in located:
+        start, end = span_of(chunk_id)
+        text = chunk_text(chunk_id)
+        last = merged[-1] if merged else None
+        if last is not None and start >= 0 and last["start"] >= 0 and start <= last["end"]:
+            if end > last["end"]:
+                last["text"] += text[last["end"] - start:]
+                last["end"] = end
+            last["chunk_ids"].append(chunk_id)
+            last["score"] = max(last["score"], score)
+            continue
+        merged.append({"chunk_ids": [chunk_id], "text": text, "score": score, "start": start, "end": end})
+
+    packed: List[dict] = []
+    remaining = budget_tokens
+    for span in sorted(merged, key=lambda m: m["score"], reverse=True):
+        text = span["text"].strip()
+        if not text:
+            continue
+        tokens = estimate_tokens(text)
+        if tokens > remaining:
+            if remaining < 50:
+                break
+            text = text[: remaining * 4].rsplit(" ", 1)[0]
+            tokens = estimate_tokens(text)
+        packed.append({"chunk_ids": span["chunk_ids"], "text": text, "score": span["score"], "tokens": tokens})
+        remaining -= tokens
+        if remaining <= 0:
+            break
+    return packed
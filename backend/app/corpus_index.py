@@ -0,0 +1,259 @@
+"""Shared cross-document vector index with per-chunk metadata and filtered search."""
+
+from __future__ import annotations
+
+import math
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List
+
+import faiss
+import numpy as np
+
+from .config import settings
+from .storage import storage_path
+from .utils import content_id, ensure_dir, file_lock
+
+
+class CorpusIndex:
+    """One FAISS index over every indexed document.
+
+    Vectors live in a flat L2 index until the corpus reaches `ivf_threshold`
+    vectors, after which it is rebuilt as an IVF index. Chunk metadata
+    (document_id, chunk_id, text) and the raw vectors are kept in SQLite, keyed
+    by the FAISS vector id, so documents can be added, removed or re-trained
+    incrementally and searches can be restricted to a subset of documents.
+
+    Several processes may share the directory: mutations hold a file lock
+    around reload, update and persist, so no writer overwrites another's
+    vectors, and an index file that disagrees with SQLite is rebuilt from it.
+    """
+
+    def __init__(self, base_dir: Path, ivf_threshold: int = 50_000, nprobe: int = 16):
+        ensure_dir(base_dir)
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self._index_path = base_dir / "corpus.faiss"
+        self._lock_path = base_dir / "corpus.lock"
+        self._db = sqlite3.connect(str(base_dir / "corpus.sqlite3"), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " vector_id INTEGER PRIMARY KEY AUTOINCREMENT, document_id TEXT NOT NULL,"
+            " chunk_id INTEGER NOT NULL, text TEXT NOT NULL, vector BLOB NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS chunks_document ON chunks(document_id)")
+        self._lock = threading.RLock()
+        self._index: faiss.Index | None = None
+        self._loaded_mtime: int | None = None
+
+    # --- persistence ---
+
+    def _maybe_reload(self) -> None:
+        """(Re)load the FAISS file if another process rewrote it since we last read it."""
+        try:
+            mtime = os.stat(self._index_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._loaded_mtime:
+            self._index = faiss.read_index(str(self._index_path))
+            self._loaded_mtime = mtime
+
+    def _reload_for_write(self) -> None:
+        """Reload under the file lock and rebuild if the index lost rows that SQLite has."""
+        self._maybe_reload()
+        if self._index is None:
+            return
+        count = self._db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        if self._index.ntotal != count:
+            self._rebuild(self._index.d)
+            self._persist()
+
+    def _persist(self) -> None:
+        tmp = self._index_path.with_suffix(".tmp")
+        faiss.write_index(self._index, str(tmp))
+        os.replace(tmp, self._index_path)
+        self._loaded_mtime = os.stat(self._index_path).st_mtime_ns
+
+    @property
+    def is_ivf(self) -> bool:
+        return self._index is not None and isinstance(faiss.downcast_index(self._index), faiss.IndexIVF)
+
+    def _build(self, dim: int, total: int) -> faiss.Index:
+        """Create an empty index suited to `total` vectors (trained if IVF)."""
+        if total < self.ivf_threshold:
+            return faiss.IndexIDMap2(faiss.IndexFlatL2(dim))
+        nlist = max(1, int(4 * math.sqrt(total)))
+        index = faiss.IndexIVFFlat(faiss.IndexFlatL2(dim), dim, nlist)
+        rows = self._db.execute("SELECT vector FROM chunks").fetchall()
+        train = np.frombuffer(b"".join(r[0] for r in rows), dtype="float32").reshape(-1, dim)
+        index.train(train)
+        index.nprobe = self.nprobe
+        return index
+
+    def _rebuild(self, dim: int) -> None:
+        """Rebuild the index from the vectors stored in SQLite."""
+        rows = self._db.execute("SELECT vector_id, vector FROM chunks").fetchall()
+        self._index = self._build(dim, len(rows))
+        if rows:
+            ids = np.array([r[0] for r in rows], dtype="int64")
+            vectors = np.frombuffer(b"".join(r[1] for r in rows), dtype="float32").reshape(-1, dim)
+            self._index.add_with_ids(vectors, ids)
+
+    # --- mutations ---
+
+    def add_document(self, document_id: str, texts: List[str], vectors: List[List[float]]) -> dict:
+        """Replace a document's chunks in the corpus with the given texts and vectors.
+
+        Updates are applied as a diff: chunks whose text is unchanged keep their
+        FAISS vectors (only their position is updated), vanished chunks are
+        removed and only new chunks are added. Returns the diff counts.
+        Vectors of a different dimension (an earlier embedding model) are
+        dropped from the corpus, since they can no longer be searched.
+        """
+        if not texts:
+            return {"added": 0, "kept": 0, "removed": self.remove_document(document_id)}
+        matrix = np.asarray(vectors, dtype="float32")
+        with self._lock, file_lock(self._lock_path):
+            self._reload_for_write()
+            dim = matrix.shape[1]
+            if self._index is not None and self._index.d != dim:
+                # The embedding model changed: drop vectors of the old dimension and start over.
+                self._db.execute("DELETE FROM chunks WHERE length(vector) != ?", (dim * 4,))
+                self._index = None
+            existing: dict[str, list[int]] = {}
+            for vector_id, text in self._db.execute(
+                "SELECT vector_id, text FROM chunks WHERE document_id = ? ORDER BY vector_id", (document_id,)
+            ).fetchall():
+                existing.setdefault(content_id(text), []).append(vector_id)
+
+            self._db.execute("BEGIN")
+            kept: list[tuple[int, int]] = []
+            added_ids: list[int] = []
+            added_rows: list[int] = []
+            for chunk_id, (text, vec) in enumerate(zip(texts, matrix)):
+                matches = existing.get(content_id(text))
+                if matches:
+                    kept.append((chunk_id, matches.pop(0)))
+                    continue
+                cur = self._db.execute(
+                    "INSERT INTO chunks (document_id, chunk_id, text, vector) VALUES (?, ?, ?, ?)",
+                    (document_id, chunk_id, text, vec.tobytes()),
+                )
+                added_ids.append(cur.lastrowid)
+                added_rows.append(chunk_id)
+            self._db.executemany("UPDATE chunks SET chunk_id = ? WHERE vector_id = ?", kept)
+            stale = [vector_id for ids in existing.values() for vector_id in ids]
+            self._db.executemany("DELETE FROM chunks WHERE vector_id = ?", [(i,) for i in stale])
+            self._db.execute("COMMIT")
+
+            total = self._db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+            rebuild = self._index is None or (not self.is_ivf and total >= self.ivf_threshold)
+            if rebuild:
+                self._rebuild(dim)
+            else:
+                if stale:
+                    self._index.remove_ids(np.array(stale, dtype="int64"))
+                if added_ids:
+                    self._index.add_with_ids(matrix[added_rows], np.array(added_ids, dtype="int64"))
+            if rebuild or stale or added_ids:
+                self._persist()
+        return {"added": len(added_ids), "kept": len(kept), "removed": len(stale)}
+
+    def _remove_rows(self, document_id: str) -> int:
+        ids = [r[0] for r in self._db.execute(
+            "SELECT vector_id FROM chunks WHERE document_id = ?", (document_id,)
+        ).fetchall()]
+        if ids:
+            if self._index is not None:
+                self._index.remove_ids(np.array(ids, dtype="int64"))
+            self._db.execute("DELETE FROM chunks WHERE document_id = ?", (document_id,))
+        return len(ids)
+
+    def remove_document(self, document_id: str) -> int:
+        """Remove all of a document's chunks; returns how many were removed."""
+        with self._lock, file_lock(self._lock_path):
+            self._reload_for_write()
+            removed = self._remove_rows(document_id)
+            if removed and self._index is not None:
+                self._persist()
+            return removed
+
+    # --- queries ---
+
+    def search(self, vector: List[float], k: int, document_ids: List[str] | None = None) -> list[dict]:
+        """Return the `k` nearest chunks, optionally restricted to `document_ids` (empty = none)."""
+        if document_ids is not None and not document_ids:
+            return []
+        with self._lock:
+            self._maybe_reload()
+            if self._index is None or self._index.ntotal == 0:
+                return []
+            if len(vector) != self._index.d:
+                raise ValueError(
+                    f"Corpus index holds {self._index.d}-dimensional vectors but the embedding model produces "
+                    f"{len(vector)}. Run /api/index again for the documents to search."
+                )
+
+            params = None
+            if document_ids is not None:
+                placeholders = ",".join("?" * len(document_ids))
+                allowed = [r[0] for r in self._db.execute(
+                    f"SELECT vector_id FROM chunks WHERE document_id IN ({placeholders})", document_ids
+                ).fetchall()]
+                if not allowed:
+                    return []
+                selector = faiss.IDSelectorBatch(np.array(allowed, dtype="int64"))
+                if self.is_ivf:
+                    params = faiss.SearchParametersIVF(sel=selector, nprobe=self.nprobe)
+                else:
+                    params = faiss.SearchParameters(sel=selector)
+
+            query = np.asarray([vector], dtype="float32")
+            distances, ids = self._index.search(query, k, params=params)
+
+            hits = [(int(i), float(d)) for i, d in zip(ids[0], distances[0]) if i != -1]
+            if not hits:
+                return []
+            placeholders = ",".join("?" * len(hits))
+            rows = {
+                r[0]: r for r in self._db.execute(
+                    f"SELECT vector_id, document_id, chunk_id, text FROM chunks WHERE vector_id IN ({placeholders})",
+                    [i for i, _ in hits],
+                ).fetchall()
+            }
+        return [
+            {"document_id": rows[i][1], "chunk_id": rows[i][2], "text": rows[i][3], "score": d}
+            for i, d in hits
+            if i in rows
+        ]
+
+    def snapshot(self) -> dict:
+        """Return corpus size and index type."""
+        with self._lock:
+            self._maybe_reload()
+            documents = self._db.execute("SELECT COUNT(DISTINCT document_id) FROM chunks").fetchone()[0]
+            return {
+                "vectors": int(self._index.ntotal) if self._index is not None else 0,
+                "documents": documents,
+                "index_type": "ivf" if self.is_ivf else "flat",
+            }
+
+
+_corpus: CorpusIndex | None = None
+
+
+def get_corpus_index() -> CorpusIndex | None:
+    """Return the shared corpus index, or None when it is disabled."""
+    global _corpus
+    if not settings.CORPUS_INDEX_ENABLED:
+        return None
+    if _corpus is None:
+        _corpus = CorpusIndex(
+            storage_path("corpus"),
+            ivf_threshold=settings.CORPUS_IVF_THRESHOLD,
+            nprobe=settings.CORPUS_IVF_NPROBE,
+        )
+    return _corpus
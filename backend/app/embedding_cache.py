@@ -0,0 +1,117 @@
+"""Persistent embedding cache keyed by hash(model, chunk text)."""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+from array import array
+from pathlib import Path
+from typing import Iterable, List
+
+from langchain_core.embeddings import Embeddings
+
+from .storage import storage_path
+from .utils import ensure_dir
+
+
+def embedding_key(model: str, text: str) -> str:
+    """Return the content hash used to address one embedding."""
+    return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """SQLite table of float32 vectors stored as compact little-endian blobs."""
+
+    _LOOKUP_BATCH = 500
+
+    def __init__(self, db_path: Path):
+        ensure_dir(db_path.parent)
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, dim INTEGER NOT NULL, vector BLOB NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "provider_calls": 0}
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, List[float]]:
+        """Look up many keys at once and return the vectors that were found."""
+        keys = list(keys)
+        found: dict[str, List[float]] = {}
+        with self._lock:
+            for i in range(0, len(keys), self._LOOKUP_BATCH):
+                batch = keys[i:i + self._LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    vec = array("f")
+                    vec.frombytes(blob)
+                    found[key] = vec.tolist()
+        return found
+
+    def put_many(self, items: dict[str, List[float]]) -> None:
+        """Insert or replace vectors in a single transaction."""
+        rows = [(k, len(v), array("f", v).tobytes()) for k, v in items.items()]
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.executemany("INSERT OR REPLACE INTO embeddings (key, dim, vector) VALUES (?, ?, ?)", rows)
+            self._db.execute("COMMIT")
+
+    def snapshot(self) -> dict:
+        """Return hit/miss counters and hit rate for chunk embeddings."""
+        stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends cache misses to the provider, in batches."""
+
+    def __init__(self, inner: Embeddings, model: str, store: EmbeddingStore, batch_size: int = 100):
+        self.inner = inner
+        self.model = model
+        self.store = store
+        self.batch_size = max(1, batch_size)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, reusing cached vectors and batching the misses."""
+        keys = [embedding_key(self.model, t) for t in texts]
+        vectors = self.store.get_many(set(keys))
+
+        missing: dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+        misses = sum(1 for k in keys if k in missing)
+        self.store.stats["hits"] += len(texts) - misses
+        self.store.stats["misses"] += misses
+
+        miss_keys = list(missing)
+        for i in range(0, len(miss_keys), self.batch_size):
+            batch = miss_keys[i:i + self.batch_size]
+            embedded = self.inner.embed_documents([missing[k] for k in batch])
+            self.store.stats["provider_calls"] += 1
+            new = dict(zip(batch, embedded))
+            self.store.put_many(new)
+            vectors.update(new)
+
+        return [vectors[k] for k in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a search query (queries use a different task type, so no caching here)."""
+        return self.inner.embed_query(text)
+
+
+_store: EmbeddingStore | None = None
+
+
+def get_embedding_store() -> EmbeddingStore:
+    """Return the process-wide embedding store."""
+    global _store
+    if _store is None:
+        _store = EmbeddingStore(storage_path("cache", "embeddings.sqlite3"))
+    return _store
@@ -0,0 +1,121 @@
+"""Thread and process pools for running blocking work off the event loop."""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+from .config import settings
+
+
+class InstrumentedExecutor:
+    """Wraps a concurrent.futures executor and tracks queue depth and utilization."""
+
+    def __init__(self, name: str, factory: Callable[[int], Executor], workers: int):
+        self.name = name
+        self.workers = max(1, workers)
+        self._factory = factory
+        self._executor: Executor | None = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._busy_since = time.monotonic()
+        self._busy_seconds = 0.0
+        self._started = time.monotonic()
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0}
+
+    def _get(self) -> Executor:
+        if self._executor is None:
+            self._executor = self._factory(self.workers)
+        return self._executor
+
+    def _account(self, delta: int) -> None:
+        """Integrate busy worker-seconds, then adjust the in-flight count."""
+        now = time.monotonic()
+        with self._lock:
+            self._busy_seconds += min(self._in_flight, self.workers) * (now - self._busy_since)
+            self._busy_since = now
+            self._in_flight += delta
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run `fn(*args, **kwargs)` in the pool and await its result."""
+        loop = asyncio.get_running_loop()
+        call = functools.partial(fn, *args, **kwargs)
+        self.stats["submitted"] += 1
+        self._account(+1)
+        try:
+            result = await loop.run_in_executor(self._get(), call)
+        except BaseException:
+            self.stats["failed"] += 1
+            raise
+        finally:
+            self._account(-1)
+        self.stats["completed"] += 1
+        return result
+
+    def snapshot(self) -> dict:
+        """Return queue depth, current and lifetime utilization, and counters."""
+        self._account(0)
+        with self._lock:
+            in_flight = self._in_flight
+            busy_seconds = self._busy_seconds
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        return {
+            **self.stats,
+            "workers": self.workers,
+            "in_flight": in_flight,
+            "queue_depth": max(0, in_flight - self.workers),
+            "utilization": min(in_flight, self.workers) / self.workers,
+            "avg_utilization": busy_seconds / (self.workers * elapsed),
+        }
+
+    def shutdown(self) -> None:
+        """Shut the underlying pool down; it is recreated lazily if used again."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+def _cpu_pool(workers: int) -> Executor:
+    if settings.CPU_EXECUTOR == "thread":
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cpu")
+    # Spawn (not fork) so children never inherit gRPC channels or SQLite handles.
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+io_executor = InstrumentedExecutor(
+    "io",
+    lambda n: ThreadPoolExecutor(max_workers=n, thread_name_prefix="io"),
+    settings.IO_WORKERS,
+)
+cpu_executor = InstrumentedExecutor("cpu", _cpu_pool, settings.CPU_WORKERS or os.cpu_count() or 1)
+
+
+async def run_io(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run blocking I/O (disk, network SDK calls) on the thread pool.
+
+    The caller's context variables (e.g. the active trace) are carried into the thread.
+    """
+    return await io_executor.run(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+async def run_cpu(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run CPU-bound work on the process pool; `fn` and args must be picklable."""
+    return await cpu_executor.run(fn, *args, **kwargs)
+
+
+def executor_snapshot() -> dict:
+    """Return metrics for both pools."""
+    return {"io": io_executor.snapshot(), "cpu": cpu_executor.snapshot()}
+
+
+def shutdown_executors() -> None:
+    """Shut down both pools (called from the app lifespan)."""
+    io_executor.shutdown()
+    cpu_executor.shutdown()
@@ -0,0 +1,160 @@
+"""Parallel, page-cached PDF text extraction."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import AsyncIterator, Tuple
+
+from .config import settings
+from .executors import run_cpu, run_io
+from .pdf_utils import count_pdf_pages, extract_page_range
+from .storage import storage_path
+from .telemetry import span
+from .utils import ensure_dir
+
+
+def file_sha256(path: str | Path) -> str:
+    """Hash a file's bytes in 1 MB blocks."""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+class PageCache:
+    """SQLite cache of per-page text keyed by (file hash, page number)."""
+
+    def __init__(self, db_path: Path):
+        ensure_dir(db_path.parent)
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " file_hash TEXT NOT NULL, page_no INTEGER NOT NULL, text TEXT NOT NULL,"
+            " PRIMARY KEY (file_hash, page_no))"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS files (file_hash TEXT PRIMARY KEY, total_pages INTEGER NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    def total_pages(self, file_hash: str) -> int | None:
+        with self._lock:
+            row = self._db.execute("SELECT total_pages FROM files WHERE file_hash = ?", (file_hash,)).fetchone()
+        return row[0] if row else None
+
+    def set_total_pages(self, file_hash: str, total_pages: int) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO files (file_hash, total_pages) VALUES (?, ?)", (file_hash, total_pages)
+            )
+
+    def get_pages(self, file_hash: str, stop: int) -> dict[int, str]:
+        """Return cached text for pages `[0, stop)` of a file."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT page_no, text FROM pages WHERE file_hash = ? AND page_no < ?", (file_hash, stop)
+            ).fetchall()
+        return dict(rows)
+
+    def put_pages(self, file_hash: str, start: int, texts: list[str]) -> None:
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "INSERT OR REPLACE INTO pages (file_hash, page_no, text) VALUES (?, ?, ?)",
+                [(file_hash, start + i, t) for i, t in enumerate(texts)],
+            )
+            self._db.execute("COMMIT")
+
+
+_page_cache: PageCache | None = None
+
+
+def get_page_cache() -> PageCache:
+    """Return the process-wide page text cache."""
+    global _page_cache
+    if _page_cache is None:
+        _page_cache = PageCache(storage_path("cache", "pages.sqlite3"))
+    return _page_cache
+
+
+async def pdf_page_count(pdf_path: Path, file_hash: str) -> int:
+    """Return the page count of a PDF, cached by file hash."""
+    cache = get_page_cache()
+    total = await run_io(cache.total_pages, file_hash)
+    if total is None:
+        total = await run_cpu(count_pdf_pages, str(pdf_path))
+        await run_io(cache.set_total_pages, file_hash, total)
+    return total
+
+
+def _missing_ranges(cached: dict[int, str], stop: int, size: int) -> list[tuple[int, int]]:
+    """Group uncached page numbers below `stop` into contiguous ranges of at most `size`."""
+    ranges: list[tuple[int, int]] = []
+    start = None
+    for page_no in range(stop + 1):
+        missing = page_no < stop and page_no not in cached
+        if missing and start is None:
+            start = page_no
+        if start is not None and (not missing or page_no - start == size):
+            ranges.append((start, page_no))
+            start = page_no if missing else None
+    return ranges
+
+
+async def iter_pdf_pages(pdf_path: Path, max_pages: int, file_hash: str | None = None
+                         ) -> AsyncIterator[Tuple[int, str]]:
+    """Yield `(page_no, text)` for the first `max_pages` pages as they become available.
+
+    Cached pages are yielded first; the rest are extracted in page ranges spread
+    across the CPU pool and yielded in completion order (not page order).
+    """
+    file_hash = file_hash or await run_io(file_sha256, pdf_path)
+    total_pages = await pdf_page_count(pdf_path, file_hash)
+    stop = min(total_pages, max_pages)
+
+    cache = get_page_cache()
+    cached = await run_io(cache.get_pages, file_hash, stop)
+    for page_no in sorted(cached):
+        yield page_no, cached[page_no]
+
+    async def extract_range(start: int, end: int) -> Tuple[int, list[str]]:
+        return start, await run_cpu(extract_page_range, str(pdf_path), start, end)
+
+    ranges = _missing_ranges(cached, stop, settings.PDF_PAGES_PER_TASK)
+    tasks = [asyncio.ensure_future(extract_range(start, end)) for start, end in ranges]
+    try:
+        for done in asyncio.as_completed(tasks):
+            start, texts = await done
+            await run_io(cache.put_pages, file_hash, start, texts)
+            for i, text in enumerate(texts):
+                yield start + i, text
+    finally:
+        for t in tasks:
+            t.cancel()
+
+
+async def extract_pdf_text(pdf_path: Path, max_pages: int, file_hash: str | None = None
+                           ) -> Tuple[str, int, int]:
+    """Extract text in parallel and return `(text, pages_processed, total_pages)`.
+
+    Raises ValueError if the PDF exceeds the configured page cap.
+    """
+    with span("extract") as attrs:
+        file_hash = file_hash or await run_io(file_sha256, pdf_path)
+        total_pages = await pdf_page_count(pdf_path, file_hash)
+        if total_pages > settings.MAX_PDF_PAGES:
+            raise ValueError(f"PDF must be {settings.MAX_PDF_PAGES} pages or fewer.")
+
+        pages: dict[int, str] = {}
+        async for page_no, text in iter_pdf_pages(pdf_path, max_pages, file_hash=file_hash):
+            pages[page_no] = text
+
+        text = "\n\n".join(pages[i] for i in sorted(pages) if pages[i]).strip()
+        attrs.update(pages=len(pages), text_chars=len(text))
+    return text, len(pages), total_pages
@@ -0,0 +1,108 @@
+"""Process-wide LRU cache of loaded vector indexes with a memory budget."""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+from .config import settings
+
+
+class IndexCache:
+    """Thread-safe LRU keyed by document id, bounded by estimated resident bytes.
+
+    Concurrent misses for the same key share a single load; invalidation bumps
+    a per-key generation so a load racing with a rebuild is never cached.
+    """
+
+    def __init__(self, max_bytes: int, sizeof: Callable[[Any], int]):
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._entries: OrderedDict[str, tuple[Any, int]] = OrderedDict()
+        self._loading: dict[str, threading.Lock] = {}
+        self._generation: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.resident_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "loads": 0, "evictions": 0, "invalidations": 0}
+
+    def get_or_load(self, key: str, loader: Callable[[], Any]) -> Any:
+        """Return the cached value for `key`, loading it at most once concurrently."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[0]
+            self.stats["misses"] += 1
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Another thread may have finished loading while we waited.
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    return entry[0]
+                generation = self._generation.get(key, 0)
+
+            try:
+                value = loader()
+                size = self._sizeof(value)
+            except BaseException:
+                with self._lock:
+                    self._loading.pop(key, None)
+                raise
+
+            # Publish the entry and retire the key lock together, so no caller
+            # can find neither and start a second load.
+            with self._lock:
+                self._loading.pop(key, None)
+                self.stats["loads"] += 1
+                if self._generation.get(key, 0) == generation and size <= self.max_bytes:
+                    self._entries[key] = (value, size)
+                    self.resident_bytes += size
+                    self._evict()
+            return value
+
+    def _evict(self) -> None:
+        while self.resident_bytes > self.max_bytes and self._entries:
+            _, (_, size) = self._entries.popitem(last=False)
+            self.resident_bytes -= size
+            self.stats["evictions"] += 1
+
+    def invalidate(self, key: str) -> None:
+        """Drop `key` and discard any load of it that is currently in flight."""
+        with self._lock:
+            self._generation[key] = self._generation.get(key, 0) + 1
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.resident_bytes -= entry[1]
+            self.stats["invalidations"] += 1
+
+    def snapshot(self) -> dict:
+        """Return counters, hit rate and resident bytes."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+            stats["resident_bytes"] = self.resident_bytes
+            stats["max_bytes"] = self.max_bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+def index_bytes(index) -> int:
+    """Return the bytes a loaded index reports via its `nbytes` attribute."""
+    return index.nbytes
+
+
+_index_cache: IndexCache | None = None
+
+
+def get_index_cache() -> IndexCache:
+    """Return the process-wide index cache configured from settings."""
+    global _index_cache
+    if _index_cache is None:
+        _index_cache = IndexCache(settings.INDEX_CACHE_MAX_MB * 1024 * 1024, index_bytes)
+    return _index_cache
@@ -0,0 +1,85 @@
+"""Fused single-pass ingest: hash, parse, extract and chunk each upload once."""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from .storage import get_store, storage_path
+from .utils import ensure_dir
+
+
+class IngestRegistry:
+    """SQLite map from upload content hash to the document that owns its artifacts."""
+
+    def __init__(self, db_path: Path):
+        ensure_dir(db_path.parent)
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " document_id TEXT PRIMARY KEY, content_hash TEXT NOT NULL, size_bytes INTEGER NOT NULL,"
+            " total_pages INTEGER NOT NULL, pages_processed INTEGER NOT NULL, text_length INTEGER NOT NULL,"
+            " created REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS documents_hash ON documents(content_hash)")
+        self._lock = threading.Lock()
+
+    def find_by_hash(self, content_hash: str) -> dict | None:
+        """Return the most recent document ingested with this content hash."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM documents WHERE content_hash = ? ORDER BY created DESC LIMIT 1",
+                (content_hash,),
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def get(self, document_id: str) -> dict | None:
+        """Return the ingest record of a document, if it was ingested in fused mode."""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM documents WHERE document_id = ?", (document_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def record(self, document_id: str, content_hash: str, size_bytes: int, total_pages: int,
+               pages_processed: int, text_length: int) -> None:
+        """Insert or replace the ingest record of a document."""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO documents (document_id, content_hash, size_bytes, total_pages,"
+                " pages_processed, text_length, created) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (document_id, content_hash, size_bytes, total_pages, pages_processed, text_length, time.time()),
+            )
+
+    def stage(self, document_id: str, content_hash: str, size_bytes: int) -> None:
+        """Record an upload whose text is extracted later; `total_pages` 0 marks it as not yet extracted."""
+        self.record(document_id, content_hash, size_bytes, 0, 0, 0)
+
+    def forget(self, document_id: str) -> None:
+        """Drop a document's record (e.g. when its artifacts are gone)."""
+        with self._lock:
+            self._db.execute("DELETE FROM documents WHERE document_id = ?", (document_id,))
+
+
+def artifacts_present(record: dict) -> bool:
+    """Return True if the upload and (non-empty) extracted text of a record still exist."""
+    document_id = record["document_id"]
+    store = get_store()
+    if store.blob_path(document_id, "upload") is None:
+        return False
+    if record["text_length"] and not store.has_text(document_id, "text"):
+        return False
+    return True
+
+
+_registry: IngestRegistry | None = None
+
+
+def get_ingest_registry() -> IngestRegistry:
+    """Return the process-wide ingest registry."""
+    global _registry
+    if _registry is None:
+        _registry = IngestRegistry(storage_path("ingest.sqlite3"))
+    return _registry
@@ -0,0 +1,321 @@
+"""Local background job queue for pipeline stages, persisted in SQLite."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable
+
+from .config import settings
+from .storage import storage_path
+from .batch import run_batch
+from .pipeline import extract_document, index_document, summarize_document
+from .utils import ensure_dir, generate_document_id
+
+logger = logging.getLogger("app.jobs")
+
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+# Runner signature: (document_id, params, progress) -> JSON-serializable result.
+Runner = Callable[[str, dict, Callable[[str, int, int], None]], Awaitable[dict]]
+
+
+class JobQueue:
+    """Bounded pool of asyncio workers draining jobs recorded in SQLite.
+
+    Identical queued/running jobs (same kind, document and params) are
+    deduplicated, and jobs are claimed atomically so several app processes
+    can share one database file.
+
+    A claimed job holds a lease that its process renews every third of
+    `lease_seconds`. Jobs whose lease expired (their process crashed or was
+    killed) are requeued by whichever process notices first, up to
+    `max_attempts` claims; after that they fail.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        runners: dict[str, Runner],
+        workers: int = 2,
+        lease_seconds: float = 60.0,
+        max_attempts: int = 3,
+    ):
+        self.runners = runners
+        self.workers = max(1, workers)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+        ensure_dir(db_path.parent)
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, kind TEXT NOT NULL, document_id TEXT NOT NULL,"
+            " params TEXT NOT NULL, dedupe_key TEXT NOT NULL, status TEXT NOT NULL,"
+            " stage TEXT, done INTEGER NOT NULL DEFAULT 0, total INTEGER NOT NULL DEFAULT 0,"
+            " result TEXT, error TEXT, created REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if "lease_until" not in columns:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN lease_until REAL")
+            self._db.execute("ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_dedupe ON jobs(dedupe_key, status)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status_updated ON jobs(status, updated)")
+        self._lock = threading.Lock()
+        self._queue: asyncio.Queue[str] | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._changed: dict[str, asyncio.Event] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._running: set[str] = set()
+
+    # --- lifecycle ---
+
+    async def start(self) -> None:
+        """Start the workers and the lease keeper; re-enqueue queued jobs and ones whose lease expired."""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._requeue_expired()
+        with self._lock:
+            rows = self._db.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created").fetchall()
+        for row in rows:
+            self._queue.put_nowait(row["id"])
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._keep_leases()))
+
+    async def stop(self) -> None:
+        """Cancel the worker tasks; this process's running jobs are returned to the queue."""
+        running = list(self._running)
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        with self._lock:
+            self._db.executemany(
+                "UPDATE jobs SET status = 'queued', lease_until = NULL, attempts = MAX(attempts - 1, 0)"
+                " WHERE id = ? AND status = 'running'",
+                [(job_id,) for job_id in running],
+            )
+
+    # --- public API ---
+
+    def submit(self, kind: str, document_id: str, params: dict | None = None) -> dict:
+        """Enqueue a job, or return the identical job that is already pending."""
+        if kind not in self.runners:
+            raise ValueError(f"Unknown job kind: {kind}")
+        params = params or {}
+        dedupe_key = json.dumps([kind, document_id, params], sort_keys=True)
+        now = time.time()
+        with self._lock:
+            # A running job whose lease expired is dead; don't hand it out.
+            existing = self._db.execute(
+                "SELECT * FROM jobs WHERE dedupe_key = ?"
+                " AND (status = 'queued' OR (status = 'running' AND lease_until >= ?))",
+                (dedupe_key, now),
+            ).fetchone()
+            if existing is not None:
+                return self._to_dict(existing)
+            job_id = generate_document_id()
+            self._db.execute(
+                "INSERT INTO jobs (id, kind, document_id, params, dedupe_key, status, created, updated)"
+                " VALUES (?, ?, ?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, document_id, json.dumps(params), dedupe_key, now, now),
+            )
+        self._queue.put_nowait(job_id)
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> dict | None:
+        """Return the job as a dict, or None if the id is unknown."""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    async def events(self, job_id: str, poll_seconds: float = 1.0) -> AsyncIterator[dict]:
+        """Yield the job each time it changes, ending after a terminal status."""
+        last = None
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                return
+            snapshot = (job["status"], job["stage"], job["done"], job["total"])
+            if snapshot != last:
+                last = snapshot
+                yield job
+            if job["status"] in TERMINAL_STATUSES:
+                self._changed.pop(job_id, None)
+                return
+            event = self._changed.setdefault(job_id, asyncio.Event())
+            try:
+                # The poll fallback picks up changes made by other processes.
+                await asyncio.wait_for(event.wait(), timeout=poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            event.clear()
+
+    def prune(self, max_age_seconds: float) -> int:
+        """Delete succeeded and failed jobs that ended more than `max_age_seconds` ago; return how many."""
+        cutoff = time.time() - max_age_seconds
+        with self._lock:
+            return self._db.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated < ?", (*TERMINAL_STATUSES, cutoff)
+            ).rowcount
+
+    def snapshot(self) -> dict:
+        """Return job counts by status plus the local queue depth."""
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        counts = {row["status"]: row["n"] for row in rows}
+        return {"workers": self.workers, "queue_depth": self._queue.qsize() if self._queue else 0, **counts}
+
+    # --- internals ---
+
+    def _to_dict(self, row: sqlite3.Row) -> dict:
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job.pop("dedupe_key", None)
+        job["message"] = f"{job['stage']} {job['done']}/{job['total']}" if job["stage"] else None
+        return job
+
+    def _update(self, job_id: str, **fields) -> None:
+        fields["updated"] = time.time()
+        columns = ", ".join(f"{k} = ?" for k in fields)
+        with self._lock:
+            self._db.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+        # Progress may be reported from executor threads.
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._notify, job_id)
+
+    def _notify(self, job_id: str) -> None:
+        event = self._changed.get(job_id)
+        if event is not None:
+            event.set()
+
+    def _requeue_expired(self) -> list[str]:
+        """Requeue running jobs whose lease expired (or fail them after `max_attempts`); return requeued ids."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute(
+                    "SELECT id, attempts FROM jobs WHERE status = 'running'"
+                    " AND (lease_until IS NULL OR lease_until < ?)",
+                    (now,),
+                ).fetchall()
+                requeued = [row["id"] for row in rows if row["attempts"] < self.max_attempts]
+                exhausted = [row["id"] for row in rows if row["attempts"] >= self.max_attempts]
+                self._db.executemany(
+                    "UPDATE jobs SET status = 'queued', lease_until = NULL, updated = ? WHERE id = ?",
+                    [(now, job_id) for job_id in requeued],
+                )
+                self._db.executemany(
+                    "UPDATE jobs SET status = 'failed', error = ?, lease_until = NULL, updated = ? WHERE id = ?",
+                    [(f"Worker lost {self.max_attempts} times; giving up.", now, job_id) for job_id in exhausted],
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        if requeued or exhausted:
+            logger.warning("Requeued %d and failed %d jobs with expired leases", len(requeued), len(exhausted))
+        return requeued
+
+    async def _keep_leases(self) -> None:
+        """Renew the leases of this process's running jobs and requeue jobs abandoned by dead processes."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                with self._lock:
+                    self._db.executemany(
+                        "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = 'running'",
+                        [(time.time() + self.lease_seconds, job_id) for job_id in self._running],
+                    )
+                for job_id in self._requeue_expired():
+                    self._queue.put_nowait(job_id)
+            except sqlite3.Error:
+                logger.exception("Job lease renewal failed")
+
+    def _claim(self, job_id: str) -> sqlite3.Row | None:
+        now = time.time()
+        with self._lock:
+            claimed = self._db.execute(
+                "UPDATE jobs SET status = 'running', updated = ?, lease_until = ?, attempts = attempts + 1"
+                " WHERE id = ? AND status = 'queued'",
+                (now, now + self.lease_seconds, job_id),
+            ).rowcount
+            if not claimed:
+                return None
+            return self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            row = self._claim(job_id)
+            if row is None:
+                continue
+            self._running.add(job_id)
+            self._notify(job_id)
+
+            def progress(stage: str, done: int, total: int, job_id: str = job_id) -> None:
+                self._update(job_id, stage=stage, done=done, total=total)
+
+            try:
+                result = await self.runners[row["kind"]](row["document_id"], json.loads(row["params"]), progress)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("Job %s (%s) failed", job_id, row["kind"])
+                self._update(job_id, status="failed", error=str(e))
+            else:
+                self._update(job_id, status="succeeded", result=json.dumps(result))
+            finally:
+                self._running.discard(job_id)
+
+
+async def _run_extract(document_id: str, params: dict, progress) -> dict:
+    return await extract_document(document_id, max_pages=params["max_pages"])
+
+
+async def _run_summarize(document_id: str, params: dict, progress) -> dict:
+    return await summarize_document(document_id, progress=progress)
+
+
+async def _run_index(document_id: str, params: dict, progress) -> dict:
+    return await index_document(document_id, progress=progress)
+
+
+async def _run_batch(batch_id: str, params: dict, progress) -> dict:
+    return await run_batch(
+        params["document_ids"],
+        max_pages=params["max_pages"],
+        summarize=params["summarize"],
+        index=params["index"],
+        progress=progress,
+    )
+
+
+_job_queue: JobQueue | None = None
+
+
+def get_job_queue() -> JobQueue:
+    """Return the process-wide job queue (started from the app lifespan)."""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(
+            storage_path("jobs.sqlite3"),
+            runners={
+                "extract": _run_extract,
+                "summarize": _run_summarize,
+                "index": _run_index,
+                "batch": _run_batch,
+            },
+            workers=settings.JOB_WORKERS,
+            lease_seconds=settings.JOB_LEASE_SECONDS,
+            max_attempts=settings.JOB_MAX_ATTEMPTS,
+        )
+    return _job_queue
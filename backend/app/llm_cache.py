@@ -0,0 +1,143 @@
+"""Content-addressed cache for LLM completions (in-memory LRU + SQLite)."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from .config import settings
+from .storage import storage_path
+from .utils import ensure_dir
+
+
+def make_cache_key(model: str | None, temperature: float | None, messages: list) -> str:
+    """Hash the model, temperature and fully rendered prompt messages into a key."""
+    payload = json.dumps(
+        {
+            "model": model,
+            "temperature": temperature,
+            "messages": [[m.type, m.content] for m in messages],
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Two-tier completion cache with LRU memory tier and TTL/size-bounded disk tier."""
+
+    def __init__(self, db_path: Path, memory_items: int = 1024, max_bytes: int = 256 * 1024 * 1024,
+                 ttl_seconds: float = 30 * 86400):
+        self.memory_items = memory_items
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._memory: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+        ensure_dir(db_path.parent)
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache(accessed)")
+
+    def _remember(self, key: str, value: str) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> str | None:
+        """Return the cached completion for `key`, or None on a miss."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return self._memory[key]
+
+            now = time.time()
+            row = self._db.execute(
+                "SELECT value, created FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                self.stats["misses"] += 1
+                return None
+
+            self._db.execute("UPDATE llm_cache SET accessed = ? WHERE key = ?", (now, key))
+            self._remember(key, row[0])
+            self.stats["disk_hits"] += 1
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        """Store a completion in both tiers, evicting old entries periodically."""
+        with self._lock:
+            now = time.time()
+            self._remember(key, value)
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), now, now),
+            )
+            self.stats["writes"] += 1
+            self._writes_since_evict += 1
+            if self._writes_since_evict >= 100:
+                self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        """Drop expired rows, then least-recently-used rows until under `max_bytes`."""
+        self._writes_since_evict = 0
+        removed = self._db.execute(
+            "DELETE FROM llm_cache WHERE created < ?", (now - self.ttl_seconds,)
+        ).rowcount
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total > self.max_bytes:
+            excess = total - self.max_bytes
+            rows = self._db.execute("SELECT key, size FROM llm_cache ORDER BY accessed").fetchall()
+            doomed = []
+            for key, size in rows:
+                if excess <= 0:
+                    break
+                doomed.append((key,))
+                excess -= size
+            self._db.executemany("DELETE FROM llm_cache WHERE key = ?", doomed)
+            for (key,) in doomed:
+                self._memory.pop(key, None)
+            removed += len(doomed)
+        self.stats["evictions"] += max(removed, 0)
+
+    def snapshot(self) -> dict:
+        """Return hit/miss counters plus the derived hit rate."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_items"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+
+_cache: LLMCache | None = None
+
+
+def get_llm_cache() -> LLMCache | None:
+    """Return the process-wide LLM cache, or None when caching is disabled."""
+    global _cache
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = LLMCache(
+            storage_path("cache", "llm_cache.sqlite3"),
+            memory_items=settings.LLM_CACHE_MEMORY_ITEMS,
+            max_bytes=settings.LLM_CACHE_MAX_MB * 1024 * 1024,
+            ttl_seconds=settings.LLM_CACHE_TTL_DAYS * 86400,
+        )
+    return _cache
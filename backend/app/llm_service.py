@@ -1,76 +1,322 @@
 """LLM and summarization helpers."""
 
-from langchain_google_genai import ChatGoogleGenerativeAI
+import asyncio
+from typing import AsyncIterator, Callable
+
 from langchain_core.prompts import ChatPromptTemplate
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 
+from .chunking import chunk_offsets, slice_chunks
 from .config import settings
+from .llm_cache import get_llm_cache, make_cache_key
+from .providers import get_llm
+from .scheduler import estimate_tokens, gather_ordered, get_scheduler
+from .telemetry import span
+from .utils import content_id
 
-
-def get_llm():
-    """Return a configured Gemini chat model instance."""
-    if not settings.GEMINI_API_KEY:
-        raise ValueError("GEMINI_API_KEY is missing in backend/.env")
-
-    return ChatGoogleGenerativeAI(
-        model=settings.LLM_MODEL,
-        google_api_key=settings.GEMINI_API_KEY,
-        temperature=0.2,
-    )
+# Progress callback: (stage, done, total), e.g. ("map", 5, 12).
+Progress = Callable[[str, int, int], None]
 
 
 def chunk_text(text: str, chunk_size: int, chunk_overlap: int) -> list[str]:
     """Split long text into overlapping chunks for map-reduce summarization."""
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-    )
-    return splitter.split_text(text)
-
-
-async def summarize_text(text: str) -> tuple[str, dict]:
-    """Summarize extracted text and return `(summary, metadata)`."""
-    llm = get_llm()
-
-    CHUNK_SIZE = 6000
-    CHUNK_OVERLAP = 400
-
-    chunks = chunk_text(text, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
-
-    MAX_CHUNKS = 12
-    truncated = len(chunks) > MAX_CHUNKS
-    if truncated:
-        chunks = chunks[:MAX_CHUNKS]
-
-    map_prompt = ChatPromptTemplate.from_messages([
-        ("system", "You are a helpful assistant that summarizes documents clearly and concisely."),
-        ("human", "Summarize this chunk in 5-8 bullet points.\n\nChunk:\n{text}"),
-    ])
-
-    reduce_prompt = ChatPromptTemplate.from_messages([
-        ("system", "You are a helpful assistant that writes a final summary from chunk summaries."),
-        (
-            "human",
-            "Combine the following chunk summaries into ONE final summary in bullet points.\n\n"
-            "Include:\n"
-            "- Key points (5-10 bullets)\n"
-            "- Important dates/numbers (if any)\n"
-            "- Action items (if any)\n\n"
-            "Chunk summaries:\n{summaries}"
-        ),
-    ])
-
-    chunk_summaries = []
-    for c in chunks:
-        res = await (map_prompt | llm).ainvoke({"text": c})
-        chunk_summaries.append(res.content.strip())
-
-    final = await (reduce_prompt | llm).ainvoke({"summaries": "\n\n".join(chunk_summaries)})
-    summary = final.content.strip()
+    return slice_chunks(text, chunk_offsets(text, chunk_size, chunk_overlap))
+
+
+async def cached_completion(prompt: ChatPromptTemplate, llm, inputs: dict, stage: str = "llm") -> str:
+    """Return the stripped completion for `prompt`, serving repeats from the LLM cache.
+
+    Cache misses go through the shared scheduler so they respect rate limits.
+    The call is traced as `llm.<stage>`.
+    """
+    messages = prompt.format_messages(**inputs)
+    est_tokens = sum(estimate_tokens(str(m.content)) for m in messages)
+    with span(f"llm.{stage}", prompt_tokens=est_tokens) as attrs:
+        cache = get_llm_cache()
+        key = None
+        if cache is not None:
+            key = make_cache_key(getattr(llm, "model", None), getattr(llm, "temperature", None), messages)
+            cached = cache.get(key)
+            attrs["cache_hit"] = cached is not None
+            if cached is not None:
+                return cached
+
+        res = await get_scheduler().submit(lambda: llm.ainvoke(messages), est_tokens=est_tokens)
+        content = res.content.strip()
+        attrs["completion_tokens"] = estimate_tokens(content)
+
+        if cache is not None:
+            cache.set(key, content)
+        return content
+
+
+async def stream_completion(
+    prompt: ChatPromptTemplate, llm, inputs: dict, stage: str = "llm"
+) -> AsyncIterator[str]:
+    """Stream completion text for `prompt` as it is generated.
+
+    A cache hit is yielded as a single piece; a miss holds one scheduler slot
+    while streaming and caches the full completion once it finishes. The call
+    is traced as `llm.<stage>`.
+    """
+    messages = prompt.format_messages(**inputs)
+    est_tokens = sum(estimate_tokens(str(m.content)) for m in messages)
+    with span(f"llm.{stage}", prompt_tokens=est_tokens) as attrs:
+        cache = get_llm_cache()
+        key = None
+        if cache is not None:
+            key = make_cache_key(getattr(llm, "model", None), getattr(llm, "temperature", None), messages)
+            cached = cache.get(key)
+            attrs["cache_hit"] = cached is not None
+            if cached is not None:
+                yield cached
+                return
+
+        parts: list[str] = []
+        async with get_scheduler().slot(est_tokens):
+            async for chunk in llm.astream(messages):
+                if chunk.content:
+                    parts.append(chunk.content)
+                    yield chunk.content
+
+        content = "".join(parts).strip()
+        attrs["completion_tokens"] = estimate_tokens(content)
+        if cache is not None:
+            cache.set(key, content)
+
+
+MAP_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "You are a helpful assistant that summarizes documents clearly and concisely."),
+    ("human", "Summarize this chunk in 5-8 bullet points.\n\nChunk:\n{text}"),
+])
+
+# Intermediate reduce levels condense batches of summaries without imposing the final layout.
+COMBINE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "You are a helpful assistant that condenses partial summaries of one document."),
+    (
+        "human",
+        "Combine the following partial summaries into ONE concise bullet-point summary. "
+        "Keep key points, important dates/numbers and action items.\n\n"
+        "Partial summaries:\n{summaries}"
+    ),
+])
+
+REDUCE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "You are a helpful assistant that writes a final summary from chunk summaries."),
+    (
+        "human",
+        "Combine the following chunk summaries into ONE final summary in bullet points.\n\n"
+        "Include:\n"
+        "- Key points (5-10 bullets)\n"
+        "- Important dates/numbers (if any)\n"
+        "- Action items (if any)\n\n"
+        "Chunk summaries:\n{summaries}"
+    ),
+])
+
+
+def group_by_token_budget(items: list[str], budget: int) -> list[list[str]]:
+    """Group consecutive items into batches whose estimated tokens fit `budget`.
+
+    Always returns fewer groups than items (when there is more than one item),
+    so repeated grouping is guaranteed to converge on a single batch.
+    """
+    groups: list[list[str]] = []
+    current: list[str] = []
+    used = 0
+    for item in items:
+        cost = estimate_tokens(item)
+        if current and used + cost > budget:
+            groups.append(current)
+            current, used = [], 0
+        current.append(item)
+        used += cost
+    if current:
+        groups.append(current)
+
+    if len(items) > 1 and len(groups) == len(items):
+        # Every item alone exceeds the budget; pair them up to keep making progress.
+        groups = [items[i:i + 2] for i in range(0, len(items), 2)]
+    return groups
+
+
+CHUNK_SIZE = 6000
+CHUNK_OVERLAP = 400
+
+
+class SummaryMemo:
+    """Nodes of a document's previous summary tree, keyed by a hash of each node's input.
+
+    Passing the memo of the previous run makes re-summarization incremental:
+    map calls for unchanged chunks and reduce calls whose inputs are all
+    unchanged are reused, so only changed leaves and their ancestors hit the
+    LLM. `nodes` holds the tree of the current run once it finishes; persist
+    it for the next run.
+    """
+
+    def __init__(self, model: str | None, previous: dict | None = None):
+        self.fingerprint = content_id(
+            f"{model}|{CHUNK_SIZE}|{CHUNK_OVERLAP}|"
+            + "|".join(str(p.messages) for p in (MAP_PROMPT, COMBINE_PROMPT, REDUCE_PROMPT))
+        )
+        same = previous is not None and previous.get("fingerprint") == self.fingerprint
+        self._previous: dict[str, str] = previous["nodes"] if same else {}
+        self.nodes: dict[str, str] = {}
+        self.reused = 0
+
+    @staticmethod
+    def key(stage: str, text: str) -> str:
+        return content_id(f"{stage}:{text}")
+
+    def get(self, key: str) -> str | None:
+        value = self._previous.get(key)
+        if value is not None:
+            self.nodes[key] = value
+            self.reused += 1
+        return value
+
+    def put(self, key: str, value: str) -> None:
+        self.nodes[key] = value
+
+    def to_dict(self) -> dict:
+        return {"fingerprint": self.fingerprint, "nodes": self.nodes}
+
+
+async def _memoized(memo: SummaryMemo | None, stage: str, prompt: ChatPromptTemplate, llm, inputs: dict,
+                    key_text: str) -> str:
+    """Run one summary-tree node, reusing its output from `memo` when the input is unchanged."""
+    if memo is None:
+        return await cached_completion(prompt, llm, inputs, stage=stage)
+    key = memo.key(stage, key_text)
+    result = memo.get(key)
+    if result is None:
+        result = await cached_completion(prompt, llm, inputs, stage=stage)
+        memo.put(key, result)
+    return result
+
+
+async def _map_and_combine(
+    text: str, llm, progress: Progress | None, memo: SummaryMemo | None = None, chunks: list[str] | None = None
+) -> tuple[list[str], dict]:
+    """Run the map step and intermediate reduce levels; return the final level and meta.
+
+    The returned summaries fit into one reduce prompt; `meta` counts the calls
+    and levels so far (the final reduce is added by the caller).
+    """
+    done = {"map": 0, "reduce": 0}
+
+    async def tracked(stage: str, total: int, prompt: ChatPromptTemplate, inputs: dict) -> str:
+        result = await _memoized(memo, stage, prompt, llm, inputs, next(iter(inputs.values())))
+        done[stage] += 1
+        if progress is not None:
+            progress(stage, done[stage], total)
+        return result
+
+    if chunks is None:
+        chunks = chunk_text(text, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+
+    level = await gather_ordered(tracked("map", len(chunks), MAP_PROMPT, {"text": c}) for c in chunks)
+    llm_calls = len(chunks)
+    depth = 0
+
+    while len(level) > 1:
+        batches = group_by_token_budget(level, settings.SUMMARY_REDUCE_TOKEN_BUDGET)
+        if len(batches) == 1:
+            break
+        done["reduce"] = 0
+        level = await gather_ordered(
+            tracked("reduce", len(batches), COMBINE_PROMPT, {"summaries": "\n\n".join(b)}) for b in batches
+        )
+        llm_calls += len(batches)
+        depth += 1
 
     meta = {
         "chunks_used": len(chunks),
         "chunk_size": CHUNK_SIZE,
-        "truncated": truncated,
+        "truncated": False,
+        "tree_depth": depth + 1,
+        "llm_calls": llm_calls + 1,
+        "llm_calls_reused": 0,
     }
-    return summary, meta
\ No newline at end of file
+    return level, meta
+
+
+async def summarize_text(
+    text: str,
+    llm=None,
+    progress: Progress | None = None,
+    memo: SummaryMemo | None = None,
+    chunks: list[str] | None = None,
+) -> tuple[str, dict]:
+    """Summarize extracted text and return `(summary, metadata)`.
+
+    Chunk summaries (the map step) run concurrently through the shared LLM
+    scheduler and are then reduced as a tree: batches that fit the reduce
+    token budget are combined concurrently, level by level, until one final
+    reduce call remains. Every call is served from the LLM cache when the
+    same prompt was completed before. Pass `llm` to substitute a chat model,
+    `progress` to be told `(stage, done, total)` as each call finishes and the
+    previous run's `memo` to only redo the parts of the tree whose input changed.
+    `chunks` are the text's precomputed `CHUNK_SIZE` chunks, if the caller has them.
+    """
+    llm = llm or get_llm()
+    with span("summarize", text_chars=len(text)) as attrs:
+        level, meta = await _map_and_combine(text, llm, progress, memo, chunks)
+        joined = "\n\n".join(level)
+        summary = await _memoized(memo, "final", REDUCE_PROMPT, llm, {"summaries": joined}, joined)
+        if memo is not None:
+            meta["llm_calls_reused"] = memo.reused
+        attrs.update(chunks=meta["chunks_used"], llm_calls=meta["llm_calls"], reused=meta["llm_calls_reused"])
+    if progress is not None:
+        progress("reduce", 1, 1)
+    return summary, meta
+
+
+async def stream_summary(
+    text: str, llm=None, memo: SummaryMemo | None = None, chunks: list[str] | None = None
+) -> AsyncIterator[dict]:
+    """Summarize text, yielding progress events, then final-reduce tokens, then the result.
+
+    Events are dicts: `{"type": "progress", "stage", "done", "total"}`,
+    `{"type": "token", "text"}` and finally `{"type": "done", "summary", "meta"}`.
+    The first event is map progress `0` of the chunk count, sent before any
+    LLM call starts.
+    """
+    llm = llm or get_llm()
+    if chunks is None:
+        chunks = chunk_text(text, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    yield {"type": "progress", "stage": "map", "done": 0, "total": len(chunks)}
+    events: asyncio.Queue[dict] = asyncio.Queue()
+
+    def progress(stage: str, done: int, total: int) -> None:
+        events.put_nowait({"type": "progress", "stage": stage, "done": done, "total": total})
+
+    task = asyncio.ensure_future(_map_and_combine(text, llm, progress, memo, chunks))
+    try:
+        while not task.done() or not events.empty():
+            getter = asyncio.ensure_future(events.get())
+            await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                yield getter.result()
+            else:
+                getter.cancel()
+        level, meta = task.result()
+    finally:
+        task.cancel()
+
+    joined = "\n\n".join(level)
+    key = memo.key("final", joined) if memo is not None else None
+    reused = memo.get(key) if memo is not None else None
+    if reused is not None:
+        yield {"type": "token", "text": reused}
+        summary = reused
+    else:
+        parts: list[str] = []
+        async for token in stream_completion(REDUCE_PROMPT, llm, {"summaries": joined}, stage="final"):
+            parts.append(token)
+            yield {"type": "token", "text": token}
+        summary = "".join(parts).strip()
+        if memo is not None:
+            memo.put(key, summary)
+    if memo is not None:
+        meta["llm_calls_reused"] = memo.reused
+    yield {"type": "done", "summary": summary, "meta": meta}
@@ -1,17 +1,43 @@
 """FastAPI application entrypoint and route handlers."""
 
+import asyncio
+import hashlib
+import json
 import logging
-from pathlib import Path
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 
-from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from pypdf import PdfReader
+from fastapi.responses import Response, StreamingResponse
 
 from .config import settings
-from .pdf_utils import extract_text_from_pdf
-from .llm_service import summarize_text
-from .utils import ensure_dir, generate_document_id
-from .rag_service import build_and_save_index, answer_question
+from .batch import stage_uploads
+from .executors import executor_snapshot, run_io, shutdown_executors
+from .extraction import pdf_page_count
+from .jobs import get_job_queue
+from .pipeline import (
+    collect_storage,
+    extract_document,
+    index_document,
+    delete_document,
+    ingest_upload,
+    read_extracted_text,
+    stream_summarize_document,
+    summarize_document,
+)
+from .llm_cache import get_llm_cache
+from .index_cache import get_index_cache
+from .answer_cache import get_answer_cache
+from .embedding_cache import get_embedding_store
+from .query_embedder import query_batcher_snapshot
+from .storage import get_store, storage_root
+from .utils import generate_document_id
+from .rag_service import answer_across_documents, answer_question, stream_answer
+from .corpus_index import get_corpus_index
+from .providers import close_clients, get_client_pool, warm_clients
+from .telemetry import TelemetryMiddleware, register_stats, render_metrics, span
+from .admission import AdmissionMiddleware, get_admission_controller
 from .schemas import (
     UploadResponse,
     ExtractRequest,
@@ -22,16 +48,77 @@ from .schemas import (
     IndexResponse, 
     AskRequest, 
     AskResponse, 
+    MultiAskRequest,
+    MultiAskResponse,
+    DeleteResponse,
+    JobRequest,
+    JobResponse,
+    BatchResponse,
 )
 
 logger = logging.getLogger("app")
-MAX_PDF_PAGES = 4
+
+
+def _sse_response(events: AsyncIterator[tuple[str, dict]]) -> StreamingResponse:
+    """Wrap `(event_name, payload)` pairs as a server-sent event stream."""
+
+    async def stream():
+        try:
+            async for name, payload in events:
+                yield f"event: {name}\ndata: {json.dumps(payload)}\n\n"
+        except Exception as e:
+            logger.exception("Event stream failed")
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+async def _typed_events(first: dict, rest: AsyncIterator[dict]) -> AsyncIterator[tuple[str, dict]]:
+    """Name each pipeline event by its `type`, starting with an already-awaited first event."""
+    yield first["type"], first
+    async for event in rest:
+        yield event["type"], event
+
+
+async def _storage_maintenance() -> None:
+    """Periodically apply the retention policies and collect unreferenced blobs."""
+    while True:
+        try:
+            result = await collect_storage()
+            result["jobs_pruned"] = await run_io(get_job_queue().prune, settings.JOB_RETENTION_HOURS * 3600)
+            if any(result.values()):
+                logger.info("Storage maintenance: %s", result)
+        except Exception:
+            logger.exception("Storage maintenance failed")
+        await asyncio.sleep(settings.STORAGE_GC_INTERVAL_MINUTES * 60)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm model clients, start job workers and storage maintenance; stop them on shutdown."""
+    store = get_store()
+    # Pre-store-layout artifacts lived in loose files under ./storage; they are copied, not moved.
+    migrated = await run_io(store.import_legacy_files, storage_root())
+    if migrated:
+        logger.info("Imported %d legacy artifact files into the store", migrated)
+    warm_clients()
+    jobs = get_job_queue()
+    await jobs.start()
+    maintenance = asyncio.create_task(_storage_maintenance())
+    yield
+    maintenance.cancel()
+    await jobs.stop()
+    shutdown_executors()
+    await close_clients()
 
 
 def create_app() -> FastAPI:
     """Create and configure the FastAPI application."""
-    app = FastAPI(title=settings.APP_NAME)
+    app = FastAPI(title=settings.APP_NAME, lifespan=lifespan)
 
+    # Added first so it runs innermost: CORS headers still apply to shed requests,
+    # and telemetry records them.
+    app.add_middleware(AdmissionMiddleware)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=[
@@ -42,12 +129,40 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    app.add_middleware(TelemetryMiddleware)
 
     @app.get("/health")
     def health():
         """Simple health endpoint used by frontend startup checks."""
         return {"ok": True, "env": settings.ENV, "app": settings.APP_NAME}
 
+    @app.get(f"{settings.API_PREFIX}/stats")
+    def stats():
+        """Report cache and executor metrics for capacity planning."""
+        llm_cache = get_llm_cache()
+        answer_cache = get_answer_cache()
+        return {
+            "llm_cache": llm_cache.snapshot() if llm_cache else None,
+            "index_cache": get_index_cache().snapshot(),
+            "answer_cache": answer_cache.snapshot() if answer_cache else None,
+            "embedding_cache": get_embedding_store().snapshot() if settings.EMBEDDING_CACHE_ENABLED else None,
+            "query_embeddings": query_batcher_snapshot(),
+            "executors": executor_snapshot(),
+            "model_clients": get_client_pool().snapshot(),
+            "storage": get_store().snapshot(),
+            "jobs": get_job_queue().snapshot(),
+            "admission": get_admission_controller().snapshot(),
+            "corpus": get_corpus_index().snapshot() if settings.CORPUS_INDEX_ENABLED else None,
+        }
+
+    register_stats(stats)
+
+    @app.get("/metrics")
+    def metrics():
+        """Prometheus scrape endpoint: stage/request histograms plus the /api/stats gauges."""
+        body, content_type = render_metrics()
+        return Response(content=body, media_type=content_type)
+
     @app.post(f"{settings.API_PREFIX}/upload", response_model=UploadResponse)
     async def upload_pdf(file: UploadFile = File(...)):
         """Upload a PDF and return a generated document id."""
@@ -55,16 +170,16 @@ def create_app() -> FastAPI:
             raise HTTPException(status_code=400, detail="Only PDF files are allowed.")
 
         document_id = generate_document_id()
-        uploads_dir = Path("storage/uploads")
-        ensure_dir(uploads_dir)
-        dest_path = uploads_dir / f"{document_id}.pdf"
+        store = get_store()
+        dest_path = store.temp_path(".pdf")
 
         max_bytes = settings.MAX_UPLOAD_MB * 1024 * 1024
         total_bytes = 0
+        hasher = hashlib.sha256()
 
         # Stream to disk to avoid loading full files in memory.
         try:
-            with dest_path.open("wb") as f:
+            with span("upload.write"), dest_path.open("wb") as f:
                 while True:
                     chunk = await file.read(1024 * 1024)
                     if not chunk:
@@ -75,6 +190,7 @@ def create_app() -> FastAPI:
                             status_code=413,
                             detail=f"File too large. Max {settings.MAX_UPLOAD_MB} MB.",
                         )
+                    hasher.update(chunk)
                     f.write(chunk)
         except HTTPException:
             dest_path.unlink(missing_ok=True)
@@ -87,116 +203,196 @@ def create_app() -> FastAPI:
             dest_path.unlink(missing_ok=True)
             raise HTTPException(status_code=400, detail="Uploaded file is empty.")
 
+        content_hash = hasher.hexdigest()
+        if settings.FUSED_INGEST:
+            pdf_path = await run_io(store.put_blob_file, document_id, "upload", dest_path, content_hash)
+            try:
+                ingested = await ingest_upload(document_id, pdf_path, content_hash, total_bytes)
+            except ValueError as e:
+                await run_io(store.delete_document, document_id)
+                raise HTTPException(status_code=400, detail=str(e))
+            return UploadResponse(
+                document_id=ingested["document_id"],
+                filename=file.filename,
+                size_bytes=total_bytes,
+                content_hash=content_hash,
+                pages=ingested["pages"],
+                reused=ingested["reused"],
+            )
+
         try:
-            page_count = len(PdfReader(str(dest_path)).pages)
+            with span("upload.page_count"):
+                page_count = await pdf_page_count(dest_path, content_hash)
         except Exception:
             dest_path.unlink(missing_ok=True)
             raise HTTPException(status_code=400, detail="Invalid or unreadable PDF file.")
 
-        if page_count > MAX_PDF_PAGES:
+        if page_count > settings.MAX_PDF_PAGES:
             dest_path.unlink(missing_ok=True)
             raise HTTPException(
                 status_code=400,
-                detail=f"PDF must be {MAX_PDF_PAGES} pages or fewer.",
+                detail=f"PDF must be {settings.MAX_PDF_PAGES} pages or fewer.",
             )
 
+        await run_io(store.put_blob_file, document_id, "upload", dest_path, content_hash)
         return UploadResponse(
             document_id=document_id,
             filename=file.filename,
             size_bytes=total_bytes,
+            content_hash=content_hash,
+            pages=page_count,
         )
 
     @app.post(f"{settings.API_PREFIX}/extract", response_model=ExtractResponse)
     async def extract_text(req: ExtractRequest):
         """Extract text from an uploaded PDF and persist it for later steps."""
-        pdf_path = Path("storage/uploads") / f"{req.document_id}.pdf"
-        if not pdf_path.exists():
-            raise HTTPException(status_code=404, detail="PDF not found for this document_id.")
-
-        if req.max_pages < 1 or req.max_pages > MAX_PDF_PAGES:
-            raise HTTPException(status_code=400, detail=f"max_pages must be between 1 and {MAX_PDF_PAGES}.")
-
         try:
-            text, pages_processed = extract_text_from_pdf(pdf_path, max_pages=req.max_pages)
+            return await extract_document(req.document_id, max_pages=req.max_pages)
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
 
-        if not text:
-            return ExtractResponse(
-                document_id=req.document_id,
-                pages_processed=pages_processed,
-                text_length=0,
-                preview="",
-                message="No extractable text found (PDF may be scanned/image-based).",
-            )
-
-        texts_dir = Path("storage/text")
-        ensure_dir(texts_dir)
-        (texts_dir / f"{req.document_id}.txt").write_text(text, encoding="utf-8")
-
-        return ExtractResponse(
-            document_id=req.document_id,
-            pages_processed=pages_processed,
-            text_length=len(text),
-            preview=text[:1200],
-        )
-
     @app.post(f"{settings.API_PREFIX}/summarize", response_model=SummarizeResponse)
     async def summarize(req: SummarizeRequest):
         """Generate and persist a summary from previously extracted text."""
-        text_path = Path("storage/text") / f"{req.document_id}.txt"
-        if not text_path.exists():
-            raise HTTPException(
-                status_code=400,
-                detail="Text not found. Run /api/extract first for this document_id.",
-            )
-
-        text = text_path.read_text(encoding="utf-8").strip()
-        if not text:
-            raise HTTPException(status_code=400, detail="Extracted text is empty.")
-
         try:
-            summary, meta = await summarize_text(text)
+            return await summarize_document(req.document_id)
+        except (FileNotFoundError, ValueError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Summarization failed: {str(e)}")
 
-        summary_dir = Path("storage/summary")
-        ensure_dir(summary_dir)
-        (summary_dir / f"{req.document_id}.md").write_text(summary, encoding="utf-8")
-
-        return {
-            "document_id": req.document_id,
-            "summary": summary,
-            "chunks_used": meta["chunks_used"],
-            "chunk_size": meta["chunk_size"],
-            "truncated": meta["truncated"],
-        }
-
     @app.get(f"{settings.API_PREFIX}/summary/{{document_id}}")
     def get_summary(document_id: str):
         """Fetch a saved summary by document id."""
-        p = Path("storage/summary") / f"{document_id}.md"
-        if not p.exists():
+        summary = get_store().get_text(document_id, "summary")
+        if summary is None:
             raise HTTPException(status_code=404, detail="Summary not found.")
-        return {"document_id": document_id, "summary": p.read_text(encoding="utf-8")}
+        return {"document_id": document_id, "summary": summary}
     
     @app.post(f"{settings.API_PREFIX}/index", response_model=IndexResponse)
-    async def index_document(req: IndexRequest):
-        """Build and save a FAISS index for a document."""
+    async def index(req: IndexRequest):
+        """Build and save the vector index for a document."""
         try:
-            chunks_indexed, cfg = build_and_save_index(req.document_id)
+            return await index_document(req.document_id)
         except FileNotFoundError as e:
             raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Indexing failed: {str(e)}")
 
+    @app.post(f"{settings.API_PREFIX}/jobs", response_model=JobResponse, status_code=202)
+    async def create_job(req: JobRequest):
+        """Queue an extract/summarize/index job and return its id immediately."""
+        params = {"max_pages": req.max_pages} if req.kind == "extract" else {}
+        return get_job_queue().submit(req.kind, req.document_id, params)
+
+    @app.post(f"{settings.API_PREFIX}/batch", response_model=BatchResponse, status_code=202)
+    async def create_batch(
+        files: list[UploadFile] = File(...),
+        summarize: bool = Form(False),
+        index: bool = Form(True),
+        max_pages: int = Form(settings.MAX_PDF_PAGES),
+    ):
+        """Store many PDFs (or zips of PDFs) and queue one pipelined batch job for them."""
+        if max_pages < 1 or max_pages > settings.MAX_PDF_PAGES:
+            raise HTTPException(status_code=400, detail=f"max_pages must be between 1 and {settings.MAX_PDF_PAGES}.")
+
+        accepted, rejected = await run_io(
+            stage_uploads, get_store(), [(f.filename or "upload.pdf", f.file) for f in files]
+        )
+        if not accepted:
+            raise HTTPException(status_code=400, detail="No valid PDF files in the batch.")
+
+        job = get_job_queue().submit(
+            "batch",
+            generate_document_id(),
+            {
+                # Duplicate files in one batch share a document id; process it once.
+                "document_ids": list(dict.fromkeys(d["document_id"] for d in accepted)),
+                "max_pages": max_pages,
+                "summarize": summarize,
+                "index": index,
+            },
+        )
+        return {"job": job, "documents": accepted, "rejected": rejected}
+
+    @app.get(f"{settings.API_PREFIX}/jobs/{{job_id}}", response_model=JobResponse)
+    def get_job(job_id: str):
+        """Fetch the status, progress and result of a job."""
+        job = get_job_queue().get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found.")
+        return job
+
+    @app.get(f"{settings.API_PREFIX}/jobs/{{job_id}}/events")
+    async def job_events(job_id: str):
+        """Stream job progress as server-sent events until the job finishes."""
+        queue = get_job_queue()
+        if queue.get(job_id) is None:
+            raise HTTPException(status_code=404, detail="Job not found.")
+
+        return _sse_response((job["status"], job) async for job in queue.events(job_id))
+
+    @app.post(f"{settings.API_PREFIX}/summarize/stream")
+    async def summarize_stream(req: SummarizeRequest):
+        """Stream summarization progress and final-reduce tokens as server-sent events."""
+        try:
+            text = await run_io(read_extracted_text, req.document_id)
+            events = stream_summarize_document(req.document_id, text)
+            first = await events.__anext__()
+        except (FileNotFoundError, ValueError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Summarization failed: {str(e)}")
+        return _sse_response(_typed_events(first, events))
+
+    @app.post(f"{settings.API_PREFIX}/ask/stream")
+    async def ask_stream(req: AskRequest):
+        """Stream the sources and then answer tokens as server-sent events."""
+        events = stream_answer(
+            document_id=req.document_id,
+            question=req.question,
+            top_k=req.top_k,
+            retrieval=req.retrieval,
+        )
+        try:
+            first = await events.__anext__()
+        except (FileNotFoundError, ValueError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Ask failed: {str(e)}")
+        return _sse_response(_typed_events(first, events))
+
+    @app.post(f"{settings.API_PREFIX}/ask/multi", response_model=MultiAskResponse)
+    async def ask_multi(req: MultiAskRequest):
+        """Answer a question over several (or all) indexed documents with one search."""
+        try:
+            answer, sources = await answer_across_documents(
+                question=req.question,
+                document_ids=req.document_ids,
+                top_k=req.top_k,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Ask failed: {str(e)}")
+
         return {
-            "document_id": req.document_id,
-            "chunks_indexed": chunks_indexed,
-            "chunk_size": cfg.chunk_size,
-            "chunk_overlap": cfg.chunk_overlap,
+            "question": req.question,
+            "document_ids": req.document_ids,
+            "answer": answer,
+            "top_k": req.top_k,
+            "sources": sources,
         }
 
+    @app.delete(f"{settings.API_PREFIX}/documents/{{document_id}}", response_model=DeleteResponse)
+    async def delete(document_id: str):
+        """Delete a document's artifacts and remove it from the corpus index."""
+        try:
+            return await delete_document(document_id)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
     @app.post(f"{settings.API_PREFIX}/ask", response_model=AskResponse)
     async def ask_question(req: AskRequest):
@@ -206,6 +402,7 @@ def create_app() -> FastAPI:
                 document_id=req.document_id,
                 question=req.question,
                 top_k=req.top_k,
+                retrieval=req.retrieval,
             )
         except FileNotFoundError as e:
             raise HTTPException(status_code=400, detail=str(e))
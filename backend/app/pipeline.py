@@ -0,0 +1,213 @@
+"""Document pipeline stages shared by the HTTP routes and background jobs.
+
+Stages raise `FileNotFoundError` for missing prerequisites and `ValueError`
+for invalid input; callers map those onto HTTP errors or failed jobs.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import AsyncIterator
+
+from .config import settings
+from .executors import run_io
+from .extraction import extract_pdf_text
+from .ingest import artifacts_present, get_ingest_registry
+from .llm_service import Progress, SummaryMemo, get_llm, stream_summary, summarize_text
+from .rag_service import build_and_save_index, delete_index, save_chunks, summary_chunks
+from .storage import get_store
+from .utils import is_valid_document_id
+
+
+def _extract_result(document_id: str, text: str, pages_processed: int) -> dict:
+    if not text:
+        return {
+            "document_id": document_id,
+            "pages_processed": pages_processed,
+            "text_length": 0,
+            "preview": "",
+            "message": "No extractable text found (PDF may be scanned/image-based).",
+        }
+    return {
+        "document_id": document_id,
+        "pages_processed": pages_processed,
+        "text_length": len(text),
+        "preview": text[:1200],
+    }
+
+
+async def ingest_upload(document_id: str, pdf_path: Path, content_hash: str, size_bytes: int) -> dict:
+    """Fused ingest of a freshly streamed upload.
+
+    If an identical upload (same content hash) still has its artifacts, the new
+    file is dropped and the existing document id is returned. Otherwise the PDF
+    is parsed once, and its text and chunk offsets are persisted in the same pass.
+    """
+    registry = get_ingest_registry()
+    existing = registry.find_by_hash(content_hash)
+    if existing is not None and existing["document_id"] != document_id:
+        if artifacts_present(existing):
+            await run_io(get_store().delete_document, document_id)
+            return {"document_id": existing["document_id"], "reused": True, "pages": existing["total_pages"]}
+        registry.forget(existing["document_id"])
+
+    try:
+        text, pages_processed, total_pages = await extract_pdf_text(
+            pdf_path, settings.MAX_PDF_PAGES, file_hash=content_hash
+        )
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError("Invalid or unreadable PDF file.") from e
+
+    if text:
+        await run_io(get_store().put_text, document_id, "text", text)
+        await run_io(save_chunks, document_id, text)
+
+    registry.record(document_id, content_hash, size_bytes, total_pages, pages_processed, len(text))
+    return {"document_id": document_id, "reused": False, "pages": total_pages}
+
+
+async def extract_document(document_id: str, max_pages: int) -> dict:
+    """Extract text from an uploaded PDF and persist it for later stages."""
+    store = get_store()
+    pdf_path = await run_io(store.blob_path, document_id, "upload")
+    if pdf_path is None:
+        raise FileNotFoundError("PDF not found for this document_id.")
+
+    if max_pages < 1 or max_pages > settings.MAX_PDF_PAGES:
+        raise ValueError(f"max_pages must be between 1 and {settings.MAX_PDF_PAGES}.")
+
+    record = get_ingest_registry().get(document_id) if settings.FUSED_INGEST else None
+    if (
+        record is not None
+        and record["total_pages"]
+        and min(max_pages, record["total_pages"]) == record["pages_processed"]
+    ):
+        # Fused ingest already extracted exactly these pages; skip re-parsing the PDF.
+        if not record["text_length"]:
+            return _extract_result(document_id, "", record["pages_processed"])
+        stored = await run_io(store.get_text, document_id, "text")
+        if stored is not None:
+            return _extract_result(document_id, stored, record["pages_processed"])
+
+    file_hash = record["content_hash"] if record is not None else None
+    text, pages_processed, total_pages = await extract_pdf_text(pdf_path, max_pages, file_hash=file_hash)
+
+    if text:
+        await run_io(store.put_text, document_id, "text", text)
+    if record is not None:
+        get_ingest_registry().record(
+            document_id, record["content_hash"], record["size_bytes"], total_pages, pages_processed, len(text),
+        )
+
+    return _extract_result(document_id, text, pages_processed)
+
+
+def read_extracted_text(document_id: str) -> str:
+    """Return a document's extracted text; raises if it is missing or empty."""
+    text = get_store().get_text(document_id, "text")
+    if text is None:
+        raise FileNotFoundError("Text not found. Run /api/extract first for this document_id.")
+
+    text = text.strip()
+    if not text:
+        raise ValueError("Extracted text is empty.")
+    return text
+
+
+def _load_summary_memo(document_id: str, llm) -> SummaryMemo:
+    stored = get_store().get_text(document_id, "summary_tree")
+    return SummaryMemo(getattr(llm, "model", None), json.loads(stored) if stored else None)
+
+
+def _save_summary(document_id: str, summary: str, memo: SummaryMemo) -> None:
+    store = get_store()
+    store.put_text(document_id, "summary", summary)
+    store.put_text(document_id, "summary_tree", json.dumps(memo.to_dict(), ensure_ascii=False))
+
+
+def _summary_result(document_id: str, summary: str, meta: dict) -> dict:
+    return {
+        "document_id": document_id,
+        "summary": summary,
+        "chunks_used": meta["chunks_used"],
+        "chunk_size": meta["chunk_size"],
+        "truncated": meta["truncated"],
+        "tree_depth": meta["tree_depth"],
+        "llm_calls": meta["llm_calls"],
+        "llm_calls_reused": meta["llm_calls_reused"],
+    }
+
+
+async def summarize_document(document_id: str, progress: Progress | None = None) -> dict:
+    """Summarize previously extracted text and persist the markdown summary.
+
+    The summary tree is kept with the summary, so re-summarizing changed text
+    only re-runs the LLM calls for changed chunks and their ancestors.
+    """
+    text = await run_io(read_extracted_text, document_id)
+    llm = get_llm()
+    memo = await run_io(_load_summary_memo, document_id, llm)
+    chunks = await run_io(summary_chunks, document_id, text)
+    summary, meta = await summarize_text(text, llm=llm, progress=progress, memo=memo, chunks=chunks)
+    await run_io(_save_summary, document_id, summary, memo)
+    return _summary_result(document_id, summary, meta)
+
+
+async def stream_summarize_document(document_id: str, text: str | None = None) -> AsyncIterator[dict]:
+    """Stream summarization events; the final `done` event carries the full response.
+
+    `text` is the already validated extracted text, read here when omitted.
+    Missing or empty text raises before the first event is yielded, and the
+    first event (map progress 0 of n) is yielded before any LLM call.
+    """
+    if text is None:
+        text = await run_io(read_extracted_text, document_id)
+    llm = get_llm()
+    memo = await run_io(_load_summary_memo, document_id, llm)
+    chunks = await run_io(summary_chunks, document_id, text)
+    async for event in stream_summary(text, llm=llm, memo=memo, chunks=chunks):
+        if event["type"] == "done":
+            await run_io(_save_summary, document_id, event["summary"], memo)
+            event = {"type": "done", **_summary_result(document_id, event["summary"], event["meta"])}
+        yield event
+
+
+async def index_document(document_id: str, progress: Progress | None = None) -> dict:
+    """Build and persist the vector index for a document."""
+    chunks_indexed, chunks_reused, cfg = await run_io(build_and_save_index, document_id, progress=progress)
+    return {
+        "document_id": document_id,
+        "chunks_indexed": chunks_indexed,
+        "chunks_reused": chunks_reused,
+        "chunk_size": cfg.chunk_size,
+        "chunk_overlap": cfg.chunk_overlap,
+    }
+
+
+async def delete_document(document_id: str) -> dict:
+    """Delete every artifact of a document, including its corpus index entries."""
+    if not is_valid_document_id(document_id):
+        raise ValueError("Invalid document_id.")
+    await run_io(delete_index, document_id)
+    removed = await run_io(get_store().delete_document, document_id)
+    get_ingest_registry().forget(document_id)
+    return {"document_id": document_id, "removed": removed}
+
+
+async def collect_storage() -> dict:
+    """Apply the retention policy and garbage-collect unreferenced blobs.
+
+    Documents not read or queried for `STORAGE_RETENTION_DAYS` (0 keeps them
+    forever) are deleted with all their artifacts, including indexes.
+    """
+    store = get_store()
+    expired = []
+    if settings.STORAGE_RETENTION_DAYS > 0:
+        expired = await run_io(store.expired_documents, settings.STORAGE_RETENTION_DAYS)
+        for document_id in expired:
+            await delete_document(document_id)
+    reclaimed = await run_io(store.collect_garbage)
+    return {"documents_expired": len(expired), **reclaimed}
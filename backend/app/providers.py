@@ -0,0 +1,308 @@
+"""Pluggable chat-model and embedding backends selected via settings.
+
+`gemini` talks to Google Gemini. The local backends (`fake` LLM, `hashing`
+embeddings) are deterministic and need no network, for load tests, cache
+tests and CI benchmarks.
+
+Clients are long-lived: `get_llm()` and `get_embeddings_client()` hand out
+one shared instance per provider/model/parameters from the process-wide
+`ClientPool`, so gRPC channels, TLS sessions and auth setup are reused across
+requests. The app lifespan warms the pool on startup and closes it on shutdown.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import inspect
+import math
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Hashable, Iterator, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from .config import settings
+
+logger = logging.getLogger("app.providers")
+
+# Calls made to each backend in this process (read by benchmarks).
+call_counts = {"llm": 0, "embedding": 0, "embedded_texts": 0}
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic bag-of-words embeddings via signed feature hashing.
+
+    Each token is hashed into one of `dim` buckets with a hash-derived sign;
+    counts are log-scaled (sublinear tf) and the vector is L2-normalized.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _embed(self, text: str) -> List[float]:
+        vec = [0.0] * self.dim
+        counts: dict[str, int] = {}
+        for token in _WORD_RE.findall(text.lower()):
+            counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vec[bucket] += sign * (1.0 + math.log(count))
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        return [v / norm for v in vec]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        call_counts["embedding"] += 1
+        call_counts["embedded_texts"] += len(texts)
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class FakeChatModel(BaseChatModel):
+    """Offline chat model with configurable latency and token throughput.
+
+    Replies with bullet points built from the first sentences of the last
+    message, so outputs are deterministic and cacheable.
+    """
+
+    model: str = "fake"
+    temperature: float = 0.0
+    latency_seconds: float = 0.2
+    tokens_per_second: float = 200.0
+    max_bullets: int = 5
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        content = str(messages[-1].content) if messages else ""
+        sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+|\n+", content) if len(s.strip()) > 20]
+        bullets = [" ".join(s.split()[:20]) for s in sentences[: self.max_bullets]]
+        return "\n".join(f"- {b}" for b in bullets) or "- (no content)"
+
+    def _tokens(self, text: str) -> List[str]:
+        return re.findall(r"\S+\s*", text)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        call_counts["llm"] += 1
+        reply = self._reply(messages)
+        time.sleep(self.latency_seconds + len(self._tokens(reply)) / self.tokens_per_second)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=reply))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        call_counts["llm"] += 1
+        reply = self._reply(messages)
+        await asyncio.sleep(self.latency_seconds + len(self._tokens(reply)) / self.tokens_per_second)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=reply))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        call_counts["llm"] += 1
+        time.sleep(self.latency_seconds)
+        for token in self._tokens(self._reply(messages)):
+            time.sleep(1 / self.tokens_per_second)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        call_counts["llm"] += 1
+        await asyncio.sleep(self.latency_seconds)
+        for token in self._tokens(self._reply(messages)):
+            await asyncio.sleep(1 / self.tokens_per_second)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+class ClientPool:
+    """Thread-safe registry of long-lived model clients keyed by their configuration."""
+
+    def __init__(self):
+        self._clients: dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+        self.stats = {"created": 0, "reused": 0, "closed": 0}
+
+    def get(self, key: Hashable, factory: Callable[[], Any], usable: Callable[[Any], bool] | None = None) -> Any:
+        """Return the client for `key`, building it with `factory` on first use.
+
+        A pooled client for which `usable` returns False is replaced by a new one.
+        """
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None or (usable is not None and not usable(client)):
+                client = factory()
+                self._clients[key] = client
+                self.stats["created"] += 1
+            else:
+                self.stats["reused"] += 1
+            return client
+
+    async def close(self) -> None:
+        """Close every client's transports and empty the pool."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            await _close_client(client)
+            self.stats["closed"] += 1
+
+    def snapshot(self) -> dict:
+        """Return counters and the number of live clients."""
+        with self._lock:
+            return {**self.stats, "clients": len(self._clients)}
+
+
+async def _close_client(client: Any) -> None:
+    """Close the transports of a client and of the SDK clients it wraps, if it has any.
+
+    Async transports (grpc.aio channels) return a coroutine from `close()`, which is awaited.
+    """
+    for obj in (client, getattr(client, "client", None), getattr(client, "async_client", None)):
+        transport = getattr(obj, "transport", None)
+        close = getattr(transport, "close", None)
+        if callable(close):
+            try:
+                result = close()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                logger.warning("Failed to close %s transport", type(obj).__name__, exc_info=True)
+
+
+_pool = ClientPool()
+
+
+def get_client_pool() -> ClientPool:
+    """Return the process-wide client pool."""
+    return _pool
+
+
+def _gemini_options() -> dict:
+    if not settings.GEMINI_API_KEY:
+        raise ValueError("GEMINI_API_KEY is missing in backend/.env")
+    options: dict[str, Any] = {"google_api_key": settings.GEMINI_API_KEY}
+    if settings.GEMINI_TRANSPORT:
+        options["transport"] = settings.GEMINI_TRANSPORT
+    return options
+
+
+def _event_loop_running() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def get_llm(temperature: float = 0.2):
+    """Return the shared chat model for the configured `LLM_PROVIDER`."""
+    if settings.LLM_PROVIDER == "fake":
+        return _pool.get(
+            ("llm", "fake", settings.FAKE_LLM_LATENCY_MS, settings.FAKE_LLM_TOKENS_PER_SECOND),
+            lambda: FakeChatModel(
+                latency_seconds=settings.FAKE_LLM_LATENCY_MS / 1000,
+                tokens_per_second=settings.FAKE_LLM_TOKENS_PER_SECOND,
+            ),
+        )
+    if settings.LLM_PROVIDER != "gemini":
+        raise ValueError(f"Unknown LLM_PROVIDER: {settings.LLM_PROVIDER}")
+
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    options = _gemini_options()
+    # ChatGoogleGenerativeAI only builds its async client (used by ainvoke and
+    # astream) when created on a running event loop; a client first built in a
+    # worker thread is replaced the next time it is requested on the loop.
+    return _pool.get(
+        ("llm", "gemini", settings.LLM_MODEL, temperature, settings.GEMINI_TRANSPORT),
+        lambda: ChatGoogleGenerativeAI(model=settings.LLM_MODEL, temperature=temperature, **options),
+        usable=lambda llm: llm.async_client is not None or not _event_loop_running(),
+    )
+
+
+def embedding_model_name() -> str:
+    """Return the identifier of the configured embedding model (used in cache keys)."""
+    if settings.EMBEDDING_PROVIDER == "hashing":
+        return f"hashing-{settings.LOCAL_EMBEDDING_DIM}"
+    return settings.EMBEDDING_MODEL
+
+
+def get_embeddings_client() -> Embeddings:
+    """Return the shared raw (uncached) embeddings client for the configured `EMBEDDING_PROVIDER`."""
+    if settings.EMBEDDING_PROVIDER == "hashing":
+        return _pool.get(
+            ("embeddings", "hashing", settings.LOCAL_EMBEDDING_DIM),
+            lambda: HashingEmbeddings(dim=settings.LOCAL_EMBEDDING_DIM),
+        )
+    if settings.EMBEDDING_PROVIDER != "gemini":
+        raise ValueError(f"Unknown EMBEDDING_PROVIDER: {settings.EMBEDDING_PROVIDER}")
+
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+    options = _gemini_options()
+    return _pool.get(
+        ("embeddings", "gemini", settings.EMBEDDING_MODEL, settings.GEMINI_TRANSPORT),
+        lambda: GoogleGenerativeAIEmbeddings(model=settings.EMBEDDING_MODEL, **options),
+    )
+
+
+_embedding_slots = threading.BoundedSemaphore(max(1, settings.EMBEDDING_MAX_CONCURRENCY))
+
+
+@contextmanager
+def embedding_slot() -> Iterator[None]:
+    """Bound concurrent embedding requests across all threads (EMBEDDING_MAX_CONCURRENCY)."""
+    with _embedding_slots:
+        yield
+
+
+def warm_clients() -> None:
+    """Build the configured clients ahead of the first request.
+
+    Called from the app lifespan on the event loop, so chat clients get their
+    async transport.
+    """
+    try:
+        get_llm()
+        get_embeddings_client()
+    except ValueError as e:
+        logger.warning("Model clients not initialized: %s", e)
+
+
+async def close_clients() -> None:
+    """Close all pooled clients (awaited from the app lifespan on shutdown)."""
+    await _pool.close()
@@ -0,0 +1,132 @@
+"""LRU-cached, micro-batched embedding of /ask questions."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+from collections import OrderedDict
+from typing import Callable, List
+
+from .config import settings
+from .executors import run_io
+
+
+def normalize_question(question: str) -> str:
+    """Case-fold and collapse whitespace so trivially different questions share a key."""
+    return " ".join(question.lower().split())
+
+
+class QueryEmbeddingBatcher:
+    """Coalesces concurrent query embeddings into one provider call per window.
+
+    Each caller awaits its own future; identical in-flight questions share one
+    slot in the batch, and finished vectors land in an LRU cache.
+    """
+
+    def __init__(
+        self,
+        embed_many: Callable[[List[str]], List[List[float]]],
+        window_seconds: float = 0.01,
+        max_batch: int = 64,
+        cache_items: int = 4096,
+    ):
+        self._embed_many = embed_many
+        self.window_seconds = window_seconds
+        self.max_batch = max(1, max_batch)
+        self.cache_items = cache_items
+        self._cache: OrderedDict[str, List[float]] = OrderedDict()
+        self._pending: dict[str, list[asyncio.Future]] = {}
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.stats = {"hits": 0, "misses": 0, "batches": 0, "batched_queries": 0}
+
+    async def embed(self, question: str) -> List[float]:
+        """Return the embedding for `question`, waiting at most one batch window."""
+        key = normalize_question(question)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.stats["hits"] += 1
+            return cached
+
+        self.stats["misses"] += 1
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.setdefault(key, []).append(fut)
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._flush)
+        return await fut
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, {}
+        if pending:
+            task = asyncio.ensure_future(self._run_batch(pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            task.add_done_callback(functools.partial(self._settle, pending))
+
+    @staticmethod
+    def _settle(pending: dict[str, list[asyncio.Future]], task: asyncio.Task) -> None:
+        """Resolve waiters the batch left pending, so no /ask hangs on a failed or cancelled batch.
+
+        Runs as a done callback, which also covers a task cancelled before it started.
+        """
+        error = None if task.cancelled() else task.exception()
+        for waiters in pending.values():
+            for fut in waiters:
+                if fut.done():
+                    continue
+                if error is None:
+                    fut.cancel()
+                else:
+                    fut.set_exception(error)
+
+    async def _run_batch(self, pending: dict[str, list[asyncio.Future]]) -> None:
+        keys = list(pending)
+        self.stats["batches"] += 1
+        self.stats["batched_queries"] += len(keys)
+        vectors = await run_io(self._embed_many, keys)
+        for key, vec in zip(keys, vectors):
+            self._cache[key] = vec
+            self._cache.move_to_end(key)
+            for fut in pending[key]:
+                if not fut.done():
+                    fut.set_result(vec)
+        while len(self._cache) > self.cache_items:
+            self._cache.popitem(last=False)
+
+    def snapshot(self) -> dict:
+        """Return cache hit rate and the average batch size."""
+        stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["avg_batch_size"] = stats["batched_queries"] / stats["batches"] if stats["batches"] else 0.0
+        stats["cached_queries"] = len(self._cache)
+        return stats
+
+
+_batcher: QueryEmbeddingBatcher | None = None
+
+
+def get_query_batcher(embed_many: Callable[[List[str]], List[List[float]]]) -> QueryEmbeddingBatcher:
+    """Return the process-wide query batcher, creating it with `embed_many` on first use."""
+    global _batcher
+    if _batcher is None:
+        _batcher = QueryEmbeddingBatcher(
+            embed_many,
+            window_seconds=settings.QUERY_EMBED_BATCH_WINDOW_MS / 1000,
+            max_batch=settings.QUERY_EMBED_MAX_BATCH,
+            cache_items=settings.QUERY_EMBED_CACHE_ITEMS,
+        )
+    return _batcher
+
+
+def query_batcher_snapshot() -> dict | None:
+    """Return batcher stats, or None before the first question was asked."""
+    return _batcher.snapshot() if _batcher is not None else None
@@ -2,23 +2,34 @@
 
 from __future__ import annotations
 
+import hashlib
+import json
+import shutil
+import time
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Tuple
+from typing import AsyncIterator, Callable, List, Tuple
 
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_core.documents import Document
+import numpy as np
 from langchain_core.prompts import ChatPromptTemplate
 
-# Vector store (FAISS)
-from langchain_community.vectorstores import FAISS
-
-# Embeddings (Gemini)
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-
 from .config import settings
-from .utils import ensure_dir
-from .llm_service import get_llm
+from .storage import get_store, storage_path
+from .utils import content_id, ensure_dir
+from .index_cache import get_index_cache
+from .answer_cache import CachedAnswer, get_answer_cache
+from .embedding_cache import CachedEmbeddings, get_embedding_store
+from .providers import embedding_model_name, embedding_slot, get_client_pool, get_embeddings_client
+from .scheduler import estimate_tokens
+from .telemetry import span
+from .query_embedder import get_query_batcher
+from .executors import run_io
+from .corpus_index import get_corpus_index
+from .vector_store import MmapVectorStore, is_vector_store, store_version, swap_in_progress, write_vector_store
+from .bm25 import BM25Index, looks_lexical, reciprocal_rank_fusion
+from .chunking import ChunkSpec, chunk_layouts, slice_chunks
+from .context import pack_context
+from .llm_service import CHUNK_OVERLAP, CHUNK_SIZE, cached_completion, get_llm, stream_completion
 
 
 @dataclass
@@ -30,151 +41,559 @@ class RagConfig:
 
 
 def _get_embeddings():
-    """Create Gemini embeddings client used by FAISS."""
-    if not settings.GEMINI_API_KEY:
-        raise ValueError("GEMINI_API_KEY is missing in backend/.env")
-
-    return GoogleGenerativeAIEmbeddings(
-        google_api_key=settings.GEMINI_API_KEY,
-        model="models/gemini-embedding-001",
+    """Return the shared embeddings client, wrapped in the embedding cache."""
+    embeddings = get_embeddings_client()
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return embeddings
+    return get_client_pool().get(
+        ("cached_embeddings", embedding_model_name(), settings.EMBEDDING_BATCH_SIZE),
+        lambda: CachedEmbeddings(
+            embeddings,
+            model=embedding_model_name(),
+            store=get_embedding_store(),
+            batch_size=settings.EMBEDDING_BATCH_SIZE,
+        ),
     )
 
 
+BM25_FILE = "bm25.json"
+SPANS_FILE = "spans.i64"
+
+
+@dataclass
+class LoadedIndex:
+    """A document's mapped vector store plus its BM25 index and chunk character spans."""
+    store: MmapVectorStore
+    bm25: BM25Index | None
+    spans: np.ndarray | None = None
+
+    @property
+    def nbytes(self) -> int:
+        return self.store.nbytes + (self.bm25.nbytes if self.bm25 is not None else 0)
+
+
+def _embed_queries(questions: List[str]) -> List[List[float]]:
+    """Embed a batch of questions in one provider call using the query task type."""
+    embeddings = _get_embeddings()
+    inner = getattr(embeddings, "inner", embeddings)
+    with embedding_slot():
+        if settings.EMBEDDING_PROVIDER == "gemini":
+            return inner.embed_documents(questions, task_type="retrieval_query")
+        return inner.embed_documents(questions)
+
+
 def _index_dir() -> Path:
     """Return the base directory where vector indexes are stored."""
-    p = Path("storage/index")
+    p = storage_path("index")
     ensure_dir(p)
     return p
 
 
 def _doc_index_path(document_id: str) -> Path:
-    """Return the FAISS directory path for one document."""
+    """Return the vector store directory path for one document."""
     return _index_dir() / document_id
 
 
 def _load_extracted_text(document_id: str) -> str:
     """Load extracted text for a document, raising if missing."""
-    text_path = Path("storage/text") / f"{document_id}.txt"
-    if not text_path.exists():
+    text = get_store().get_text(document_id, "text")
+    if text is None:
         raise FileNotFoundError("Text not found. Run /api/extract first for this document_id.")
-    return text_path.read_text(encoding="utf-8").strip()
+    return text.strip()
 
 
-def _chunk_text(text: str, cfg: RagConfig) -> List[Document]:
-    """Split extracted text into LangChain Documents with chunk metadata."""
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=cfg.chunk_size,
-        chunk_overlap=cfg.chunk_overlap,
-        separators=["\n\n", "\n", ". ", " ", ""],
-    )
-    chunks = splitter.split_text(text)
+def _chunk_layouts(text: str, cfg: RagConfig) -> dict[str, np.ndarray]:
+    """Chunk offsets for the index and the summarizer, computed in one separator pass."""
+    with span("chunk", text_chars=len(text)):
+        layouts = chunk_layouts(
+            text,
+            {
+                "index": ChunkSpec(cfg.chunk_size, cfg.chunk_overlap),
+                "summary": ChunkSpec(CHUNK_SIZE, CHUNK_OVERLAP),
+            },
+        )
+    layouts["index"] = layouts["index"][: cfg.max_chunks]
+    return layouts
+
 
-    if len(chunks) > cfg.max_chunks:
-        chunks = chunks[: cfg.max_chunks]
+def _text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
-    docs: List[Document] = []
-    for i, c in enumerate(chunks):
-        docs.append(Document(page_content=c, metadata={"chunk_id": i}))
-    return docs
 
+def save_chunks(document_id: str, text: str, cfg: RagConfig = RagConfig()) -> int:
+    """Chunk text for indexing and summarization and persist the offsets, tagged with the text hash."""
+    text = text.strip()
+    layouts = _chunk_layouts(text, cfg)
+    _store_layouts(document_id, text, cfg, layouts)
+    return len(layouts["index"])
 
-def build_and_save_index(document_id: str, cfg: RagConfig = RagConfig()) -> Tuple[int, RagConfig]:
-    """Build and persist a FAISS index for a document."""
+
+def _layout_sizes(cfg: RagConfig) -> dict[str, list[int]]:
+    return {
+        "index": [cfg.chunk_size, cfg.chunk_overlap, cfg.max_chunks],
+        "summary": [CHUNK_SIZE, CHUNK_OVERLAP],
+    }
+
+
+def _store_layouts(document_id: str, text: str, cfg: RagConfig, layouts: dict[str, np.ndarray]) -> None:
+    payload = {
+        "text_sha256": _text_sha256(text),
+        "sizes": _layout_sizes(cfg),
+        "offsets": {name: offsets.ravel().tolist() for name, offsets in layouts.items()},
+    }
+    get_store().put_text(document_id, "chunks", json.dumps(payload))
+
+
+def _load_layouts(document_id: str, text: str, cfg: RagConfig) -> dict[str, np.ndarray]:
+    """Reuse the persisted chunk offsets when they match the text and config, else re-chunk and persist."""
+    stored = get_store().get_text(document_id, "chunks")
+    if stored is not None:
+        payload = json.loads(stored)
+        if payload.get("text_sha256") == _text_sha256(text) and payload.get("sizes") == _layout_sizes(cfg):
+            return {
+                name: np.asarray(flat, dtype="int64").reshape(-1, 2)
+                for name, flat in payload["offsets"].items()
+            }
+    layouts = _chunk_layouts(text, cfg)
+    _store_layouts(document_id, text, cfg, layouts)
+    return layouts
+
+
+def summary_chunks(document_id: str, text: str) -> List[str]:
+    """Return the summarizer's chunks of a document's (stripped) extracted text."""
+    return slice_chunks(text, _load_layouts(document_id, text, RagConfig())["summary"])
+
+
+def prepare_index_chunks(
+    document_id: str, cfg: RagConfig = RagConfig()
+) -> Tuple[List[str], np.ndarray]:
+    """Return the chunk texts to embed for a document's index and their `(n, 2)` character spans."""
     text = _load_extracted_text(document_id)
     if not text:
         raise ValueError("Extracted text is empty.")
 
-    docs = _chunk_text(text, cfg)
-    embeddings = _get_embeddings()
+    spans = _load_layouts(document_id, text, cfg)["index"]
+    return slice_chunks(text, spans), spans
+
+
+def embed_texts(texts: List[str]) -> List[List[float]]:
+    """Embed one provider batch of chunk texts through the cached embeddings client."""
+    with embedding_slot():
+        return _get_embeddings().embed_documents(texts)
+
+
+def save_index(document_id: str, texts: List[str], vectors: List[List[float]], spans: np.ndarray) -> None:
+    """Persist the vector store, BM25 index and chunk spans, then refresh caches and the corpus."""
+    with span("index.write", chunks=len(texts)):
+        bm25 = BM25Index.build(texts)
+        write_vector_store(
+            _doc_index_path(document_id),
+            texts,
+            vectors,
+            model=embedding_model_name(),
+            extra_files={
+                BM25_FILE: bm25.to_json().encode("utf-8"),
+                SPANS_FILE: np.ascontiguousarray(spans, dtype="int64").tobytes(),
+            },
+        )
+        get_index_cache().invalidate(document_id)
+    _invalidate_answers(document_id)
+
+    corpus = get_corpus_index()
+    if corpus is not None:
+        with span("index.corpus", chunks=len(texts)):
+            corpus.add_document(document_id, texts, vectors)
+
+
+def _previous_vectors(document_id: str) -> dict[str, np.ndarray]:
+    """Map the content ids of a document's currently indexed chunks to their vectors.
+
+    Empty if there is no index yet or it was built with another embedding model.
+    """
+    path = _doc_index_path(document_id)
+    if not is_vector_store(path):
+        return {}
+    try:
+        store = MmapVectorStore(path)
+    except ValueError:
+        return {}
+    if store.model != embedding_model_name():
+        return {}
+    return {content_id(store.chunk_text(i)): np.array(store.vectors[i]) for i in range(store.count)}
+
+
+def build_and_save_index(
+    document_id: str,
+    cfg: RagConfig = RagConfig(),
+    progress: Callable[[str, int, int], None] | None = None,
+) -> Tuple[int, int, RagConfig]:
+    """Build and persist the vector store for a document; return `(chunks, reused, cfg)`.
+
+    On re-index, chunks whose content is unchanged keep their previous vectors
+    and only new or edited chunks are embedded, in provider-sized batches.
+    `progress` (if given) is called with `("embed", chunks_done, chunks_total)`.
+    """
+    texts, spans = prepare_index_chunks(document_id, cfg)
+
+    previous = _previous_vectors(document_id)
+    vectors: list = [previous.get(content_id(t)) for t in texts]
+    missing = [i for i, vec in enumerate(vectors) if vec is None]
+    reused = len(texts) - len(missing)
+    batch_size = settings.EMBEDDING_BATCH_SIZE
+    with span(
+        "index.embed",
+        chunks=len(missing),
+        reused=reused,
+        prompt_tokens=sum(estimate_tokens(texts[i]) for i in missing),
+    ):
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            for i, vec in zip(batch, embed_texts([texts[i] for i in batch])):
+                vectors[i] = vec
+            if progress is not None:
+                progress("embed", reused + start + len(batch), len(texts))
+
+    save_index(document_id, texts, vectors, spans)
+    return len(texts), reused, cfg
+
+
+def delete_index(document_id: str) -> None:
+    """Remove a document's vector index, cached copy and corpus entries."""
+    save_path = _doc_index_path(document_id)
+    if save_path.exists():
+        shutil.rmtree(save_path)
+    get_index_cache().invalidate(document_id)
+    _invalidate_answers(document_id)
 
-    vs = FAISS.from_documents(docs, embeddings)
+    corpus = get_corpus_index()
+    if corpus is not None:
+        corpus.remove_document(document_id)
 
-    save_path = _doc_index_path(document_id)
-    ensure_dir(save_path)
-    vs.save_local(str(save_path))
 
-    return len(docs), cfg
+def _invalidate_answers(document_id: str) -> None:
+    cache = get_answer_cache()
+    if cache is not None:
+        cache.invalidate(document_id)
 
 
-def load_index(document_id: str) -> FAISS:
-    """Load a previously persisted FAISS index for a document."""
-    save_path = _doc_index_path(document_id)
-    if not save_path.exists():
-        raise FileNotFoundError("Vector index not found. Run /api/index first for this document_id.")
+def load_index(document_id: str) -> LoadedIndex:
+    """Return a document's loaded index, served from the in-process cache when hot.
 
-    embeddings = _get_embeddings()
+    A cached index that another process has since rebuilt is reloaded. Counts
+    as an access for the storage retention policy.
+    """
+    cache = get_index_cache()
+    index = cache.get_or_load(document_id, lambda: _load_index_from_disk(document_id))
+    current = store_version(_doc_index_path(document_id))
+    if current is not None and current != index.store.version:
+        cache.invalidate(document_id)
+        index = cache.get_or_load(document_id, lambda: _load_index_from_disk(document_id))
+    get_store().touch(document_id)
+    return index
 
-    vs = FAISS.load_local(
-        str(save_path),
-        embeddings,
-        allow_dangerous_deserialization=True,
-    )
-    return vs
 
+# How long a reader waits before retrying a load that raced a store swap.
+SWAP_RETRY_SECONDS = 0.05
 
-async def answer_question(document_id: str, question: str, top_k: int = 4) -> Tuple[str, list[dict]]:
-    """Answer a question from retrieved chunks and return answer + sources."""
-    if top_k < 1 or top_k > 10:
-        raise ValueError("top_k must be between 1 and 10.")
 
-    vs = load_index(document_id)
+def _load_index_from_disk(document_id: str) -> LoadedIndex:
+    """Map a previously persisted vector store and load its BM25 index.
 
-    docs_with_scores = vs.similarity_search_with_score(question, k=top_k)
+    A load that fails while another thread or process is swapping in a
+    rebuilt store is retried once.
+    """
+    try:
+        return _map_index(document_id)
+    except FileNotFoundError:
+        if not swap_in_progress(_doc_index_path(document_id)):
+            raise
+    time.sleep(SWAP_RETRY_SECONDS)
+    return _map_index(document_id)
 
-    # FAISS returns L2 distances where lower values are more relevant.
-    SCORE_THRESHOLD = 1.2
 
-    sources = []
-    context_parts = []
+def _map_index(document_id: str) -> LoadedIndex:
+    save_path = _doc_index_path(document_id)
+    if not save_path.exists():
+        raise FileNotFoundError("Vector index not found. Run /api/index first for this document_id.")
+    if not is_vector_store(save_path):
+        raise FileNotFoundError("Vector index uses an outdated format. Run /api/index again for this document_id.")
+    store = MmapVectorStore(save_path)
+    model = embedding_model_name()
+    if store.model is not None and store.model != model:
+        raise FileNotFoundError(
+            f"Vector index was built with embedding model {store.model!r}, not {model!r}. "
+            "Run /api/index again for this document_id."
+        )
+    bm25_path = save_path / BM25_FILE
+    bm25 = BM25Index.from_json(bm25_path.read_text(encoding="utf-8")) if bm25_path.exists() else None
+    spans_path = save_path / SPANS_FILE
+    spans = np.fromfile(spans_path, dtype="int64").reshape(-1, 2) if spans_path.exists() else None
+    return LoadedIndex(store=store, bm25=bm25, spans=spans)
+
+
+# Squared L2 distances (as FAISS IndexFlatL2 reports them); lower is more relevant.
+SCORE_THRESHOLD = 1.2
+
+NO_ANSWER = (
+    "I couldn’t find relevant information in the document to answer that question. "
+    "Try rephrasing your question or asking for a specific section/keyword."
+)
+
+ANSWER_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            "You answer questions using ONLY the provided context. "
+            "If the answer is not in the context, say you don't know.",
+        ),
+        (
+            "human",
+            "Question:\n{question}\n\n"
+            "Context:\n{context}\n\n"
+            "Answer clearly. If helpful, use bullet points.",
+        ),
+    ]
+)
+
+
+def _resolve_mode(index: LoadedIndex, question: str, retrieval: str) -> str:
+    """Return the retrieval mode to use first ("auto" picks lexical or hybrid)."""
+    if index.bm25 is None:
+        return "vector"
+    if retrieval == "auto":
+        return "lexical" if looks_lexical(question) else "hybrid"
+    return retrieval
+
+
+def _check_top_k(top_k: int) -> None:
+    if top_k < 1 or top_k > settings.ASK_MAX_TOP_K:
+        raise ValueError(f"top_k must be between 1 and {settings.ASK_MAX_TOP_K}.")
+
+
+async def _load_for_question(document_id: str, top_k: int) -> LoadedIndex:
+    """Validate `top_k` and load the document's index once for the whole question."""
+    _check_top_k(top_k)
+    with span("ask.load_index"):
+        return await run_io(load_index, document_id)
+
+
+async def _retrieve(
+    index: LoadedIndex,
+    question: str,
+    top_k: int,
+    retrieval: str = "auto",
+    query_vector: List[float] | None = None,
+) -> Tuple[str, list[dict]]:
+    """Retrieve relevant chunks and return `(context, sources)`; context is empty if none pass.
+
+    `retrieval` is "vector", "lexical" (BM25 only, no embedding call), "hybrid"
+    (both, fused with reciprocal rank fusion) or "auto", which uses lexical
+    search for keyword-style questions and hybrid otherwise. Pass `query_vector`
+    if the question was already embedded.
+    """
+    mode = _resolve_mode(index, question, retrieval)
+    candidates = max(top_k * 2, 10)
+    with span("ask.bm25_search"):
+        lexical_hits = (
+            index.bm25.search(question, candidates, settings.ASK_MIN_LEXICAL_SCORE) if mode != "vector" else []
+        )
+    if mode == "lexical" and not lexical_hits and retrieval == "auto":
+        mode = "hybrid"
+
+    vector_hits: list[tuple[int, float]] = []
+    if mode != "lexical":
+        if query_vector is None:
+            with span("ask.embed_query"):
+                query_vector = await get_query_batcher(_embed_queries).embed(question)
+        with span("ask.vector_search"):
+            vector_hits = [
+                (chunk_id, distance)
+                for chunk_id, distance in index.store.search_by_vector(query_vector, candidates)
+                if distance <= SCORE_THRESHOLD
+            ]
+
+    distances = dict(vector_hits)
+    bm25_scores = dict(lexical_hits)
+    fused = reciprocal_rank_fusion([[i for i, _ in vector_hits], [i for i, _ in lexical_hits]])
 
-    for d, score in docs_with_scores:
-        if score is None:
-            continue
-        if float(score) > SCORE_THRESHOLD:
-            continue
+    sources = []
 
-        chunk_id = d.metadata.get("chunk_id", -1)
-        content = (d.page_content or "").strip()
+    for chunk_id, fused_score in fused[:top_k]:
+        content = index.store.chunk_text(chunk_id).strip()
         if not content:
             continue
 
-        context_parts.append(f"[Chunk {chunk_id} | score={float(score):.3f}]\n{content}")
+        distance = distances.get(chunk_id)
+        if distance is None and query_vector is not None:
+            distance = index.store.distance(query_vector, chunk_id)
+        bm25_score = bm25_scores.get(chunk_id)
+
         sources.append(
             {
-                "chunk_id": int(chunk_id) if chunk_id is not None else -1,
-                "score": float(score),
+                "chunk_id": chunk_id,
+                "score": distance,
+                "bm25_score": bm25_score,
+                "fused_score": fused_score,
                 "preview": content[:280],
             }
         )
 
-    if not context_parts:
-        return (
-            "I couldn’t find relevant information in the document to answer that question. "
-            "Try rephrasing your question or asking for a specific section/keyword.",
-            [],
+    # Merge overlapping neighbours and pack the best spans into the prompt budget.
+    with span("ask.pack_context", sources=len(sources)):
+        packed = pack_context(
+            [(src["chunk_id"], src["fused_score"]) for src in sources],
+            index.spans,
+            index.store.chunk_text,
+            settings.ASK_CONTEXT_TOKENS,
         )
+    context_parts = [
+        f"[Chunks {', '.join(str(i) for i in part['chunk_ids'])}]\n{part['text']}" for part in packed
+    ]
+    return "\n\n---\n\n".join(context_parts), sources
+
+
+async def _lookup_answer(
+    index: LoadedIndex, document_id: str, question: str, top_k: int, retrieval: str
+) -> Tuple[List[float] | None, CachedAnswer | None, int]:
+    """Look a question up in the semantic answer cache; return `(query_vector, hit, generation)`.
+
+    The vector is None when the cache is disabled or the question will be
+    answered lexically (no embedding needed; exact repeats still hit the LLM
+    cache). Otherwise it is reused for retrieval, and `generation` is passed
+    back to `_store_answer`.
+    """
+    cache = get_answer_cache()
+    if cache is None:
+        return None, None, 0
+    if _resolve_mode(index, question, retrieval) == "lexical":
+        return None, None, 0
+    generation = cache.generation(document_id, index.store.version)
+    with span("ask.embed_query"):
+        query_vector = await get_query_batcher(_embed_queries).embed(question)
+    with span("ask.answer_cache") as attrs:
+        hit = cache.get(document_id, (top_k, retrieval), query_vector)
+        attrs["cache_hit"] = hit is not None
+    return query_vector, hit, generation
+
+
+def _store_answer(document_id: str, question: str, top_k: int, retrieval: str, query_vector: List[float] | None,
+                  answer: str, sources: list[dict], generation: int) -> None:
+    cache = get_answer_cache()
+    if cache is not None and query_vector is not None:
+        cache.put(document_id, (top_k, retrieval), query_vector, question, answer, sources, generation)
+
+
+async def answer_question(
+    document_id: str,
+    question: str,
+    top_k: int = 4,
+    retrieval: str = "auto",
+) -> Tuple[str, list[dict]]:
+    """Answer a question from retrieved chunks and return answer + sources.
+
+    Near-duplicate questions about the same document are answered from the
+    semantic answer cache without retrieval or an LLM call.
+    """
+    index = await _load_for_question(document_id, top_k)
+    query_vector, hit, generation = await _lookup_answer(index, document_id, question, top_k, retrieval)
+    if hit is not None:
+        return hit.answer, hit.sources
+
+    context, sources = await _retrieve(index, question, top_k, retrieval, query_vector)
+    if not context:
+        return NO_ANSWER, []
 
-    context = "\n\n---\n\n".join(context_parts)
+    llm = get_llm()
+    answer = await cached_completion(ANSWER_PROMPT, llm, {"question": question, "context": context}, stage="ask")
+    _store_answer(document_id, question, top_k, retrieval, query_vector, answer, sources, generation)
+
+    return answer, sources
+
+
+async def stream_answer(
+    document_id: str,
+    question: str,
+    top_k: int = 4,
+    retrieval: str = "auto",
+) -> AsyncIterator[dict]:
+    """Answer a question as a stream of events: sources first, then tokens, then done.
+
+    Events are dicts: `{"type": "sources", "sources"}`, `{"type": "token", "text"}`
+    and `{"type": "done", "answer"}`. A semantic cache hit arrives as a single token.
+    """
+    index = await _load_for_question(document_id, top_k)
+    query_vector, hit, generation = await _lookup_answer(index, document_id, question, top_k, retrieval)
+    if hit is not None:
+        yield {"type": "sources", "sources": hit.sources}
+        yield {"type": "token", "text": hit.answer}
+        yield {"type": "done", "answer": hit.answer}
+        return
+
+    context, sources = await _retrieve(index, question, top_k, retrieval, query_vector)
+    if not context:
+        yield {"type": "sources", "sources": []}
+        yield {"type": "token", "text": NO_ANSWER}
+        yield {"type": "done", "answer": NO_ANSWER}
+        return
+
+    yield {"type": "sources", "sources": sources}
 
     llm = get_llm()
+    parts: list[str] = []
+    async for token in stream_completion(
+        ANSWER_PROMPT, llm, {"question": question, "context": context}, stage="ask"
+    ):
+        parts.append(token)
+        yield {"type": "token", "text": token}
+    answer = "".join(parts).strip()
+    _store_answer(document_id, question, top_k, retrieval, query_vector, answer, sources, generation)
+    yield {"type": "done", "answer": answer}
+
+
+async def answer_across_documents(
+    question: str,
+    document_ids: List[str] | None = None,
+    top_k: int = 4,
+) -> Tuple[str, list[dict]]:
+    """Answer a question with one search over the shared corpus index.
+
+    `document_ids` restricts the search to those documents; None searches all.
+    """
+    _check_top_k(top_k)
+    corpus = get_corpus_index()
+    if corpus is None:
+        raise ValueError("Corpus index is disabled. Set CORPUS_INDEX_ENABLED=true and re-index documents.")
+
+    with span("ask.embed_query"):
+        query_vector = await get_query_batcher(_embed_queries).embed(question)
+    with span("ask.corpus_search"):
+        hits = await run_io(corpus.search, query_vector, top_k, document_ids)
+    if hits:
+        await run_io(get_store().touch, *{hit["document_id"] for hit in hits})
 
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            (
-                "system",
-                "You answer questions using ONLY the provided context. "
-                "If the answer is not in the context, say you don't know.",
-            ),
-            (
-                "human",
-                "Question:\n{question}\n\n"
-                "Context:\n{context}\n\n"
-                "Answer clearly. If helpful, use bullet points.",
-            ),
-        ]
-    )
+    sources = []
+    context_parts = []
+    for hit in hits:
+        content = hit["text"].strip()
+        if hit["score"] > SCORE_THRESHOLD or not content:
+            continue
+        context_parts.append(
+            f"[Document {hit['document_id']} | Chunk {hit['chunk_id']} | score={hit['score']:.3f}]\n{content}"
+        )
+        sources.append(
+            {
+                "document_id": hit["document_id"],
+                "chunk_id": hit["chunk_id"],
+                "score": hit["score"],
+                "preview": content[:280],
+            }
+        )
 
-    result = await (prompt | llm).ainvoke({"question": question, "context": context})
-    answer = result.content.strip()
+    if not context_parts:
+        return NO_ANSWER, []
 
-    return answer, sources
\ No newline at end of file
+    context = "\n\n---\n\n".join(context_parts)
+    answer = await cached_completion(
+        ANSWER_PROMPT, get_llm(), {"question": question, "context": context}, stage="ask"
+    )
+    return answer, sources
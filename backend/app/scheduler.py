@@ -0,0 +1,167 @@
+"""Bounded, rate-limit-aware scheduling for concurrent LLM calls."""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Sequence, TypeVar
+
+from .config import settings
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# HTTP statuses worth retrying: quota exhaustion and transient server errors.
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the token count of `text` (~4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Return True if `exc` (or anything in its cause chain) is a 429/5xx or transient error."""
+    seen: set[int] = set()
+    cur: BaseException | None = exc
+    while cur is not None and id(cur) not in seen:
+        seen.add(id(cur))
+        for attr in ("status_code", "code"):
+            value = getattr(cur, attr, None)
+            try:
+                if value is not None and int(value) in RETRYABLE_STATUS:
+                    return True
+            except (TypeError, ValueError):
+                pass
+        if isinstance(cur, (asyncio.TimeoutError, ConnectionError)):
+            return True
+        cur = cur.__cause__ or cur.__context__
+    return False
+
+
+class TokenBucket:
+    """Async token bucket that refills continuously up to `capacity`."""
+
+    def __init__(self, capacity: float, refill_per_sec: float):
+        self.capacity = float(capacity)
+        self.refill_per_sec = float(refill_per_sec)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_per_sec)
+        self._updated = now
+
+    def try_acquire(self, amount: float = 1.0) -> float:
+        """Take `amount` tokens if available; otherwise return the seconds to wait."""
+        amount = min(amount, self.capacity)
+        self._refill()
+        if self._tokens >= amount:
+            self._tokens -= amount
+            return 0.0
+        return (amount - self._tokens) / self.refill_per_sec
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        """Wait until `amount` tokens are available and take them (FIFO among waiters)."""
+        async with self._lock:
+            while True:
+                wait = self.try_acquire(amount)
+                if wait <= 0:
+                    return
+                await asyncio.sleep(wait)
+
+
+class LLMScheduler:
+    """Runs LLM calls with bounded fan-out, RPM/TPM limits and jittered retries."""
+
+    def __init__(
+        self,
+        max_in_flight: int = 4,
+        rpm: int = 0,
+        tpm: int = 0,
+        max_retries: int = 4,
+        retry_base_seconds: float = 1.0,
+        retry_max_seconds: float = 30.0,
+    ):
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_retries = max(0, max_retries)
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self._sem = asyncio.Semaphore(self.max_in_flight)
+        self._requests = TokenBucket(rpm, rpm / 60.0) if rpm > 0 else None
+        self._tokens = TokenBucket(tpm, tpm / 60.0) if tpm > 0 else None
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff delay for a retry attempt."""
+        ceiling = min(self.retry_max_seconds, self.retry_base_seconds * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    @asynccontextmanager
+    async def slot(self, est_tokens: int = 0) -> AsyncIterator[None]:
+        """Hold one in-flight slot (after paying RPM/TPM tokens) for the duration of the block.
+
+        Used directly for streaming calls, which cannot be transparently retried.
+        """
+        async with self._sem:
+            if self._requests is not None:
+                await self._requests.acquire(1)
+            if self._tokens is not None and est_tokens:
+                await self._tokens.acquire(est_tokens)
+            yield
+
+    async def submit(self, call: Callable[[], Awaitable[T]], est_tokens: int = 0) -> T:
+        """Run one call under the concurrency and rate limits, retrying 429/5xx errors."""
+        attempt = 0
+        while True:
+            async with self.slot(est_tokens):
+                try:
+                    return await call()
+                except Exception as e:
+                    if attempt >= self.max_retries or not is_retryable(e):
+                        raise
+            # Back off outside the semaphore so other calls can use the slot.
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    async def map(
+        self,
+        fn: Callable[[T], Awaitable[R]],
+        items: Sequence[T],
+        cost: Callable[[T], int] | None = None,
+    ) -> list[R]:
+        """Apply `fn` to every item concurrently and return results in input order."""
+        return await gather_ordered(
+            self.submit(lambda item=item: fn(item), cost(item) if cost else 0) for item in items
+        )
+
+
+async def gather_ordered(aws: Iterable[Awaitable[T]]) -> list[T]:
+    """Await all awaitables concurrently, keep input order and cancel the rest on failure."""
+    tasks = [asyncio.ensure_future(a) for a in aws]
+    try:
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        for t in tasks:
+            t.cancel()
+        raise
+
+
+_scheduler: LLMScheduler | None = None
+
+
+def get_scheduler() -> LLMScheduler:
+    """Return the process-wide LLM scheduler configured from settings."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler(
+            max_in_flight=settings.LLM_MAX_CONCURRENCY,
+            rpm=settings.LLM_RPM,
+            tpm=settings.LLM_TPM,
+            max_retries=settings.LLM_MAX_RETRIES,
+            retry_base_seconds=settings.LLM_RETRY_BASE_SECONDS,
+        )
+    return _scheduler
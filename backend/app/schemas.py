@@ -1,19 +1,26 @@
 """Pydantic request/response schemas for API routes."""
 
+from typing import Literal
+
 from pydantic import BaseModel, Field
 
+from .config import settings
+
 
 class UploadResponse(BaseModel):
     """Response returned after a successful upload."""
     document_id: str
     filename: str | None = None
     size_bytes: int
+    content_hash: str | None = None
+    pages: int | None = None
+    reused: bool = False
 
 
 class ExtractRequest(BaseModel):
     """Request payload for text extraction."""
     document_id: str
-    max_pages: int = Field(default=4, ge=1, le=4)
+    max_pages: int = Field(default=settings.MAX_PDF_PAGES, ge=1)
 
 
 class ExtractResponse(BaseModel):
@@ -37,6 +44,9 @@ class SummarizeResponse(BaseModel):
     chunks_used: int
     chunk_size: int
     truncated: bool
+    tree_depth: int
+    llm_calls: int
+    llm_calls_reused: int = 0
 
 
 class IndexRequest(BaseModel):
@@ -48,6 +58,7 @@ class IndexResponse(BaseModel):
     """Response payload for index creation."""
     document_id: str
     chunks_indexed: int
+    chunks_reused: int = 0
     chunk_size: int
     chunk_overlap: int
 
@@ -57,12 +68,15 @@ class AskRequest(BaseModel):
     document_id: str
     question: str = Field(min_length=2)
     top_k: int = 4
+    retrieval: Literal["auto", "hybrid", "vector", "lexical"] = "auto"
 
 
 class SourceChunk(BaseModel):
     """Metadata for a source chunk used in an answer."""
     chunk_id: int
     score: float | None = None
+    bm25_score: float | None = None
+    fused_score: float | None = None
     preview: str
 
 
@@ -72,4 +86,76 @@ class AskResponse(BaseModel):
     question: str
     answer: str
     top_k: int
-    sources: list[SourceChunk]
\ No newline at end of file
+    sources: list[SourceChunk]
+
+class MultiAskRequest(BaseModel):
+    """Request payload for a question over several documents."""
+    question: str = Field(min_length=2)
+    document_ids: list[str] | None = None
+    top_k: int = 4
+
+
+class CorpusSourceChunk(BaseModel):
+    """A source chunk from the shared corpus index."""
+    document_id: str
+    chunk_id: int
+    score: float | None = None
+    preview: str
+
+
+class MultiAskResponse(BaseModel):
+    """Response payload for a question over several documents."""
+    question: str
+    document_ids: list[str] | None = None
+    answer: str
+    top_k: int
+    sources: list[CorpusSourceChunk]
+
+
+class DeleteResponse(BaseModel):
+    """Response payload after deleting a document."""
+    document_id: str
+    removed: list[str]
+
+
+class JobRequest(BaseModel):
+    """Request payload for queuing a background pipeline job."""
+    kind: Literal["extract", "summarize", "index"]
+    document_id: str
+    max_pages: int = Field(default=settings.MAX_PDF_PAGES, ge=1)
+
+
+class BatchDocument(BaseModel):
+    """A PDF accepted into a batch, with the document id it was stored under."""
+    filename: str
+    document_id: str
+    reused: bool = False
+
+
+class BatchRejected(BaseModel):
+    """A file that could not be added to a batch."""
+    filename: str
+    error: str
+
+
+class JobResponse(BaseModel):
+    """Status and progress of a background job."""
+    id: str
+    kind: str
+    document_id: str
+    status: str
+    stage: str | None = None
+    done: int = 0
+    total: int = 0
+    message: str | None = None
+    result: dict | None = None
+    error: str | None = None
+    created: float
+    updated: float
+
+
+class BatchResponse(BaseModel):
+    """Response payload after queuing a batch; poll the job for per-document results."""
+    job: JobResponse
+    documents: list[BatchDocument]
+    rejected: list[BatchRejected]
@@ -0,0 +1,369 @@
+"""Artifact storage: SQLite metadata and text plus a content-addressed blob directory.
+
+Layout under `settings.STORAGE_DIR`:
+
+- `store.sqlite3`     documents, text artifacts (extracted text, summaries, chunk
+                      sets) and blob references, in WAL mode
+- `blobs/ab/<sha256>` binary artifacts (uploaded PDFs), one file per distinct content
+- `index/<id>/`       memory-mapped vector stores (see vector_store.py)
+
+Blob files are written to a temp file and renamed into place, and text rows
+are single-statement upserts, so readers never see partial artifacts. Several
+uvicorn workers may share one directory: SQLite serializes writers, and a blob
+is only garbage-collected once no document references it and a grace period
+has passed, which covers the window between writing a blob and recording its
+reference.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from .config import settings
+from .utils import ensure_dir, file_lock
+
+# Unreferenced blobs (and stray temp files) younger than this are never collected.
+GC_GRACE_SECONDS = 600
+# `accessed` timestamps are refreshed at most this often per document.
+TOUCH_INTERVAL_SECONDS = 3600
+
+
+# Relative STORAGE_DIR values are anchored here, not at the process CWD.
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+_root: Path | None = None
+
+
+def storage_root() -> Path:
+    """Return the absolute storage directory; relative settings resolve against the backend directory."""
+    global _root
+    if _root is None:
+        _root = (BACKEND_DIR / Path(settings.STORAGE_DIR).expanduser()).resolve()
+    return _root
+
+
+def storage_path(*parts: str) -> Path:
+    """Return a path under the storage directory."""
+    return storage_root().joinpath(*parts)
+
+
+class ArtifactStore:
+    """Per-document artifacts behind one interface, safe to share between processes.
+
+    Text artifacts are addressed by `(document_id, kind)`, e.g. `("abc", "summary")`;
+    blobs by `(document_id, kind)` too, through a reference to their SHA-256 digest.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.blob_dir = root / "blobs"
+        self.tmp_dir = root / "tmp"
+        ensure_dir(self.blob_dir)
+        ensure_dir(self.tmp_dir)
+        self._db = sqlite3.connect(
+            str(root / "store.sqlite3"), check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " document_id TEXT PRIMARY KEY, created REAL NOT NULL, accessed REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS texts ("
+            " document_id TEXT NOT NULL, kind TEXT NOT NULL, content TEXT NOT NULL, updated REAL NOT NULL,"
+            " PRIMARY KEY (document_id, kind));"
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            " digest TEXT PRIMARY KEY, size INTEGER NOT NULL, created REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS blob_refs ("
+            " document_id TEXT NOT NULL, kind TEXT NOT NULL, digest TEXT NOT NULL,"
+            " PRIMARY KEY (document_id, kind));"
+            "CREATE INDEX IF NOT EXISTS blob_refs_digest ON blob_refs(digest);"
+            "CREATE INDEX IF NOT EXISTS documents_accessed ON documents(accessed);"
+            "CREATE TABLE IF NOT EXISTS legacy_imports ("
+            " path TEXT PRIMARY KEY, imported REAL NOT NULL);"
+        )
+        self._lock = threading.Lock()
+        # document_id -> monotonic time of its last `touch`, to skip redundant writes
+        self._touched: dict[str, float] = {}
+
+    # --- documents ---
+
+    def _register(self, document_id: str, now: float) -> None:
+        self._db.execute(
+            "INSERT INTO documents (document_id, created, accessed) VALUES (?, ?, ?)"
+            " ON CONFLICT(document_id) DO UPDATE SET accessed = excluded.accessed",
+            (document_id, now, now),
+        )
+
+    def _touch(self, document_id: str) -> None:
+        now = time.time()
+        self._db.execute(
+            "UPDATE documents SET accessed = ? WHERE document_id = ? AND accessed < ?",
+            (now, document_id, now - TOUCH_INTERVAL_SECONDS),
+        )
+
+    def touch(self, *document_ids: str) -> None:
+        """Record that documents were used without reading an artifact (e.g. an /ask over their index).
+
+        Each document is written at most once per `TOUCH_INTERVAL_SECONDS` per process.
+        """
+        now = time.monotonic()
+        due = [
+            document_id for document_id in document_ids
+            if now - self._touched.get(document_id, -TOUCH_INTERVAL_SECONDS) >= TOUCH_INTERVAL_SECONDS
+        ]
+        if not due:
+            return
+        with self._lock:
+            for document_id in due:
+                self._touched[document_id] = now
+                self._touch(document_id)
+
+    def delete_document(self, document_id: str) -> list[str]:
+        """Drop a document's texts and blob references; return the artifact kinds removed.
+
+        Blob files are reclaimed later by `collect_garbage` once nothing references them.
+        """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                kinds = [
+                    row[0]
+                    for row in self._db.execute(
+                        "SELECT kind FROM blob_refs WHERE document_id = ?"
+                        " UNION ALL SELECT kind FROM texts WHERE document_id = ?",
+                        (document_id, document_id),
+                    )
+                ]
+                self._db.execute("DELETE FROM blob_refs WHERE document_id = ?", (document_id,))
+                self._db.execute("DELETE FROM texts WHERE document_id = ?", (document_id,))
+                self._db.execute("DELETE FROM documents WHERE document_id = ?", (document_id,))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return kinds
+
+    def expired_documents(self, max_age_days: float) -> list[str]:
+        """Return ids of documents not accessed within `max_age_days`."""
+        cutoff = time.time() - max_age_days * 86400
+        with self._lock:
+            rows = self._db.execute("SELECT document_id FROM documents WHERE accessed < ?", (cutoff,)).fetchall()
+        return [row[0] for row in rows]
+
+    # --- text artifacts ---
+
+    def put_text(self, document_id: str, kind: str, content: str) -> None:
+        """Insert or replace a text artifact."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._register(document_id, now)
+                self._db.execute(
+                    "INSERT OR REPLACE INTO texts (document_id, kind, content, updated) VALUES (?, ?, ?, ?)",
+                    (document_id, kind, content, now),
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def get_text(self, document_id: str, kind: str) -> str | None:
+        """Return a text artifact, or None if it does not exist."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT content FROM texts WHERE document_id = ? AND kind = ?", (document_id, kind)
+            ).fetchone()
+            if row is not None:
+                self._touch(document_id)
+        return row[0] if row is not None else None
+
+    def has_text(self, document_id: str, kind: str) -> bool:
+        """Return True if the text artifact exists (without reading it)."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM texts WHERE document_id = ? AND kind = ?", (document_id, kind)
+            ).fetchone()
+        return row is not None
+
+    # --- blobs ---
+
+    def _blob_file(self, digest: str) -> Path:
+        return self.blob_dir / digest[:2] / digest
+
+    def temp_path(self, suffix: str = "") -> Path:
+        """Return a fresh temp file path on the same filesystem as the blobs (for atomic renames)."""
+        fd, name = tempfile.mkstemp(dir=self.tmp_dir, suffix=suffix)
+        os.close(fd)
+        return Path(name)
+
+    def put_blob_file(self, document_id: str, kind: str, src: Path, digest: str | None = None) -> Path:
+        """Move `src` into the blob store and reference it from `(document_id, kind)`.
+
+        `digest` is the SHA-256 hex of the file if the caller already computed it.
+        Identical content is stored once; the duplicate `src` is removed.
+        """
+        if digest is None:
+            h = hashlib.sha256()
+            with src.open("rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    h.update(block)
+            digest = h.hexdigest()
+        dest = self._blob_file(digest)
+        size = src.stat().st_size
+        if dest.exists():
+            src.unlink(missing_ok=True)
+            os.utime(dest)  # restart the GC grace period
+        else:
+            ensure_dir(dest.parent)
+            os.replace(src, dest)
+
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._register(document_id, now)
+                self._db.execute(
+                    "INSERT OR IGNORE INTO blobs (digest, size, created) VALUES (?, ?, ?)", (digest, size, now)
+                )
+                self._db.execute(
+                    "INSERT OR REPLACE INTO blob_refs (document_id, kind, digest) VALUES (?, ?, ?)",
+                    (document_id, kind, digest),
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return dest
+
+    def blob_path(self, document_id: str, kind: str) -> Path | None:
+        """Return the file backing a blob artifact, or None if it does not exist."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT digest FROM blob_refs WHERE document_id = ? AND kind = ?", (document_id, kind)
+            ).fetchone()
+            if row is not None:
+                self._touch(document_id)
+        if row is None:
+            return None
+        path = self._blob_file(row[0])
+        return path if path.exists() else None
+
+    # --- maintenance ---
+
+    def collect_garbage(self) -> dict:
+        """Delete unreferenced blobs and stale temp files; return what was reclaimed."""
+        cutoff = time.time() - GC_GRACE_SECONDS
+        with self._lock:
+            orphans = self._db.execute(
+                "SELECT digest, size FROM blobs WHERE created < ?"
+                " AND digest NOT IN (SELECT digest FROM blob_refs)",
+                (cutoff,),
+            ).fetchall()
+        removed, freed = 0, 0
+        for digest, size in orphans:
+            path = self._blob_file(digest)
+            with self._lock:
+                # Re-check under the lock: a concurrent upload may have re-referenced it.
+                self._db.execute("BEGIN IMMEDIATE")
+                try:
+                    referenced = self._db.execute(
+                        "SELECT 1 FROM blob_refs WHERE digest = ? LIMIT 1", (digest,)
+                    ).fetchone()
+                    if referenced is None and (not path.exists() or path.stat().st_mtime < cutoff):
+                        self._db.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+                        path.unlink(missing_ok=True)
+                        removed += 1
+                        freed += size
+                    self._db.execute("COMMIT")
+                except BaseException:
+                    self._db.execute("ROLLBACK")
+                    raise
+
+        stale = 0
+        for tmp in self.tmp_dir.iterdir():
+            if tmp.stat().st_mtime < cutoff:
+                tmp.unlink(missing_ok=True)
+                stale += 1
+        return {"blobs_removed": removed, "bytes_freed": freed, "temp_files_removed": stale}
+
+    def import_legacy_files(self, legacy_root: Path) -> int:
+        """Copy artifacts from the old file-per-artifact layout into the store; return the count.
+
+        The original files are left in place. Each imported file is recorded,
+        so it is copied once and never overwrites what the store has since
+        written for that document. Old per-document index directories
+        (`index/<id>/` with a pickled FAISS index) are not converted: loading
+        one reports an outdated format, and `/api/index` rebuilds it in place.
+
+        Safe to call from several workers at once: the import runs under a
+        file lock, so later workers find every file already recorded.
+        """
+        layout = (("uploads", ".pdf", "upload"), ("text", ".txt", "text"),
+                  ("summary", ".md", "summary"), ("chunks", ".json", "chunks"))
+        imported = 0
+        with file_lock(self.root / "legacy_import.lock"):
+            with self._lock:
+                done = {row[0] for row in self._db.execute("SELECT path FROM legacy_imports")}
+            for subdir, suffix, kind in layout:
+                directory = legacy_root / subdir
+                if not directory.is_dir():
+                    continue
+                for path in sorted(directory.glob(f"*{suffix}")):
+                    name = f"{subdir}/{path.name}"
+                    if name in done:
+                        continue
+                    document_id = path.stem
+                    try:
+                        if kind == "upload":
+                            tmp = self.temp_path(suffix)
+                            try:
+                                shutil.copyfile(path, tmp)
+                            except FileNotFoundError:
+                                tmp.unlink(missing_ok=True)
+                                raise
+                            self.put_blob_file(document_id, kind, tmp)
+                        else:
+                            self.put_text(document_id, kind, path.read_text(encoding="utf-8"))
+                    except FileNotFoundError:
+                        continue  # removed by someone else meanwhile
+                    with self._lock:
+                        self._db.execute(
+                            "INSERT OR IGNORE INTO legacy_imports (path, imported) VALUES (?, ?)", (name, time.time())
+                        )
+                    imported += 1
+        return imported
+
+    def snapshot(self) -> dict:
+        """Return artifact counts and blob bytes."""
+        with self._lock:
+            documents = self._db.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            texts, text_bytes = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(content)), 0) FROM texts"
+            ).fetchone()
+            blobs, blob_bytes = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        return {
+            "documents": documents,
+            "texts": texts,
+            "text_bytes": text_bytes,
+            "blobs": blobs,
+            "blob_bytes": blob_bytes,
+        }
+
+
+_store: ArtifactStore | None = None
+
+
+def get_store() -> ArtifactStore:
+    """Return the process-wide artifact store."""
+    global _store
+    if _store is None:
+        _store = ArtifactStore(storage_root())
+    return _store
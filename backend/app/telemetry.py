@@ -0,0 +1,213 @@
+"""Per-stage tracing: Prometheus metrics, optional OpenTelemetry spans and a request profiler.
+
+Pipeline code wraps each stage in `span("stage.name")`. Every span feeds the
+`app_stage_duration_seconds` histogram. When `OTEL_TRACING_ENABLED` is set
+and `opentelemetry-api` is installed, it also becomes an OpenTelemetry span.
+Spans finished before the response starts are summarized in the response's
+`Server-Timing` header.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import re
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Iterator
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+from .config import settings
+from .storage import storage_path
+from .utils import ensure_dir, generate_document_id
+
+logger = logging.getLogger("app.telemetry")
+
+_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+STAGE_SECONDS = Histogram(
+    "app_stage_duration_seconds", "Duration of pipeline stages.", ["stage"], buckets=_BUCKETS
+)
+STAGE_ERRORS = Counter("app_stage_errors_total", "Pipeline stages that raised.", ["stage"])
+STAGE_TOKENS = Counter(
+    "app_stage_tokens_total", "Estimated tokens sent to / received from models.", ["stage", "kind"]
+)
+STAGE_CACHE = Counter("app_stage_cache_total", "Cache lookups made by pipeline stages.", ["stage", "result"])
+HTTP_SECONDS = Histogram(
+    "app_http_request_duration_seconds",
+    "HTTP request duration, including streamed bodies.",
+    ["method", "route", "status"],
+    buckets=_BUCKETS,
+)
+
+# (stage, seconds) pairs recorded for the current request, for Server-Timing.
+_request_stages: contextvars.ContextVar[list | None] = contextvars.ContextVar("request_stages", default=None)
+
+_tracer = None
+if settings.OTEL_TRACING_ENABLED:
+    try:
+        from opentelemetry import trace
+
+        _tracer = trace.get_tracer("app")
+    except ImportError:
+        logger.warning("OTEL_TRACING_ENABLED is set but opentelemetry-api is not installed")
+
+
+@contextmanager
+def span(stage: str, **attributes) -> Iterator[dict]:
+    """Time a pipeline stage and yield a dict for attributes found while it runs.
+
+    Recognized attributes: `prompt_tokens` and `completion_tokens` (counted
+    per stage) and `cache_hit` (a bool). All scalar attributes are copied onto
+    the OpenTelemetry span.
+    """
+    attrs = dict(attributes)
+    otel = _tracer.start_as_current_span(stage) if _tracer is not None else nullcontext()
+    start = time.perf_counter()
+    with otel as otel_span:
+        try:
+            yield attrs
+        except BaseException:
+            STAGE_ERRORS.labels(stage).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            STAGE_SECONDS.labels(stage).observe(elapsed)
+            for kind in ("prompt_tokens", "completion_tokens"):
+                if attrs.get(kind):
+                    STAGE_TOKENS.labels(stage, kind.split("_")[0]).inc(attrs[kind])
+            if "cache_hit" in attrs:
+                STAGE_CACHE.labels(stage, "hit" if attrs["cache_hit"] else "miss").inc()
+            if otel_span is not None:
+                otel_span.set_attributes(
+                    {k: v for k, v in attrs.items() if isinstance(v, (str, bool, int, float))}
+                )
+            stages = _request_stages.get()
+            if stages is not None:
+                stages.append((stage, elapsed))
+
+
+def _server_timing(stages: list[tuple[str, float]]) -> bytes:
+    """Aggregate repeated stages (e.g. many map calls) into one Server-Timing entry each."""
+    totals: dict[str, list[float]] = {}
+    for stage, elapsed in stages:
+        entry = totals.setdefault(stage, [0.0, 0])
+        entry[0] += elapsed
+        entry[1] += 1
+    parts = [
+        f'{stage};dur={total * 1000:.1f}' + (f';desc="x{count}"' if count > 1 else "")
+        for stage, (total, count) in totals.items()
+    ]
+    return ", ".join(parts).encode("latin-1")
+
+
+class _StatsCollector:
+    """Exports the numeric leaves of a nested snapshot dict as gauges at scrape time."""
+
+    def __init__(self, snapshot: Callable[[], dict]):
+        self._snapshot = snapshot
+
+    def collect(self):
+        try:
+            snapshot = self._snapshot()
+        except Exception:
+            logger.exception("Stats snapshot failed")
+            return
+        for name, value in _flatten("app_stats", snapshot):
+            yield GaugeMetricFamily(name, f"/api/stats value {name}", value=value)
+
+    def describe(self):
+        return []
+
+
+def _flatten(prefix: str, value) -> Iterator[tuple[str, float]]:
+    if isinstance(value, dict):
+        for key, child in value.items():
+            yield from _flatten(f"{prefix}_{re.sub(r'[^A-Za-z0-9_]', '_', str(key))}", child)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, float(value)
+
+
+_stats_collector: _StatsCollector | None = None
+
+
+def register_stats(snapshot: Callable[[], dict]) -> None:
+    """Expose `snapshot()` (the /api/stats payload) on /metrics; replaces any previous one."""
+    global _stats_collector
+    if _stats_collector is not None:
+        REGISTRY.unregister(_stats_collector)
+    _stats_collector = _StatsCollector(snapshot)
+    REGISTRY.register(_stats_collector)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Return the Prometheus exposition body and its content type."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def _start_profiler(scope: dict):
+    """Start a sampling profiler if profiling is enabled and the request asked for it."""
+    if not settings.PROFILING_ENABLED:
+        return None
+    if not any(name == settings.PROFILING_HEADER.lower().encode() for name, _ in scope.get("headers", [])):
+        return None
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        logger.warning("Profiling requested but pyinstrument is not installed")
+        return None
+    profiler = Profiler(interval=settings.PROFILING_INTERVAL_MS / 1000, async_mode="enabled")
+    profiler.start()
+    return profiler
+
+
+class TelemetryMiddleware:
+    """ASGI middleware that records request durations, Server-Timing and on-demand profiles.
+
+    Requests that carry the `PROFILING_HEADER` header (with `PROFILING_ENABLED`) are
+    profiled; the HTML report is written under storage/profiles and named in
+    the `X-Profile-File` response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stages: list[tuple[str, float]] = []
+        token = _request_stages.set(stages)
+        profiler = _start_profiler(scope)
+        profile_path = storage_path("profiles", f"{int(time.time())}-{generate_document_id()}.html")
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                if stages:
+                    headers.append((b"server-timing", _server_timing(stages)))
+                if profiler is not None:
+                    headers.append((b"x-profile-file", str(profile_path).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            # FastAPI stores the matched route in the scope; use its template as the label.
+            route = scope.get("route")
+            HTTP_SECONDS.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status)
+            ).observe(time.perf_counter() - start)
+            _request_stages.reset(token)
+            if profiler is not None:
+                profiler.stop()
+                ensure_dir(profile_path.parent)
+                profile_path.write_text(profiler.output_html(), encoding="utf-8")
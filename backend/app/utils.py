@@ -1,17 +1,55 @@
 """Small utility helpers shared across backend modules."""
 
+import hashlib
 import os
+import re
 import secrets
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 def generate_document_id() -> str:
     """Return a short URL-safe identifier for stored documents."""
     return secrets.token_urlsafe(12)
 
+def is_valid_document_id(document_id: str) -> bool:
+    """Return True if `document_id` has the URL-safe shape produced by `generate_document_id`."""
+    return re.fullmatch(r"[A-Za-z0-9_-]+", document_id) is not None
+
+def content_id(text: str) -> str:
+    """Return a stable short id for a piece of text (e.g. a chunk), derived from its content."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
 def ensure_dir(path: str | Path) -> None:
     """Create a directory (including parents) if it does not exist."""
     Path(path).mkdir(parents=True, exist_ok=True)
 
 def get_file_size_bytes(file_path: str | Path) -> int:
     """Return file size in bytes."""
-    return os.path.getsize(file_path)
\ No newline at end of file
+    return os.path.getsize(file_path)
+
+
+@contextmanager
+def file_lock(path: str | Path) -> Iterator[None]:
+    """Hold an exclusive inter-process lock on `path` (created if missing) for the block."""
+    ensure_dir(Path(path).parent)
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,156 @@
+"""Memory-mapped per-document vector and chunk store.
+
+On-disk layout of one index directory:
+
+- `meta.json`    format version, vector dimension, chunk count, embedding model
+- `vectors.f32`  contiguous float32 matrix, one row per chunk
+- `norms.f32`    float32 squared L2 norm of each row
+- `offsets.i64`  int64 byte offsets of each chunk in `chunks.txt` (count + 1 entries)
+- `chunks.txt`   all chunk texts as one UTF-8 blob
+
+Opening a store only reads `meta.json` and maps the other files read-only, so
+it is O(1) and processes share pages through the OS page cache. Nothing is
+unpickled.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+
+from .utils import file_lock
+
+FORMAT_VERSION = 1
+
+
+def write_vector_store(
+    path: Path,
+    texts: List[str],
+    vectors: List[List[float]],
+    model: str,
+    extra_files: dict[str, bytes] | None = None,
+) -> None:
+    """Write a store to `path`, replacing any existing store at that path.
+
+    `extra_files` (name -> bytes) are written into the same directory before
+    the swap, so companion indexes are replaced atomically with the vectors.
+    Each writer stages into its own temp directory, and the swap itself runs
+    under a file lock, so concurrent writers of one store never clobber each
+    other; the last swap wins.
+    """
+    matrix = np.asarray(vectors, dtype="float32") if texts else np.zeros((0, 0), dtype="float32")
+    encoded = [t.encode("utf-8") for t in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype="int64")
+    if encoded:
+        offsets[1:] = np.cumsum([len(b) for b in encoded])
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(prefix=path.name + ".tmp-", dir=path.parent))
+    matrix.tofile(tmp / "vectors.f32")
+    np.einsum("ij,ij->i", matrix, matrix).astype("float32").tofile(tmp / "norms.f32")
+    offsets.tofile(tmp / "offsets.i64")
+    (tmp / "chunks.txt").write_bytes(b"".join(encoded))
+    for name, data in (extra_files or {}).items():
+        (tmp / name).write_bytes(data)
+    (tmp / "meta.json").write_text(
+        json.dumps({"version": FORMAT_VERSION, "dim": int(matrix.shape[1]), "count": len(texts), "model": model}),
+        encoding="utf-8",
+    )
+
+    # Swap directories; readers that already mapped the old files keep valid mappings.
+    old = path.with_name(path.name + ".old")
+    try:
+        with file_lock(path.with_name(path.name + ".lock")):
+            shutil.rmtree(old, ignore_errors=True)
+            if path.exists():
+                os.replace(path, old)
+            os.replace(tmp, path)
+            shutil.rmtree(old, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def swap_in_progress(path: Path) -> bool:
+    """Return True while `write_vector_store` is replacing the store at `path`.
+
+    Between its two renames `path` briefly does not exist; readers that fail
+    then should retry rather than report a missing index.
+    """
+    return path.with_name(path.name + ".old").exists()
+
+
+def is_vector_store(path: Path) -> bool:
+    """Return True if `path` holds a store in this format."""
+    return (path / "meta.json").exists()
+
+
+def store_version(path: Path) -> str | None:
+    """Return an id that changes whenever the store at `path` is rewritten, or None if there is none.
+
+    Every write creates a new `meta.json`, so its inode and mtime identify the build.
+    """
+    try:
+        st = os.stat(path / "meta.json")
+    except FileNotFoundError:
+        return None
+    return f"{st.st_ino}-{st.st_mtime_ns}"
+
+
+class MmapVectorStore:
+    """Read-only view of a store; brute-force L2 search over the mapped matrix."""
+
+    def __init__(self, path: Path):
+        self.version = store_version(path)
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported vector store version: {meta.get('version')}")
+        self.path = path
+        self.dim = int(meta["dim"])
+        self.count = int(meta["count"])
+        self.model = meta.get("model")
+
+        if self.count:
+            self.vectors = np.memmap(path / "vectors.f32", dtype="float32", mode="r", shape=(self.count, self.dim))
+            self.norms = np.memmap(path / "norms.f32", dtype="float32", mode="r", shape=(self.count,))
+            self.offsets = np.memmap(path / "offsets.i64", dtype="int64", mode="r", shape=(self.count + 1,))
+            with open(path / "chunks.txt", "rb") as f:
+                self._text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.offsets[-1] else b""
+        else:
+            self.vectors = np.zeros((0, self.dim), dtype="float32")
+            self.norms = np.zeros(0, dtype="float32")
+            self.offsets = np.zeros(1, dtype="int64")
+            self._text = b""
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes mapped by this store (vectors, norms, offsets and text)."""
+        return int(self.vectors.nbytes + self.norms.nbytes + self.offsets.nbytes + int(self.offsets[-1]))
+
+    def chunk_text(self, chunk_id: int) -> str:
+        """Decode the text of one chunk from the mapped blob."""
+        start, end = int(self.offsets[chunk_id]), int(self.offsets[chunk_id + 1])
+        return bytes(self._text[start:end]).decode("utf-8")
+
+    def distance(self, vector: List[float], chunk_id: int) -> float:
+        """Squared L2 distance between `vector` and one chunk."""
+        q = np.asarray(vector, dtype="float32")
+        return max(float(self.norms[chunk_id] - 2.0 * (self.vectors[chunk_id] @ q) + q @ q), 0.0)
+
+    def search_by_vector(self, vector: List[float], k: int) -> List[Tuple[int, float]]:
+        """Return `(chunk_id, squared L2 distance)` of the `k` nearest chunks, nearest first."""
+        if not self.count:
+            return []
+        q = np.asarray(vector, dtype="float32")
+        distances = self.norms - 2.0 * (self.vectors @ q) + float(q @ q)
+        k = min(k, self.count)
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        return [(int(i), max(float(distances[i]), 0.0)) for i in top]
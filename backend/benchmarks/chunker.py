@@ -0,0 +1,131 @@
+"""Chunker micro-benchmark: `app.chunking` against LangChain's RecursiveCharacterTextSplitter.
+
+Builds large synthetic texts and times producing both chunkings the app needs:
+the summarizer's (6000/400) and the index's (900/150). The baseline builds
+one splitter per chunking, as the services did. The candidate derives both
+layouts from one pass (`chunk_layouts`). Peak Python allocations are measured
+in a separate, untimed run with tracemalloc.
+
+Run from `backend/`:
+
+    python -m benchmarks.chunker --chars 100000,1000000,10000000 --repeat 5 -o chunker.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+from .pipeline import BACKEND_DIR, _csv, _git_commit, percentiles
+from .synthetic_pdf import DENSITIES, make_pages
+
+SUMMARY = (6000, 400)
+INDEX = (900, 150)
+INDEX_SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
+
+
+def synthetic_text(chars: int, density: str, seed: int) -> str:
+    """Return at least `chars` characters of page-structured prose (lines and blank-line page breaks)."""
+    pages: list[str] = []
+    total = 0
+    while total < chars:
+        page_lines, _ = make_pages(1, DENSITIES[density], seed + len(pages))
+        page = "\n".join(page_lines[0])
+        pages.append(page)
+        total += len(page) + 2
+    return "\n\n".join(pages)
+
+
+def _baseline() -> Callable[[str], dict] | None:
+    try:
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+    except ImportError:
+        return None
+
+    def run(text: str) -> dict:
+        summary = RecursiveCharacterTextSplitter(chunk_size=SUMMARY[0], chunk_overlap=SUMMARY[1]).split_text(text)
+        index = RecursiveCharacterTextSplitter(
+            chunk_size=INDEX[0], chunk_overlap=INDEX[1], separators=INDEX_SEPARATORS
+        ).split_text(text)
+        return {"summary": len(summary), "index": len(index)}
+
+    return run
+
+
+def _candidate() -> Callable[[str], dict]:
+    from app.chunking import ChunkSpec, chunk_layouts
+
+    specs = {"summary": ChunkSpec(*SUMMARY), "index": ChunkSpec(*INDEX)}
+
+    def run(text: str) -> dict:
+        return {name: len(offsets) for name, offsets in chunk_layouts(text, specs).items()}
+
+    return run
+
+
+def measure(run: Callable[[str], dict], text: str, repeat: int) -> dict:
+    """Time `repeat` runs, then one traced run for peak allocated memory."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = run(text)
+        samples.append(time.perf_counter() - start)
+    tracemalloc.start()
+    run(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "chunks": chunks,
+        "latency": percentiles(samples),
+        "mb_per_second": round(len(text) / 1e6 / min(samples), 2),
+        "peak_alloc_mb": round(peak / 1e6, 2),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--chars", type=_csv(int), default=[100_000, 1_000_000, 10_000_000], help="comma-separated text sizes"
+    )
+    parser.add_argument("--density", default="normal", choices=sorted(DENSITIES), help="lines per page")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per text size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", type=Path, help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    baseline = _baseline()
+    candidate = _candidate()
+    results = []
+    for chars in args.chars:
+        text = synthetic_text(chars, args.density, args.seed)
+        entry = {"chars": len(text), "chunking": measure(candidate, text, args.repeat)}
+        if baseline is not None:
+            entry["recursive_splitter"] = measure(baseline, text, args.repeat)
+            entry["speedup"] = round(
+                entry["recursive_splitter"]["latency"]["p50_ms"] / max(entry["chunking"]["latency"]["p50_ms"], 1e-3), 2
+            )
+        results.append(entry)
+
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "config": {"density": args.density, "repeat": args.repeat, "summary": SUMMARY, "index": INDEX},
+        "baseline_available": baseline is not None,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Compare two pipeline benchmark reports.
+
+    python -m benchmarks.compare baseline.json candidate.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+
+METRICS = ("p50_ms", "p90_ms", "p99_ms")
+
+
+def _delta(old: float | None, new: float | None) -> str:
+    if not old or new is None:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def compare(baseline: dict, candidate: dict) -> list[str]:
+    """Return human-readable lines comparing stage latencies, throughput, calls and memory."""
+    lines = [f"baseline {baseline.get('commit')}  →  candidate {candidate.get('commit')}"]
+    if baseline.get("config") != candidate.get("config"):
+        lines.append("warning: benchmark configs differ")
+
+    for stage, old in baseline["stages"].items():
+        new = candidate["stages"].get(stage, {})
+        cells = [f"{m} {old.get(m)} → {new.get(m)} ({_delta(old.get(m), new.get(m))})" for m in METRICS]
+        lines.append(f"{stage:<10} " + "  ".join(cells))
+
+    for section in ("throughput", "calls", "peak_rss_mb"):
+        for name, old in baseline.get(section, {}).items():
+            new = candidate.get(section, {}).get(name)
+            lines.append(f"{section}.{name}: {old} → {new} ({_delta(old, new)})")
+    return lines
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    args = parser.parse_args(argv)
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    candidate = json.loads(args.candidate.read_text(encoding="utf-8"))
+    print("\n".join(compare(baseline, candidate)))
+
+
+if __name__ == "__main__":
+    main()
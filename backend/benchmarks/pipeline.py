@@ -0,0 +1,210 @@
+"""End-to-end pipeline benchmark: upload → extract → summarize → index → ask.
+
+Drives the FastAPI app in-process (no sockets) with the offline model
+backends, from N concurrent clients, against a throwaway storage directory
+so storage and caches start cold. Prints (or writes) a JSON report that can
+be diffed between commits with `python -m benchmarks.compare`.
+
+Run from `backend/`:
+
+    python -m benchmarks.pipeline --pages 1,10,50 --density sparse,dense --clients 4 -o bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import product
+from pathlib import Path
+
+from .synthetic_pdf import DENSITIES, synthetic_pdf
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+STAGES = ("upload", "extract", "summarize", "index", "ask")
+
+
+def percentiles(samples: list[float]) -> dict:
+    """Summarize latencies (seconds) as count/mean/p50/p90/p99/max in milliseconds."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 2)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+        "p50_ms": pct(50),
+        "p90_ms": pct(90),
+        "p99_ms": pct(99),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+def _peak_rss_mb() -> dict:
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def _timed(timings: dict, stage: str, call):
+    start = time.perf_counter()
+    res = await call
+    timings[stage].append(time.perf_counter() - start)
+    if res.status_code >= 400:
+        raise RuntimeError(f"{stage} failed with {res.status_code}: {res.text[:200]}")
+    return res.json()
+
+
+async def _run_client(client, prefix: str, docs: list[dict], asks: int, timings: dict, results: list) -> None:
+    """Ingest each document profile in turn, then ask `asks` questions about its planted facts."""
+    for doc in docs:
+        pdf, facts = synthetic_pdf(doc["pages"], doc["density"], doc["seed"])
+        uploaded = await _timed(
+            timings, "upload",
+            client.post(f"{prefix}/upload", files={"file": ("bench.pdf", pdf, "application/pdf")}),
+        )
+        document_id = uploaded["document_id"]
+        await _timed(timings, "extract", client.post(f"{prefix}/extract", json={"document_id": document_id}))
+        await _timed(timings, "summarize", client.post(f"{prefix}/summarize", json={"document_id": document_id}))
+        await _timed(timings, "index", client.post(f"{prefix}/index", json={"document_id": document_id}))
+
+        for question, _ in (facts * asks)[:asks]:
+            await _timed(
+                timings, "ask",
+                client.post(f"{prefix}/ask", json={"document_id": document_id, "question": question}),
+            )
+        results.append(doc)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    """Run the benchmark and return the report."""
+    import httpx
+
+    from app import providers
+    from app.main import app
+    from app.config import settings
+
+    docs = [
+        {"pages": pages, "density": density}
+        for pages, density in product(args.pages, args.density)
+    ]
+    assignments = [
+        [{**doc, "seed": args.seed + client * 1000 + i} for i, doc in enumerate(docs)]
+        for client in range(args.clients)
+    ]
+
+    timings: dict[str, list[float]] = {stage: [] for stage in STAGES}
+    results: list[dict] = []
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            start = time.perf_counter()
+            await asyncio.gather(*(
+                _run_client(client, settings.API_PREFIX, assigned, args.asks, timings, results)
+                for assigned in assignments
+            ))
+            wall = time.perf_counter() - start
+            stats = (await client.get(f"{settings.API_PREFIX}/stats")).json()
+
+    total_docs = len(results)
+    total_pages = sum(r["pages"] for r in results)
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "config": {
+            "pages": args.pages,
+            "density": args.density,
+            "clients": args.clients,
+            "asks_per_doc": args.asks,
+            "fake_llm_latency_ms": settings.FAKE_LLM_LATENCY_MS,
+            "fake_llm_tokens_per_second": settings.FAKE_LLM_TOKENS_PER_SECOND,
+            "embedding_model": providers.embedding_model_name(),
+            "cpu_executor": settings.CPU_EXECUTOR,
+            "fused_ingest": settings.FUSED_INGEST,
+        },
+        "wall_seconds": round(wall, 3),
+        "throughput": {
+            "docs_per_second": round(total_docs / wall, 3),
+            "pages_per_second": round(total_pages / wall, 3),
+            "asks_per_second": round(len(timings["ask"]) / wall, 3),
+        },
+        "stages": {stage: percentiles(samples) for stage, samples in timings.items()},
+        "calls": dict(providers.call_counts),
+        "peak_rss_mb": _peak_rss_mb(),
+        "stats": stats,
+    }
+
+
+def _csv(cast):
+    return lambda value: [cast(v) for v in value.split(",") if v]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=_csv(int), default=[1, 10, 50], help="comma-separated page counts")
+    parser.add_argument(
+        "--density", type=_csv(str), default=["sparse", "dense"], help=f"comma-separated, from {sorted(DENSITIES)}"
+    )
+    parser.add_argument("--clients", type=int, default=4, help="concurrent clients, each ingesting every profile")
+    parser.add_argument("--asks", type=int, default=5, help="questions asked per document")
+    parser.add_argument("--llm-latency-ms", type=int, default=50, help="fake LLM time to first token")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=500.0, help="fake LLM throughput")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true", help="keep the working directory for inspection")
+    parser.add_argument("-o", "--output", type=Path, help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    # Storage and caches live in a scratch directory so every run starts cold.
+    workdir = tempfile.mkdtemp(prefix="docbench-")
+
+    # Settings are read at import, so configure the offline backends first.
+    os.environ.update({
+        "STORAGE_DIR": str(Path(workdir) / "storage"),
+        "LLM_PROVIDER": "fake",
+        "EMBEDDING_PROVIDER": "hashing",
+        "FAKE_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "FAKE_LLM_TOKENS_PER_SECOND": str(args.llm_tokens_per_second),
+        "GEMINI_API_KEY": "",
+        # All simulated clients share one address; don't rate-limit them.
+        "RATE_LIMIT_PER_MINUTE": "0",
+    })
+    sys.path.insert(0, str(BACKEND_DIR))
+    try:
+        report = asyncio.run(run(args))
+    finally:
+        if not args.keep:
+            import shutil
+
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
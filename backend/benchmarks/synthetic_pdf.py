@@ -0,0 +1,93 @@
+"""Deterministic synthetic PDFs for benchmarks.
+
+Pages are filled with pseudo-random prose drawn from a fixed vocabulary, plus
+planted "facts" that benchmark questions can ask about. The PDF is written
+by hand (one Helvetica text stream per page) so no PDF library is needed.
+"""
+
+from __future__ import annotations
+
+import random
+
+DENSITIES = {"sparse": 12, "normal": 30, "dense": 55}  # text lines per page
+
+_WORDS = (
+    "report project budget revenue quarter customer contract delivery schedule risk "
+    "team review policy compliance service system data analysis market growth cost "
+    "invoice payment supplier agreement milestone deadline audit security training "
+    "product release feedback support operations strategy forecast target region "
+    "the of and to in for on with by from at as is are was were will be has have"
+).split()
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(8, 16))]
+    return " ".join(words).capitalize() + "."
+
+
+def make_pages(pages: int, lines_per_page: int, seed: int) -> tuple[list[list[str]], list[tuple[str, str]]]:
+    """Return `(page_lines, facts)`; each fact is `(question, expected_answer)`."""
+    rng = random.Random(seed)
+    facts: list[tuple[str, str]] = []
+    page_lines: list[list[str]] = []
+    for page in range(pages):
+        lines: list[str] = []
+        text = ""
+        while len(lines) < lines_per_page:
+            text = (text + " " + _sentence(rng)).strip()
+            while len(text) > 90 and len(lines) < lines_per_page:
+                cut = text.rfind(" ", 0, 90)
+                lines.append(text[:cut])
+                text = text[cut + 1:]
+        milestone = f"M{seed % 1000}-{page}"
+        answer = f"{rng.randint(1, 28)} {rng.choice(['March', 'June', 'October'])} {rng.randint(2025, 2030)}"
+        lines[rng.randrange(len(lines))] = f"The deadline for milestone {milestone} is {answer}."
+        facts.append((f"What is the deadline for milestone {milestone}?", answer))
+        page_lines.append(lines)
+    return page_lines, facts
+
+
+def _escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def build_pdf(page_lines: list[list[str]]) -> bytes:
+    """Serialize text pages as a minimal PDF 1.4 document."""
+    n = len(page_lines)
+    # Object numbers: 1 catalog, 2 pages, 3 font, then (page, content) pairs.
+    objects: list[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        (
+            "<< /Type /Pages /Kids ["
+            + " ".join(f"{4 + 2 * i} 0 R" for i in range(n))
+            + f"] /Count {n} >>"
+        ).encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    for i, lines in enumerate(page_lines):
+        body = "BT /F1 10 Tf 13 TL 50 780 Td " + " ".join(f"({_escape(l)}) Tj T*" for l in lines) + " ET"
+        stream = body.encode("latin-1", errors="replace")
+        objects.append(
+            (
+                "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>"
+            ).encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % num + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def synthetic_pdf(pages: int, density: str = "normal", seed: int = 0) -> tuple[bytes, list[tuple[str, str]]]:
+    """Return `(pdf_bytes, facts)` for a document of `pages` pages."""
+    page_lines, facts = make_pages(pages, DENSITIES[density], seed)
+    return build_pdf(page_lines), facts
@@ -0,0 +1,45 @@
+import pytest
+
+from app import (
+    answer_cache,
+    corpus_index,
+    embedding_cache,
+    extraction,
+    index_cache,
+    ingest,
+    llm_cache,
+    providers,
+    query_embedder,
+    scheduler,
+    storage,
+)
+from app.config import settings
+from app.providers import ClientPool
+
+
+@pytest.fixture
+def offline(tmp_path, monkeypatch):
+    """Point storage at a temp directory and use the local fake LLM and hashing embeddings.
+
+    Resets the process-wide singletons so each test gets fresh stores and caches.
+    """
+    monkeypatch.setattr(settings, "LLM_PROVIDER", "fake")
+    monkeypatch.setattr(settings, "FAKE_LLM_LATENCY_MS", 0)
+    monkeypatch.setattr(settings, "FAKE_LLM_TOKENS_PER_SECOND", 1e6)
+    monkeypatch.setattr(settings, "EMBEDDING_PROVIDER", "hashing")
+    monkeypatch.setattr(storage, "_root", tmp_path)
+    for module, name in (
+        (storage, "_store"),
+        (answer_cache, "_answer_cache"),
+        (corpus_index, "_corpus"),
+        (embedding_cache, "_store"),
+        (extraction, "_page_cache"),
+        (index_cache, "_index_cache"),
+        (ingest, "_registry"),
+        (llm_cache, "_cache"),
+        (query_embedder, "_batcher"),
+        (scheduler, "_scheduler"),
+    ):
+        monkeypatch.setattr(module, name, None)
+    monkeypatch.setattr(providers, "_pool", ClientPool())
+    return tmp_path
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from app.admission import UNMATCHED, EndpointGate, QueueFull, classify
+
+
+def test_free_slots_are_taken_without_queueing():
+    async def run():
+        gate = EndpointGate(limit=2, max_queue=0, timeout=1.0)
+        await gate.acquire()
+        await gate.acquire()
+        assert gate.active == 2
+        assert gate.stats["queued"] == 0
+
+    asyncio.run(run())
+
+def test_full_queue_is_rejected():
+    async def run():
+        gate = EndpointGate(limit=1, max_queue=1, timeout=5.0)
+        await gate.acquire()
+        waiter = asyncio.ensure_future(gate.acquire())
+        await asyncio.sleep(0)
+        assert gate.waiting == 1
+        with pytest.raises(QueueFull) as rejected:
+            await gate.acquire()
+        assert rejected.value.reason == "queue_full"
+        assert rejected.value.retry_after > 0
+
+        gate.release(0.1)
+        await waiter
+        assert gate.active == 1 and gate.waiting == 0
+        assert gate.stats == {"admitted": 2, "queued": 1, "rejected_full": 1, "rejected_timeout": 0}
+
+    asyncio.run(run())
+
+def test_waiters_time_out():
+    async def run():
+        gate = EndpointGate(limit=1, max_queue=4, timeout=0.01)
+        await gate.acquire()
+        with pytest.raises(QueueFull) as rejected:
+            await gate.acquire()
+        assert rejected.value.reason == "queue_timeout"
+        assert gate.waiting == 0
+        assert gate.stats["rejected_timeout"] == 1
+
+    asyncio.run(run())
+
+def test_waiters_are_admitted_in_arrival_order():
+    async def run():
+        gate = EndpointGate(limit=1, max_queue=4, timeout=5.0)
+        await gate.acquire()
+        order = []
+
+        async def wait(name):
+            await gate.acquire()
+            order.append(name)
+
+        waiters = [asyncio.ensure_future(wait(name)) for name in "abc"]
+        await asyncio.sleep(0)
+        for _ in range(3):
+            gate.release(0.0)
+            await asyncio.sleep(0)
+        await asyncio.gather(*waiters)
+        assert order == ["a", "b", "c"]
+
+    asyncio.run(run())
+
+def test_classify_bounds_endpoints():
+    assert classify("GET", "/api/summary/abc") == ("read", "critical")
+    assert classify("GET", "/health") == ("read", "critical")
+    assert classify("POST", "/api/ask") == ("POST /api/ask", "interactive")
+    assert classify("POST", "/api/batch") == ("POST /api/batch", "heavy")
+    assert classify("POST", "/api/jobs") == ("POST /api/jobs", "heavy")
+    assert classify("DELETE", "/api/documents/abc") == ("DELETE /api/documents/{document_id}", "interactive")
+    assert classify("POST", "/wp-login.php") == (UNMATCHED, "interactive")
+    assert classify("POST", "/api/random-123") == (UNMATCHED, "interactive")
+
+
+def test_a_cancelled_waiter_gives_back_a_granted_slot():
+    async def run():
+        gate = EndpointGate(limit=1, max_queue=4, timeout=5.0)
+        await gate.acquire()
+        waiter = asyncio.ensure_future(gate.acquire())
+        await asyncio.sleep(0)
+        gate.release(0.0)  # the slot is handed to the waiter...
+        waiter.cancel()  # ...which is cancelled before it resumes
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert gate.active == 0 and gate.waiting == 0
+        await asyncio.wait_for(gate.acquire(), 1)
+
+    asyncio.run(run())
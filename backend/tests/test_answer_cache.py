@@ -0,0 +1,63 @@
+from app.answer_cache import SemanticAnswerCache
+
+VARIANT = (4, "hybrid")
+
+
+def _put(cache: SemanticAnswerCache, document_id: str, vector, answer: str, generation: int) -> None:
+    cache.put(document_id, VARIANT, vector, "question", answer, [{"chunk_id": 0}], generation)
+
+
+def test_similar_questions_hit_and_others_miss():
+    cache = SemanticAnswerCache(max_entries=10, threshold=0.9)
+    _put(cache, "doc", [1.0, 0.0], "answer", cache.generation("doc"))
+
+    hit = cache.get("doc", VARIANT, [0.99, 0.05])
+    assert hit is not None and hit.answer == "answer"
+    assert cache.get("doc", VARIANT, [0.0, 1.0]) is None
+    assert cache.get("doc", (8, "hybrid"), [1.0, 0.0]) is None
+    assert cache.get("other", VARIANT, [1.0, 0.0]) is None
+
+
+def test_invalidate_drops_answers_and_rejects_stale_puts():
+    cache = SemanticAnswerCache(max_entries=10, threshold=0.9)
+    generation = cache.generation("doc")
+    _put(cache, "doc", [1.0, 0.0], "old", generation)
+
+    cache.invalidate("doc")
+    assert cache.get("doc", VARIANT, [1.0, 0.0]) is None
+    # An answer computed against the old index must not be cached.
+    _put(cache, "doc", [1.0, 0.0], "stale", generation)
+    assert cache.get("doc", VARIANT, [1.0, 0.0]) is None
+
+    _put(cache, "doc", [1.0, 0.0], "new", cache.generation("doc"))
+    assert cache.get("doc", VARIANT, [1.0, 0.0]).answer == "new"
+
+
+def test_a_new_index_version_invalidates_the_document():
+    cache = SemanticAnswerCache(max_entries=10, threshold=0.9)
+    _put(cache, "doc", [1.0, 0.0], "v1", cache.generation("doc", "v1"))
+    _put(cache, "keep", [1.0, 0.0], "kept", cache.generation("keep", "k1"))
+
+    assert cache.get("doc", VARIANT, [1.0, 0.0]).answer == "v1"
+    cache.generation("doc", "v1")
+    assert cache.get("doc", VARIANT, [1.0, 0.0]) is not None
+    cache.generation("doc", "v2")
+    assert cache.get("doc", VARIANT, [1.0, 0.0]) is None
+    assert cache.get("keep", VARIANT, [1.0, 0.0]).answer == "kept"
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = SemanticAnswerCache(max_entries=2, threshold=0.99)
+    for i, vector in enumerate(([1.0, 0.0], [0.0, 1.0], [-1.0, 0.0])):
+        _put(cache, "doc", vector, f"a{i}", cache.generation("doc"))
+
+    assert cache.get("doc", VARIANT, [1.0, 0.0]) is None
+    assert cache.get("doc", VARIANT, [-1.0, 0.0]).answer == "a2"
+    assert cache.snapshot()["evictions"] == 1
+
+
+def test_hits_are_copies():
+    cache = SemanticAnswerCache(max_entries=10, threshold=0.9)
+    _put(cache, "doc", [1.0, 0.0], "answer", cache.generation("doc"))
+    cache.get("doc", VARIANT, [1.0, 0.0]).sources.append({"chunk_id": 99})
+    assert cache.get("doc", VARIANT, [1.0, 0.0]).sources == [{"chunk_id": 0}]
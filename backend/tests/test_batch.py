@@ -0,0 +1,110 @@
+import asyncio
+import io
+import threading
+import zipfile
+
+from app.batch import CrossDocumentEmbedder, run_batch, stage_uploads
+from app.config import settings
+from app.storage import get_store
+from benchmarks.synthetic_pdf import synthetic_pdf
+
+
+def _pdf(seed: int) -> bytes:
+    return synthetic_pdf(2, seed=seed)[0]
+
+
+def test_chunks_of_concurrent_documents_share_batches():
+    calls = []
+    lock = threading.Lock()
+
+    def embed(texts):
+        with lock:
+            calls.append(list(texts))
+        return [[float(t[1:])] for t in texts]
+
+    embedder = CrossDocumentEmbedder(embed, batch_size=4, linger=0.01)
+
+    async def run():
+        return await asyncio.gather(embedder.embed(["a1", "a2", "a3"]), embedder.embed(["b4", "b5", "b6"]))
+
+    first, second = asyncio.run(run())
+    assert first == [[1.0], [2.0], [3.0]] and second == [[4.0], [5.0], [6.0]]
+    assert sorted(map(len, calls)) == [2, 4]
+    assert embedder.stats == {"texts": 6, "batches": 2}
+
+
+def test_embedding_errors_reach_every_document():
+    def embed(texts):
+        raise RuntimeError("quota")
+
+    embedder = CrossDocumentEmbedder(embed, batch_size=10, linger=0.001)
+
+    async def run():
+        return await asyncio.gather(embedder.embed(["a"]), embedder.embed(["b"]), return_exceptions=True)
+
+    assert [str(r) for r in asyncio.run(run())] == ["quota", "quota"]
+
+
+def test_uploads_and_zips_are_staged(offline):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("inner/one.pdf", _pdf(1))
+        zf.writestr("notes.txt", "ignored")
+        zf.writestr("__MACOSX/inner/._one.pdf", b"junk")
+    archive.seek(0)
+    files = [
+        ("a.pdf", io.BytesIO(_pdf(0))),
+        ("bundle.zip", archive),
+        ("fake.pdf", io.BytesIO(b"not a pdf")),
+        ("broken.zip", io.BytesIO(b"PK junk")),
+    ]
+
+    accepted, rejected = stage_uploads(get_store(), files)
+
+    assert [a["filename"] for a in accepted] == ["a.pdf", "inner/one.pdf"]
+    assert all(get_store().blob_path(a["document_id"], "upload") for a in accepted)
+    assert {r["filename"]: r["error"] for r in rejected} == {
+        "fake.pdf": "Not a PDF file.",
+        "broken.zip": "Invalid zip archive.",
+    }
+
+
+def test_fused_ingest_reuses_duplicate_uploads(offline, monkeypatch):
+    monkeypatch.setattr(settings, "FUSED_INGEST", True)
+    store = get_store()
+    (first,), _ = stage_uploads(store, [("a.pdf", io.BytesIO(_pdf(0)))])
+    asyncio.run(run_batch([first["document_id"]], max_pages=2, summarize=False, index=False))
+
+    (again,), _ = stage_uploads(store, [("copy.pdf", io.BytesIO(_pdf(0)))])
+    assert again == {"filename": "copy.pdf", "document_id": first["document_id"], "reused": True}
+
+
+def test_documents_flow_through_every_stage(offline, monkeypatch):
+    # Long enough for every document's chunks to join one embedding batch.
+    monkeypatch.setattr(settings, "BATCH_EMBED_LINGER_MS", 200)
+    monkeypatch.setattr(settings, "BATCH_INDEX_CONCURRENCY", 3)
+    store = get_store()
+    accepted, _ = stage_uploads(store, [(f"{i}.pdf", io.BytesIO(_pdf(i))) for i in range(3)])
+    ids = [a["document_id"] for a in accepted]
+    events = []
+
+    result = asyncio.run(
+        run_batch(ids + ["missing"], max_pages=2, summarize=True, index=True, progress=lambda *e: events.append(e))
+    )
+
+    assert (result["succeeded"], result["failed"]) == (3, 1)
+    by_id = {d["document_id"]: d for d in result["documents"]}
+    for doc in ids:
+        assert by_id[doc]["status"] == "succeeded"
+        assert by_id[doc]["chunks_indexed"] > 0 and by_id[doc]["summary_llm_calls"] > 0
+        assert store.get_text(doc, "summary")
+    assert by_id["missing"]["error"].startswith("extract:")
+    assert events[-1] == ("documents", 4, 4)
+    assert result["embedding_batches"] == 1
+
+
+def test_the_batch_limit_rejects_extra_files(offline, monkeypatch):
+    monkeypatch.setattr(settings, "BATCH_MAX_DOCUMENTS", 1)
+    accepted, rejected = stage_uploads(get_store(), [("a.pdf", io.BytesIO(_pdf(0))), ("b.pdf", io.BytesIO(_pdf(1)))])
+    assert len(accepted) == 1
+    assert rejected == [{"filename": "b.pdf", "error": "Batch limit of 1 reached."}]
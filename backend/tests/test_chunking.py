@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+from app.chunking import ChunkSpec, chunk_layouts, chunk_offsets, iter_chunks, slice_chunks
+
+
+def _text(seed: int = 0, paragraphs: int = 40) -> str:
+    rng = random.Random(seed)
+    words = ["alpha", "beta", "gamma", "delta", "epsilon", "lorem", "ipsum", "dolor", "sit", "amet"]
+    out = []
+    for _ in range(paragraphs):
+        sentences = []
+        for _ in range(rng.randint(2, 8)):
+            sentences.append(" ".join(rng.choice(words) for _ in range(rng.randint(4, 30))).capitalize() + ".")
+        lines = [" ".join(sentences[i:i + 3]) for i in range(0, len(sentences), 3)]
+        out.append("\n".join(lines))
+    return "\n\n".join(out)
+
+
+def _check_invariants(text: str, spans: list[tuple[int, int]], size: int, overlap: int) -> None:
+    assert spans, "non-empty text must produce chunks"
+    covered = bytearray(len(text))
+    prev_start, prev_end = -1, -1
+    for start, end in spans:
+        assert 0 <= start < end <= len(text)
+        assert end - start <= size
+        # Chunks are trimmed of surrounding whitespace.
+        assert not text[start].isspace() and not text[end - 1].isspace()
+        # Chunks move forward, and repeat at most `overlap` characters of the previous one.
+        assert start > prev_start
+        assert start >= prev_end - overlap
+        prev_start, prev_end = start, end
+        covered[start:end] = b"\x01" * (end - start)
+    # Every non-whitespace character lands in some chunk.
+    assert all(covered[i] or ch.isspace() for i, ch in enumerate(text))
+
+
+@pytest.mark.parametrize("size,overlap", [(900, 150), (6000, 400), (120, 30), (50, 0)])
+def test_chunks_respect_size_and_overlap(size, overlap):
+    text = _text()
+    spans = list(iter_chunks(text, size, overlap))
+    _check_invariants(text, spans, size, overlap)
+
+
+def test_small_pieces_are_repeated_as_overlap():
+    text = " ".join(f"w{i:03d}" for i in range(300))
+    spans = list(iter_chunks(text, 100, 30))
+    _check_invariants(text, spans, 100, 30)
+    for (_, prev_end), (start, _) in zip(spans, spans[1:]):
+        assert prev_end - 30 <= start < prev_end
+
+
+def test_unbroken_text_is_cut_at_size():
+    text = "x" * 1000
+    spans = list(iter_chunks(text, 300, 0))
+    assert spans == [(0, 300), (300, 600), (600, 900), (900, 1000)]
+
+
+def test_short_and_blank_text():
+    assert list(iter_chunks("  hello world  ", 100, 10)) == [(2, 13)]
+    assert list(iter_chunks("   \n\n  ", 100, 10)) == []
+    assert chunk_offsets("", 100, 10).shape == (0, 2)
+
+
+def test_chunk_offsets_limit_and_slicing():
+    text = _text(1)
+    offsets = chunk_offsets(text, 200, 40, limit=5)
+    assert offsets.shape == (5, 2)
+    assert slice_chunks(text, offsets) == [text[s:e] for s, e in offsets.tolist()]
+
+
+def test_layouts_from_one_pass_keep_each_spec():
+    text = _text(2)
+    specs = {"summary": ChunkSpec(6000, 400), "index": ChunkSpec(900, 150)}
+    layouts = chunk_layouts(text, specs)
+    assert set(layouts) == set(specs)
+    for name, spec in specs.items():
+        _check_invariants(text, [tuple(span) for span in layouts[name].tolist()], spec.size, spec.overlap)
+    assert len(layouts["index"]) > len(layouts["summary"])
+    assert chunk_layouts(text, {}) == {}
@@ -0,0 +1,33 @@
+from app.context import pack_context
+
+TEXT = " ".join(f"word{i}" for i in range(400))
+
+
+def _chunks(size: int, overlap: int) -> tuple[list[tuple[int, int]], list[str]]:
+    spans = [(start, min(start + size, len(TEXT))) for start in range(0, len(TEXT) - overlap, size - overlap)]
+    return spans, [TEXT[s:e] for s, e in spans]
+
+
+def test_overlapping_neighbours_are_merged_without_repeating_text():
+    spans, chunks = _chunks(300, 60)
+    packed = pack_context([(2, 0.5), (1, 0.9), (5, 0.2)], spans, chunks.__getitem__, 10_000)
+
+    assert [p["chunk_ids"] for p in packed] == [[1, 2], [5]]
+    assert packed[0]["text"] == TEXT[spans[1][0]:spans[2][1]].strip()
+    assert packed[0]["score"] == 0.9
+
+
+def test_spans_are_taken_best_first_and_the_last_is_truncated():
+    spans, chunks = _chunks(400, 0)
+    packed = pack_context([(0, 0.1), (3, 0.9), (6, 0.5)], spans, chunks.__getitem__, 150)
+
+    assert [p["chunk_ids"] for p in packed] == [[3], [6]]
+    assert packed[0]["text"] == chunks[3].strip()
+    assert chunks[6].startswith(packed[1]["text"]) and len(packed[1]["text"]) < len(chunks[6])
+    assert sum(p["tokens"] for p in packed) <= 150
+
+
+def test_chunks_without_spans_are_never_merged():
+    chunks = ["alpha beta", "beta gamma", "   "]
+    packed = pack_context([(0, 0.3), (1, 0.7), (2, 0.9)], None, chunks.__getitem__, 100)
+    assert [p["chunk_ids"] for p in packed] == [[1], [0]]
@@ -0,0 +1,60 @@
+import numpy as np
+
+from app.corpus_index import CorpusIndex
+
+
+def _vectors(n: int, seed: int, dim: int = 8) -> list[list[float]]:
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype("float32").tolist()
+
+
+def test_reindexing_applies_a_diff(tmp_path):
+    corpus = CorpusIndex(tmp_path)
+    texts = [f"chunk {i}" for i in range(5)]
+    vectors = _vectors(5, seed=1)
+    assert corpus.add_document("doc", texts, vectors) == {"added": 5, "kept": 0, "removed": 0}
+
+    # Drop chunk 0, keep 1-4 (shifted down one position) and append a new chunk.
+    diff = corpus.add_document("doc", texts[1:] + ["chunk new"], vectors[1:] + _vectors(1, seed=2))
+    assert diff == {"added": 1, "kept": 4, "removed": 1}
+    assert corpus.snapshot() == {"vectors": 5, "documents": 1, "index_type": "flat"}
+
+    hit = corpus.search(vectors[3], 1)[0]
+    assert (hit["text"], hit["chunk_id"]) == ("chunk 3", 2)
+    assert corpus.add_document("doc", [], []) == {"added": 0, "kept": 0, "removed": 5}
+
+
+def test_searches_can_be_restricted_to_documents(tmp_path):
+    corpus = CorpusIndex(tmp_path)
+    vectors = _vectors(6, seed=3)
+    corpus.add_document("a", [f"a{i}" for i in range(3)], vectors[:3])
+    corpus.add_document("b", [f"b{i}" for i in range(3)], vectors[3:])
+
+    assert {h["document_id"] for h in corpus.search(vectors[0], 6)} == {"a", "b"}
+    hits = corpus.search(vectors[0], 6, document_ids=["b"])
+    assert len(hits) == 3 and {h["document_id"] for h in hits} == {"b"}
+    assert corpus.search(vectors[0], 6, document_ids=[]) == []
+    assert corpus.search(vectors[0], 6, document_ids=["missing"]) == []
+
+
+def test_large_corpora_switch_to_ivf(tmp_path):
+    corpus = CorpusIndex(tmp_path, ivf_threshold=100, nprobe=64)
+    vectors = _vectors(120, seed=4)
+    corpus.add_document("a", [f"a{i}" for i in range(60)], vectors[:60])
+    assert corpus.snapshot()["index_type"] == "flat"
+    corpus.add_document("b", [f"b{i}" for i in range(60)], vectors[60:])
+    assert corpus.snapshot() == {"vectors": 120, "documents": 2, "index_type": "ivf"}
+
+    assert corpus.search(vectors[70], 1)[0]["text"] == "b10"
+    assert corpus.search(vectors[70], 1, document_ids=["a"])[0]["document_id"] == "a"
+
+    # Another process opening the same directory sees the persisted IVF index.
+    reopened = CorpusIndex(tmp_path, ivf_threshold=100, nprobe=64)
+    assert reopened.search(vectors[5], 1)[0]["text"] == "a5"
+    assert reopened.is_ivf
+
+
+def test_a_new_embedding_dimension_replaces_old_vectors(tmp_path):
+    corpus = CorpusIndex(tmp_path)
+    corpus.add_document("a", ["a0"], _vectors(1, seed=5, dim=8))
+    corpus.add_document("b", ["b0"], _vectors(1, seed=6, dim=4))
+    assert corpus.snapshot() == {"vectors": 1, "documents": 1, "index_type": "flat"}
@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from app import extraction
+from app.extraction import PageCache, extract_pdf_text, file_sha256
+from benchmarks.synthetic_pdf import synthetic_pdf
+
+
+@pytest.fixture
+def page_cache(tmp_path, monkeypatch):
+    cache = PageCache(tmp_path / "pages.sqlite3")
+    monkeypatch.setattr(extraction, "_page_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    data, _ = synthetic_pdf(5, seed=1)
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(data)
+    return path
+
+
+def test_pages_are_extracted_in_order_and_cached(page_cache, pdf):
+    file_hash = file_sha256(pdf)
+    text, pages_processed, total_pages = asyncio.run(extract_pdf_text(pdf, 3, file_hash=file_hash))
+
+    assert (pages_processed, total_pages) == (3, 5)
+    assert text
+    cached = page_cache.get_pages(file_hash, 5)
+    assert sorted(cached) == [0, 1, 2]
+    assert text == "\n\n".join(cached[i] for i in range(3))
+
+    # A repeat is served from the cache without reading the PDF.
+    pdf.unlink()
+    assert asyncio.run(extract_pdf_text(pdf, 3, file_hash=file_hash)) == (text, 3, 5)
+
+
+def test_page_cap_is_enforced(page_cache, pdf, monkeypatch):
+    monkeypatch.setattr(extraction.settings, "MAX_PDF_PAGES", 4)
+    with pytest.raises(ValueError):
+        asyncio.run(extract_pdf_text(pdf, 3))
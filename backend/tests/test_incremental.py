@@ -0,0 +1,67 @@
+import asyncio
+
+from app import llm_service, pipeline, rag_service
+from app.config import settings
+from app.storage import get_store
+
+
+def _document(sections: int, edited: int | None = None) -> str:
+    """Distinct sentences per section; `edited` rewrites every sentence of one section."""
+    return " ".join(
+        f"Section {i} {'revised' if i == edited else 'original'} sentence {j} describes topic {i * 100 + j} in detail."
+        for i in range(sections)
+        for j in range(60)
+    )
+
+
+def test_reindexing_embeds_only_changed_chunks(offline, monkeypatch):
+    embedded = []
+    real_embed = rag_service.embed_texts
+
+    def recording_embed(texts):
+        embedded.append(list(texts))
+        return real_embed(texts)
+
+    monkeypatch.setattr(rag_service, "embed_texts", recording_embed)
+    store = get_store()
+    store.put_text("doc", "text", _document(10))
+    chunks, reused, _ = rag_service.build_and_save_index("doc")
+    assert reused == 0 and sum(map(len, embedded)) == chunks
+    before = set(rag_service.prepare_index_chunks("doc")[0])
+
+    embedded.clear()
+    store.put_text("doc", "text", _document(10, edited=9))
+    after, _ = rag_service.prepare_index_chunks("doc")
+    chunks, reused, _ = rag_service.build_and_save_index("doc")
+    changed = [t for t in after if t not in before]
+
+    assert 0 < len(changed) < chunks / 2
+    assert [t for batch in embedded for t in batch] == changed
+    assert reused == chunks - len(changed)
+
+
+def test_resummarizing_reruns_only_changed_leaves(offline, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "SUMMARY_REDUCE_TOKEN_BUDGET", 100)
+    stages = []
+    real_completion = llm_service.cached_completion
+
+    async def recording_completion(prompt, llm, inputs, stage="llm"):
+        stages.append(stage)
+        return await real_completion(prompt, llm, inputs, stage=stage)
+
+    monkeypatch.setattr(llm_service, "cached_completion", recording_completion)
+    store = get_store()
+    store.put_text("doc", "text", _document(12))
+    first = asyncio.run(pipeline.summarize_document("doc"))
+    assert first["tree_depth"] > 2 and first["llm_calls_reused"] == 0
+    assert len(stages) == first["llm_calls"]
+
+    stages.clear()
+    store.put_text("doc", "text", _document(12, edited=11))
+    second = asyncio.run(pipeline.summarize_document("doc"))
+
+    # The last section only touches the last leaf; everything else comes from the stored tree.
+    assert stages.count("map") == 1
+    assert len(stages) <= second["tree_depth"] + 1
+    assert second["llm_calls_reused"] == second["llm_calls"] - len(stages)
@@ -0,0 +1,63 @@
+import asyncio
+import threading
+import time
+
+from app import rag_service
+from app.index_cache import IndexCache
+from app.storage import get_store
+
+
+def test_concurrent_misses_share_one_load():
+    cache = IndexCache(max_bytes=100, sizeof=lambda value: 1)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        time.sleep(0.01)
+        return "index"
+
+    threads = [threading.Thread(target=lambda: [cache.get_or_load("doc", loader) for _ in range(20)]) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(loads) == 1
+    assert cache.snapshot()["hits"] >= 8 * 20 - 8
+
+
+def test_invalidation_discards_a_load_in_flight():
+    cache = IndexCache(max_bytes=100, sizeof=lambda value: 1)
+
+    def loader():
+        cache.invalidate("doc")  # a rebuild lands while the old index loads
+        return "old"
+
+    assert cache.get_or_load("doc", loader) == "old"
+    assert cache.get_or_load("doc", lambda: "new") == "new"
+
+
+def test_entries_are_evicted_to_the_byte_budget():
+    cache = IndexCache(max_bytes=10, sizeof=len)
+    cache.get_or_load("a", lambda: "x" * 6)
+    cache.get_or_load("b", lambda: "y" * 6)
+    assert cache.snapshot()["entries"] == 1
+    assert cache.get_or_load("a", lambda: "reloaded") == "reloaded"
+    # Values larger than the whole budget are returned but never cached.
+    assert cache.get_or_load("big", lambda: "z" * 11) == "z" * 11
+    assert cache.get_or_load("big", lambda: "again") == "again"
+
+
+def test_a_question_loads_the_index_once(offline, monkeypatch):
+    get_store().put_text("doc", "text", "The launch code is 4711. " * 50)
+    rag_service.build_and_save_index("doc")
+    loads = []
+    real_load = rag_service.load_index
+
+    def counting_load(document_id):
+        loads.append(document_id)
+        return real_load(document_id)
+
+    monkeypatch.setattr(rag_service, "load_index", counting_load)
+    answer, sources = asyncio.run(rag_service.answer_question("doc", "What is the launch code?"))
+    assert sources and answer
+    assert loads == ["doc"]
@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+from app.jobs import JobQueue
+
+
+async def _echo(document_id: str, params: dict, progress) -> dict:
+    progress("work", 1, 1)
+    return {"document_id": document_id, **params}
+
+
+async def _fail(document_id: str, params: dict, progress) -> dict:
+    raise ValueError("boom")
+
+
+def _queue(tmp_path, **kwargs) -> JobQueue:
+    return JobQueue(tmp_path / "jobs.sqlite3", runners={"echo": _echo, "fail": _fail}, **kwargs)
+
+
+async def _wait(queue: JobQueue, job_id: str) -> dict:
+    async for job in queue.events(job_id, poll_seconds=0.01):
+        pass
+    return job
+
+
+def test_jobs_run_and_report_results(tmp_path):
+    async def run():
+        queue = _queue(tmp_path)
+        await queue.start()
+        try:
+            ok = queue.submit("echo", "doc", {"n": 1})
+            bad = queue.submit("fail", "doc")
+            return await _wait(queue, ok["id"]), await _wait(queue, bad["id"])
+        finally:
+            await queue.stop()
+
+    ok, bad = asyncio.run(run())
+    assert ok["status"] == "succeeded"
+    assert ok["result"] == {"document_id": "doc", "n": 1}
+    assert ok["message"] == "work 1/1"
+    assert bad["status"] == "failed" and bad["error"] == "boom"
+
+
+def test_identical_pending_jobs_are_deduplicated(tmp_path):
+    async def run():
+        queue = _queue(tmp_path)
+        queue._queue = asyncio.Queue()  # submit without workers
+        first = queue.submit("echo", "doc", {"n": 1})
+        assert queue.submit("echo", "doc", {"n": 1})["id"] == first["id"]
+        assert queue.submit("echo", "doc", {"n": 2})["id"] != first["id"]
+
+    asyncio.run(run())
+
+
+def test_jobs_with_expired_leases_are_retried(tmp_path):
+    async def run():
+        crashed = _queue(tmp_path)
+        crashed._queue = asyncio.Queue()
+        job = crashed.submit("echo", "doc")
+        crashed._claim(job["id"])
+        # The claiming process died: its lease ran out without being renewed.
+        crashed._update(job["id"], lease_until=time.time() - 1)
+
+        queue = _queue(tmp_path)
+        await queue.start()
+        try:
+            return await _wait(queue, job["id"])
+        finally:
+            await queue.stop()
+
+    job = asyncio.run(run())
+    assert job["status"] == "succeeded"
+    assert job["attempts"] == 2
+
+
+def test_jobs_fail_after_max_attempts(tmp_path):
+    queue = _queue(tmp_path, max_attempts=1)
+    queue._queue = asyncio.Queue()
+    job = queue.submit("echo", "doc")
+    queue._claim(job["id"])
+    queue._update(job["id"], lease_until=time.time() - 1)
+
+    assert queue._requeue_expired() == []
+    assert queue.get(job["id"])["status"] == "failed"
+
+
+def test_prune_removes_only_old_finished_jobs(tmp_path):
+    queue = _queue(tmp_path)
+    queue._queue = asyncio.Queue()
+    old_done = queue.submit("echo", "a")["id"]
+    old_queued = queue.submit("echo", "b")["id"]
+    recent_done = queue.submit("echo", "c")["id"]
+    queue._update(old_done, status="succeeded")
+    queue._update(recent_done, status="failed")
+    with queue._lock:
+        queue._db.execute("UPDATE jobs SET updated = ? WHERE id IN (?, ?)", (time.time() - 7200, old_done, old_queued))
+
+    assert queue.prune(3600) == 1
+    assert queue.get(old_done) is None
+    assert queue.get(old_queued) is not None
+    assert queue.get(recent_done) is not None
@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from app import llm_service, providers
+from app.llm_cache import LLMCache, make_cache_key
+from app.providers import FakeChatModel
+
+
+def test_keys_cover_model_temperature_and_messages():
+    messages = [SystemMessage(content="s"), HumanMessage(content="q")]
+    key = make_cache_key("m", 0.0, messages)
+    assert key == make_cache_key("m", 0.0, [SystemMessage(content="s"), HumanMessage(content="q")])
+    assert key != make_cache_key("other", 0.0, messages)
+    assert key != make_cache_key("m", 0.5, messages)
+    assert key != make_cache_key("m", 0.0, [HumanMessage(content="s"), HumanMessage(content="q")])
+
+
+def test_disk_tier_serves_memory_misses_and_survives_restarts(tmp_path):
+    cache = LLMCache(tmp_path / "llm.sqlite3", memory_items=1)
+    cache.set("a", "A")
+    cache.set("b", "B")  # pushes "a" out of the memory tier
+    assert cache.get("b") == "B"
+    assert cache.get("a") == "A"
+    assert cache.get("missing") is None
+    stats = cache.snapshot()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (1, 1, 1)
+
+    reopened = LLMCache(tmp_path / "llm.sqlite3")
+    assert reopened.get("b") == "B"
+    assert reopened.snapshot()["disk_hits"] == 1
+
+
+def test_expired_entries_miss(tmp_path, monkeypatch):
+    cache = LLMCache(tmp_path / "llm.sqlite3", memory_items=0, ttl_seconds=60)
+    cache.set("a", "A")
+    later = time.time() + 120
+    monkeypatch.setattr("app.llm_cache.time.time", lambda: later)
+    assert cache.get("a") is None
+
+
+def test_eviction_keeps_the_disk_tier_under_its_byte_budget(tmp_path):
+    cache = LLMCache(tmp_path / "llm.sqlite3", memory_items=0, max_bytes=50 * 10)
+    for i in range(100):  # the 100th write triggers an eviction pass
+        cache.set(f"k{i}", "x" * 10)
+    assert cache.snapshot()["evictions"] == 50
+    assert cache.get("k0") is None
+    assert cache.get("k99") == "x" * 10
+
+
+def test_repeated_prompts_call_the_model_once(offline):
+    llm = FakeChatModel(latency_seconds=0, tokens_per_second=1e6)
+    before = providers.call_counts["llm"]
+
+    async def run():
+        inputs = {"text": "The quarterly report shows revenue grew by twelve percent."}
+        return [await llm_service.cached_completion(llm_service.MAP_PROMPT, llm, inputs) for _ in range(3)]
+
+    first, second, third = asyncio.run(run())
+    assert first == second == third
+    assert providers.call_counts["llm"] - before == 1
@@ -0,0 +1,56 @@
+import asyncio
+import warnings
+
+import pytest
+
+from app import providers
+from app.config import settings
+from app.providers import ClientPool, FakeChatModel, HashingEmbeddings
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = ClientPool()
+    monkeypatch.setattr(providers, "_pool", pool)
+    return pool
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_PROVIDER", "gemini")
+    monkeypatch.setattr(settings, "GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(settings, "GEMINI_TRANSPORT", "")
+
+
+def test_clients_are_built_once_and_reused(pool, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_PROVIDER", "fake")
+    monkeypatch.setattr(settings, "EMBEDDING_PROVIDER", "hashing")
+    assert isinstance(providers.get_llm(), FakeChatModel)
+    assert providers.get_llm() is providers.get_llm()
+    assert isinstance(providers.get_embeddings_client(), HashingEmbeddings)
+    assert pool.snapshot()["created"] == 2
+
+
+def test_gemini_client_built_off_the_loop_is_replaced_on_it(pool, gemini):
+    threaded = providers.get_llm()
+    assert threaded.async_client is None
+    # Off the loop the sync-only client is still fine to reuse.
+    assert providers.get_llm() is threaded
+
+    async def on_loop():
+        return providers.get_llm()
+
+    llm = asyncio.run(on_loop())
+    assert llm is not threaded
+    assert llm.async_client is not None
+
+
+def test_close_awaits_async_transports(pool, gemini):
+    async def run():
+        providers.get_llm()
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            await providers.close_clients()
+
+    asyncio.run(run())
+    assert pool.snapshot() == {"created": 1, "reused": 0, "closed": 1, "clients": 0}
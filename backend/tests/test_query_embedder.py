@@ -0,0 +1,76 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.query_embedder import QueryEmbeddingBatcher
+
+
+class Recorder:
+    def __init__(self, fail: Exception | None = None, block: threading.Event | None = None):
+        self.calls: list[list[str]] = []
+        self.fail = fail
+        self.block = block
+
+    def __call__(self, texts: list[str]) -> list[list[float]]:
+        self.calls.append(list(texts))
+        if self.block is not None:
+            self.block.wait(5)
+        if self.fail is not None:
+            raise self.fail
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+def test_concurrent_questions_share_one_call_and_hit_the_cache():
+    embed = Recorder()
+    batcher = QueryEmbeddingBatcher(embed, window_seconds=0.01)
+
+    async def run():
+        first = await asyncio.gather(batcher.embed("What is X?"), batcher.embed("what  is x?"), batcher.embed("Why?"))
+        again = await batcher.embed("WHAT IS X?")
+        return first, again
+
+    (a, b, c), again = asyncio.run(run())
+    assert embed.calls == [["what is x?", "why?"]]
+    assert a == b == again == [10.0, 1.0]
+    assert c == [4.0, 1.0]
+    assert batcher.snapshot()["hits"] == 1
+
+
+def test_full_batches_are_sent_without_waiting_for_the_window():
+    embed = Recorder()
+    batcher = QueryEmbeddingBatcher(embed, window_seconds=10, max_batch=2)
+
+    async def run():
+        return await asyncio.wait_for(asyncio.gather(batcher.embed("a"), batcher.embed("b")), 1)
+
+    assert len(asyncio.run(run())) == 2
+    assert embed.calls == [["a", "b"]]
+
+
+def test_errors_reach_every_waiter():
+    batcher = QueryEmbeddingBatcher(Recorder(fail=RuntimeError("quota")), window_seconds=0.001)
+
+    async def run():
+        return await asyncio.gather(batcher.embed("a"), batcher.embed("b"), return_exceptions=True)
+
+    assert [str(r) for r in asyncio.run(run())] == ["quota", "quota"]
+
+
+def test_a_cancelled_batch_cancels_its_waiters():
+    release = threading.Event()
+    batcher = QueryEmbeddingBatcher(Recorder(block=release), window_seconds=0.001)
+
+    async def run():
+        waiter = asyncio.ensure_future(batcher.embed("a"))
+        while not batcher._tasks:
+            await asyncio.sleep(0.001)
+        for task in batcher._tasks:
+            task.cancel()
+        try:
+            with pytest.raises(asyncio.CancelledError):
+                await asyncio.wait_for(waiter, 1)
+        finally:
+            release.set()
+
+    asyncio.run(run())
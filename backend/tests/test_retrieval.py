@@ -0,0 +1,61 @@
+import asyncio
+
+from app import rag_service
+from app.bm25 import BM25Index, looks_lexical, reciprocal_rank_fusion, terms
+from app.storage import get_store
+
+CHUNKS = [
+    "The invoice INV-2024-07 was paid on 2024-05-01 by the finance team.",
+    "Shipping delays affected the northern warehouse during the winter.",
+    "The finance team reviews every invoice before the quarterly close.",
+    "Employees may work remotely up to three days per week.",
+]
+
+
+def test_codes_and_dates_stay_single_terms():
+    assert terms("What is the status of INV-2024-07 since 2024-05-01?") == ["status", "inv-2024-07", "since", "2024-05-01"]
+
+
+def test_bm25_ranks_rare_terms_first_and_applies_the_floor():
+    index = BM25Index.from_json(BM25Index.build(CHUNKS).to_json())
+    hits = index.search("finance invoice INV-2024-07", 4)
+    assert [chunk_id for chunk_id, _ in hits] == [0, 2]
+    assert hits[0][1] > hits[1][1]
+    assert index.search("the of and", 4) == []
+    assert index.search("remote warehouse", 4, min_score=0.9) == []
+    assert [i for i, _ in index.search("remotely warehouse", 4)] == [1, 3]
+
+
+def test_rrf_rewards_agreement_between_rankings():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [4, 2, 5]], k=60)
+    assert fused[0] == (2, 2 / 62)
+    assert {item for item, _ in fused} == {1, 2, 3, 4, 5}
+    assert reciprocal_rank_fusion([[], []]) == []
+
+
+def test_keyword_questions_are_answered_lexically():
+    assert looks_lexical('Where is "northern warehouse" mentioned?')
+    assert looks_lexical("INV-2024-07 status")
+    assert not looks_lexical("Which team reviews invoices before the close?")
+    assert not looks_lexical("status")
+
+
+def test_hybrid_retrieval_fuses_both_rankings(offline):
+    get_store().put_text("doc", "text", "\n\n".join(CHUNKS))
+    rag_service.build_and_save_index("doc", rag_service.RagConfig(chunk_size=80, chunk_overlap=0))
+    index = rag_service.load_index("doc")
+
+    async def run(question, retrieval):
+        return await rag_service._retrieve(index, question, 3, retrieval)
+
+    context, sources = asyncio.run(run("INV-2024-07", "auto"))
+    assert "INV-2024-07" in context
+    assert sources and all(src["score"] is None and src["bm25_score"] for src in sources)
+
+    context, sources = asyncio.run(run("Who reviews every invoice before the quarterly close?", "hybrid"))
+    assert sources[0]["chunk_id"] == 2
+    assert sources[0]["bm25_score"] and sources[0]["score"] is not None
+    assert context.startswith("[Chunks 2]") and "quarterly close" in context
+    assert sources == sorted(sources, key=lambda src: src["fused_score"], reverse=True)
+
+    assert asyncio.run(run("zebra giraffe", "lexical")) == ("", [])
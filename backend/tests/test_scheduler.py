@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from app.scheduler import LLMScheduler, gather_ordered, is_retryable
+
+
+class ProviderError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def _scheduler(**kwargs) -> LLMScheduler:
+    kwargs.setdefault("retry_base_seconds", 0.001)
+    kwargs.setdefault("retry_max_seconds", 0.001)
+    return LLMScheduler(**kwargs)
+
+
+def test_map_keeps_input_order_and_bounds_concurrency():
+    scheduler = _scheduler(max_in_flight=3)
+    active = 0
+    peak = 0
+
+    async def call(i: int) -> int:
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        # Later items finish first.
+        await asyncio.sleep(0.001 * (10 - i))
+        active -= 1
+        return i * i
+
+    results = asyncio.run(scheduler.map(call, list(range(10))))
+    assert results == [i * i for i in range(10)]
+    assert peak == 3
+
+
+def test_retryable_errors_are_retried():
+    scheduler = _scheduler(max_retries=3)
+    attempts = 0
+
+    async def flaky() -> str:
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            raise ProviderError(429)
+        return "ok"
+
+    assert asyncio.run(scheduler.submit(flaky)) == "ok"
+    assert attempts == 3
+
+
+def test_retries_stop_after_max_retries():
+    scheduler = _scheduler(max_retries=2)
+    attempts = 0
+
+    async def down() -> str:
+        nonlocal attempts
+        attempts += 1
+        raise ProviderError(503)
+
+    with pytest.raises(ProviderError):
+        asyncio.run(scheduler.submit(down))
+    assert attempts == 3
+
+
+def test_non_retryable_errors_fail_immediately():
+    scheduler = _scheduler(max_retries=5)
+    attempts = 0
+
+    async def bad_request() -> str:
+        nonlocal attempts
+        attempts += 1
+        raise ProviderError(400)
+
+    with pytest.raises(ProviderError):
+        asyncio.run(scheduler.submit(bad_request))
+    assert attempts == 1
+
+
+def test_is_retryable_follows_the_cause_chain():
+    try:
+        try:
+            raise ProviderError(500)
+        except ProviderError as e:
+            raise RuntimeError("wrapped") from e
+    except RuntimeError as wrapped:
+        assert is_retryable(wrapped)
+    assert is_retryable(ConnectionError())
+    assert not is_retryable(ValueError("bad input"))
+
+
+def test_gather_ordered_cancels_the_rest_on_failure():
+    cancelled = []
+
+    async def slow() -> None:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def fail() -> None:
+        await asyncio.sleep(0)
+        raise ValueError("boom")
+
+    async def run() -> None:
+        await gather_ordered([slow(), fail(), slow()])
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+    assert len(cancelled) == 2
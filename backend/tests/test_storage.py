@@ -0,0 +1,98 @@
+import pytest
+
+from app import storage
+from app.storage import ArtifactStore
+
+
+def _put_pdf(store: ArtifactStore, document_id: str, content: bytes):
+    src = store.temp_path(".pdf")
+    src.write_bytes(content)
+    return store.put_blob_file(document_id, "upload", src)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ArtifactStore(tmp_path)
+
+
+@pytest.fixture
+def no_grace(monkeypatch):
+    # Collect unreferenced blobs immediately.
+    monkeypatch.setattr(storage, "GC_GRACE_SECONDS", -60)
+
+
+def test_identical_uploads_share_one_blob(store):
+    first = _put_pdf(store, "a", b"%PDF-1.4 same")
+    second = _put_pdf(store, "b", b"%PDF-1.4 same")
+    assert first == second
+    assert store.blob_path("a", "upload") == store.blob_path("b", "upload") == first
+    assert len(list(store.blob_dir.rglob("*"))) == 2  # one shard directory, one blob
+
+
+def test_blob_is_kept_while_any_document_references_it(store, no_grace):
+    path = _put_pdf(store, "a", b"%PDF-1.4 shared")
+    _put_pdf(store, "b", b"%PDF-1.4 shared")
+
+    assert store.delete_document("a") == ["upload"]
+    assert store.collect_garbage()["blobs_removed"] == 0
+    assert path.exists()
+    assert store.blob_path("b", "upload") == path
+
+    store.delete_document("b")
+    reclaimed = store.collect_garbage()
+    assert reclaimed["blobs_removed"] == 1
+    assert reclaimed["bytes_freed"] == len(b"%PDF-1.4 shared")
+    assert not path.exists()
+
+
+def test_unreferenced_blob_survives_the_grace_period(store):
+    path = _put_pdf(store, "a", b"%PDF-1.4 fresh")
+    store.delete_document("a")
+    assert store.collect_garbage()["blobs_removed"] == 0
+    assert path.exists()
+
+
+def test_delete_document_drops_texts(store):
+    store.put_text("a", "text", "hello")
+    store.put_text("a", "summary", "hi")
+    assert sorted(store.delete_document("a")) == ["summary", "text"]
+    assert store.get_text("a", "text") is None
+    assert store.delete_document("a") == []
+
+
+@pytest.fixture
+def legacy_root(tmp_path):
+    root = tmp_path / "legacy"
+    for subdir, name, content in (
+        ("uploads", "doc1.pdf", "%PDF-1.4 legacy"),
+        ("text", "doc1.txt", "old text"),
+        ("summary", "doc1.md", "# old summary"),
+        ("index/doc1", "index.faiss", "faiss"),
+    ):
+        (root / subdir).mkdir(parents=True, exist_ok=True)
+        (root / subdir / name).write_text(content)
+    return root
+
+
+def test_legacy_files_are_copied_and_left_in_place(store, legacy_root):
+    assert store.import_legacy_files(legacy_root) == 3
+    assert store.blob_path("doc1", "upload").read_bytes() == b"%PDF-1.4 legacy"
+    assert store.get_text("doc1", "text") == "old text"
+    assert store.get_text("doc1", "summary") == "# old summary"
+    for name in ("uploads/doc1.pdf", "text/doc1.txt", "summary/doc1.md", "index/doc1/index.faiss"):
+        assert (legacy_root / name).exists()
+
+
+def test_legacy_files_are_imported_once(store, legacy_root):
+    store.import_legacy_files(legacy_root)
+    store.put_text("doc1", "summary", "# regenerated")
+    store.delete_document("doc1")
+    store.put_text("doc1", "summary", "# regenerated")
+
+    assert store.import_legacy_files(legacy_root) == 0
+    assert store.get_text("doc1", "summary") == "# regenerated"
+    assert store.get_text("doc1", "text") is None
+
+    (legacy_root / "text" / "doc2.txt").write_text("new legacy text")
+    assert store.import_legacy_files(legacy_root) == 1
+    assert store.get_text("doc2", "text") == "new legacy text"
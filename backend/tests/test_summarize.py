@@ -0,0 +1,54 @@
+import asyncio
+
+from app import llm_service
+from app.config import settings
+from app.llm_service import group_by_token_budget, summarize_text
+from app.providers import FakeChatModel
+
+
+def test_groups_fill_the_budget_in_order():
+    items = ["a" * 40, "b" * 40, "c" * 40, "d" * 80]  # 10, 10, 10 and 20 tokens
+    assert group_by_token_budget(items, 25) == [items[:2], items[2:3], items[3:]]
+    assert group_by_token_budget(items, 1000) == [items]
+    assert group_by_token_budget([], 10) == []
+
+
+def test_items_over_the_budget_still_converge():
+    items = ["x" * 400] * 5
+    assert group_by_token_budget(items, 10) == [items[:2], items[2:4], items[4:]]
+    level, rounds = items, 0
+    while len(level) > 1:
+        level = ["".join(group) for group in group_by_token_budget(level, 10)]
+        rounds += 1
+    assert rounds == 3
+
+
+def _text(chunks: int) -> str:
+    return " ".join(
+        f"Part {i} sentence {j} explains detail {i * 100 + j} of the report." for i in range(chunks) for j in range(90)
+    )
+
+
+def test_reduce_tree_depth_follows_the_budget(offline, monkeypatch):
+    llm = FakeChatModel(latency_seconds=0, tokens_per_second=1e6)
+    text = _text(8)
+
+    monkeypatch.setattr(settings, "SUMMARY_REDUCE_TOKEN_BUDGET", 100_000)
+    _, flat = asyncio.run(summarize_text(text, llm=llm))
+    assert flat["tree_depth"] == 1
+    assert flat["llm_calls"] == flat["chunks_used"] + 1
+
+    monkeypatch.setattr(settings, "SUMMARY_REDUCE_TOKEN_BUDGET", 100)
+    events = []
+    summary, deep = asyncio.run(summarize_text(text, llm=llm, progress=lambda *e: events.append(e)))
+    assert summary and deep["chunks_used"] == flat["chunks_used"]
+    assert deep["tree_depth"] > 2
+    assert deep["llm_calls"] > flat["llm_calls"]
+    assert events[-1] == ("reduce", 1, 1)
+    assert sum(1 for stage, _, _ in events if stage == "map") == deep["chunks_used"]
+
+
+def test_single_chunk_needs_no_combine(offline):
+    llm = FakeChatModel(latency_seconds=0, tokens_per_second=1e6)
+    _, meta = asyncio.run(summarize_text(_text(1)[: llm_service.CHUNK_SIZE // 2], llm=llm))
+    assert (meta["chunks_used"], meta["tree_depth"], meta["llm_calls"]) == (1, 1, 2)
@@ -0,0 +1,51 @@
+import threading
+
+from app.vector_store import MmapVectorStore, store_version, swap_in_progress, write_vector_store
+
+
+def test_written_stores_round_trip(tmp_path):
+    path = tmp_path / "index"
+    write_vector_store(path, ["alpha", "beta", "gamma"], [[0.0, 0.0], [1.0, 0.0], [5.0, 5.0]], "m", {"extra.bin": b"x"})
+    store = MmapVectorStore(path)
+
+    assert (store.count, store.dim, store.model) == (3, 2, "m")
+    assert [store.chunk_text(i) for i in range(3)] == ["alpha", "beta", "gamma"]
+    assert [i for i, _ in store.search_by_vector([0.9, 0.0], 2)] == [1, 0]
+    assert store.search_by_vector([0.9, 0.0], 1)[0][1] == store.distance([0.9, 0.0], 1)
+    assert (path / "extra.bin").read_bytes() == b"x"
+
+
+def test_rewrites_replace_the_store(tmp_path):
+    path = tmp_path / "index"
+    write_vector_store(path, ["old"], [[1.0]], "m")
+    first = store_version(path)
+    write_vector_store(path, [], [], "m")
+
+    assert store_version(path) != first
+    assert MmapVectorStore(path).search_by_vector([1.0], 3) == []
+    assert not swap_in_progress(path)
+
+
+def test_concurrent_writers_do_not_clobber_each_other(tmp_path):
+    path = tmp_path / "index"
+    errors = []
+
+    def write(n: int) -> None:
+        try:
+            for _ in range(10):
+                write_vector_store(path, [f"writer {n}"] * 50, [[float(n)] * 8] * 50, "m")
+        except Exception as exc:  # pragma: no cover - reported below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    store = MmapVectorStore(path)
+    n = int(store.vectors[0][0])
+    assert store.count == 50 and {store.chunk_text(i) for i in range(50)} == {f"writer {n}"}
+    # No staging directories are left behind.
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["index", "index.lock"]